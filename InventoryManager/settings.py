@@ -17,6 +17,21 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = Path(os.environ.get("DATA_DIR", "/app/data"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+# Total size of generated exports kept under DATA_DIR/export_cache before the least recently used are removed.
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get("EXPORT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Seconds a list view reuses the row count of an identical filtered query.
+COUNT_CACHE_TIMEOUT = int(os.environ.get("COUNT_CACHE_TIMEOUT", 60))
+# Unfiltered tables with at least this many rows show an estimated total instead of being counted.
+ESTIMATED_COUNT_THRESHOLD = int(os.environ.get("ESTIMATED_COUNT_THRESHOLD", 100_000))
+# From this page on, list views link to keyset pages instead of page numbers, so deeper pages are not read with OFFSET.
+CURSOR_PAGE_THRESHOLD = int(os.environ.get("CURSOR_PAGE_THRESHOLD", 5))
+# Seconds a computed chart payload is kept; writing orders makes cached payloads stale sooner.
+CHART_CACHE_TIMEOUT = int(os.environ.get("CHART_CACHE_TIMEOUT", 60 * 60))
+# Seconds a user's cached notification menu is kept; changes to their notifications drop it sooner.
+NOTIFICATION_INBOX_TIMEOUT = int(os.environ.get("NOTIFICATION_INBOX_TIMEOUT", 60 * 60))
+# Seconds low-stock threshold crossings are buffered before a digest of every low device replaces the alert per
+# crossing, so digests are at least this far apart; 0 sends each alert straight away.
+LOW_STOCK_DIGEST_INTERVAL = int(os.environ.get("LOW_STOCK_DIGEST_INTERVAL", 0))
 
 
 # Quick-start development settings - unsuitable for production
@@ -91,6 +106,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# "shared" lives under DATA_DIR, so every worker process reads the same entries.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": Path.joinpath(DATA_DIR, "cache"),
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
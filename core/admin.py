@@ -1,6 +1,5 @@
 """Configures models for display and define forms used in the Admin view of the `Core` app."""
 
-import pandas as pd
 from django.contrib import admin, messages
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
@@ -11,13 +10,16 @@ from .models import (
     DeviceThresholdTransaction,
     Item,
     ItemTransaction,
+    Job,
     Notification,
     NotificationEvent,
+    NotificationState,
+    OutboxMessage,
     Order,
     WasteReversalRequest,
 )
-from .utils import dict_from_excel_row
 from .gudid import get_or_create_item_from_udi
+from .jobs import enqueue_job, save_job_input
 from .services import InventoryError, record_stock_in
 
 
@@ -45,12 +47,18 @@ class OrderAdmin(admin.ModelAdmin):
         if request.method == "POST":
             form = ExcelUploadForm(request.POST, request.FILES)
             if form.is_valid():
-                file = request.FILES["excel_file"]
-                df = pd.read_excel(file, engine="openpyxl")
-                for _, row in df.iterrows():
-                    data = dict_from_excel_row(row)
-                    Order.objects.create(**data)
-                return HttpResponseRedirect("../")
+                job = enqueue_job(
+                    Job.Kind.IMPORT_ORDERS,
+                    params={"mode": form.cleaned_data["mode"]},
+                    input_file=save_job_input(request.FILES["excel_file"]),
+                    created_by=request.user,
+                )
+                self.message_user(
+                    request,
+                    f"The import was queued as job #{job.pk}.",
+                    level=messages.INFO,
+                )
+                return HttpResponseRedirect(reverse("job-details", args=[job.pk]))
         else:
             form = ExcelUploadForm()
 
@@ -208,6 +216,21 @@ class NotificationAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(NotificationState)
+class NotificationStateAdmin(admin.ModelAdmin):
+    list_display = ["id", "notification", "user", "read_at", "dismissed_at"]
+    search_fields = ["user__username", "notification__title"]
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(NotificationEvent)
 class NotificationEventAdmin(admin.ModelAdmin):
     list_display = ["id", "event_key", "created_at"]
@@ -221,3 +244,36 @@ class NotificationEventAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ["id", "task", "created_at", "available_at", "attempts", "last_error"]
+    list_filter = ["task", "created_at"]
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "kind",
+        "status",
+        "progress",
+        "total",
+        "created_by",
+        "created_at",
+        "finished_at",
+    ]
+    list_filter = ["kind", "status", "created_at"]
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
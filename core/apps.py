@@ -1,8 +1,15 @@
 """Defines the `Core` app."""
 
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import install_search_indexes
+
+        post_migrate.connect(install_search_indexes, sender=self)
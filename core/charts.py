@@ -0,0 +1,181 @@
+"""Chart data for the order analytics page, served as JSON one chart at a time and cached across workers.
+
+Each chart in ``CHARTS`` depends only on the date range and the selected items. Its JSON is stored in the ``shared``
+cache, which every worker process can read, under the chart name, the normalized range and item set, and the
+:class:`~core.models.TableVersion` token of the :class:`~core.models.Order` table and of ``CHART_ITEM_VERSION``,
+which counts edits to the :class:`~core.models.Item` fields the charts show. Writing an order or renaming an item
+changes the token, so stale charts are never served again and simply expire, while other item writes (such as the
+availability saved by every barcode scan) keep them. The same key is the ETag of the chart's response, so browsers
+revalidating a chart they already have get a ``304 Not Modified``.
+
+Hits and misses are counted in the same cache; ``python manage.py chart_cache_stats`` reports them.
+"""
+
+import datetime
+import hashlib
+import json
+
+import simplejson
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Order, TableVersion
+from .rollups import summarize_orders
+
+
+CHART_CACHE_ALIAS = "shared"
+CHART_CACHE_PREFIX = "charts"
+# Number of manufacturers and items shown in the Pareto charts.
+PARETO_LIMIT = 50
+# The Item fields shown in the charts, and the TableVersion counter of their edits.
+CHART_ITEM_FIELDS = frozenset({"item", "item_no", "mfr"})
+CHART_ITEM_VERSION = "core_item.chart_fields"
+
+
+def chart_cache():
+    return caches[CHART_CACHE_ALIAS]
+
+
+def normalize_chart_params(
+    start_date: datetime.datetime, end_date: datetime.datetime, item_nos=None
+) -> dict:
+    """
+    Normalizes the parameters of a chart request, so equivalent requests share a cache entry.
+
+    Args:
+        start_date (datetime.datetime): Start of the range.
+        end_date (datetime.datetime): End of the range.
+        item_nos (optional): Numbers of the items charted. Defaults to all items.
+
+    Returns:
+        dict: The first and last day of the range as ISO strings, and the distinct item numbers in order, or
+        ``None`` for all items.
+    """
+    return {
+        "start_date": start_date.date().isoformat(),
+        "end_date": end_date.date().isoformat(),
+        "item_nos": sorted(set(item_nos)) if item_nos else None,
+    }
+
+
+def chart_cache_key(
+    chart: str,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    item_nos=None,
+) -> str:
+    params = normalize_chart_params(start_date, end_date, item_nos)
+    params["chart"] = chart
+    params["version"] = TableVersion.token(Order, CHART_ITEM_VERSION)
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return f"{CHART_CACHE_PREFIX}:{chart}:{digest}"
+
+
+def _pareto(counts) -> dict:
+    total = sum(count for _, count in counts)
+    cumulative = 0
+    percentages = []
+    for _, count in counts:
+        cumulative += count
+        percentages.append((cumulative / total) * 100)
+    return {
+        "labels": [key for key, _ in counts],
+        "counts": [count for _, count in counts],
+        "cumulative_percentages": percentages,
+    }
+
+
+def monthly_chart(start_date, end_date, item_nos=None) -> dict:
+    """Order counts and costs by month, labelled ``January 2025``."""
+    months = summarize_orders(start_date, end_date, item_nos, by_item=False).months
+    return {
+        "labels": [month.strftime("%B %Y") for month in months],
+        "orders": [order_count for order_count, _ in months.values()],
+        "costs": [total_cost for _, total_cost in months.values()],
+    }
+
+
+def quarterly_chart(start_date, end_date, item_nos=None) -> dict:
+    """Order counts and costs by quarter, labelled ``Q1 2025``."""
+    quarters = summarize_orders(start_date, end_date, item_nos, by_item=False).quarters
+    return {
+        "labels": [
+            f"Q{(quarter.month - 1) // 3 + 1} {quarter.year}" for quarter in quarters
+        ],
+        "orders": [order_count for order_count, _ in quarters.values()],
+        "costs": [total_cost for _, total_cost in quarters.values()],
+    }
+
+
+def manufacturer_chart(start_date, end_date, item_nos=None) -> dict:
+    """The manufacturers ordered from most, with the cumulative percentage of their orders."""
+    summary = summarize_orders(start_date, end_date, item_nos, by_month=False)
+    return _pareto(summary.manufacturers.most_common(PARETO_LIMIT))
+
+
+def item_chart(start_date, end_date, item_nos=None) -> dict:
+    """The items ordered most, with the cumulative percentage of their orders."""
+    summary = summarize_orders(start_date, end_date, item_nos, by_month=False)
+    return _pareto(summary.items.most_common(PARETO_LIMIT))
+
+
+CHARTS = {
+    "monthly": monthly_chart,
+    "quarterly": quarterly_chart,
+    "manufacturers": manufacturer_chart,
+    "items": item_chart,
+}
+
+
+def _count(outcome: str) -> None:
+    key = f"{CHART_CACHE_PREFIX}:{outcome}"
+    cache = chart_cache()
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+
+def get_chart_json(chart: str, key: str, start_date, end_date, item_nos=None) -> str:
+    """
+    Gets the JSON of a chart, building and caching it if needed.
+
+    Args:
+        chart (str): The name of the chart in ``CHARTS``.
+        key (str): The chart's :func:`chart_cache_key`.
+        start_date (datetime.datetime): Start of the range.
+        end_date (datetime.datetime): End of the range.
+        item_nos (optional): Only chart orders of the items with these numbers. Defaults to all items.
+
+    Returns:
+        str: The chart data, serialized with costs as exact decimal numbers.
+    """
+    cache = chart_cache()
+    content = cache.get(key)
+    if content is not None:
+        _count("hits")
+        return content
+
+    _count("misses")
+    content = simplejson.dumps(
+        CHARTS[chart](start_date, end_date, item_nos),
+        ensure_ascii=False,
+        use_decimal=True,
+    )
+    cache.set(key, content, settings.CHART_CACHE_TIMEOUT)
+    return content
+
+
+def chart_cache_stats() -> dict:
+    """Gets the number of charts served from the cache (``hits``) and built (``misses``)."""
+    cache = chart_cache()
+    return {
+        outcome: cache.get(f"{CHART_CACHE_PREFIX}:{outcome}", 0)
+        for outcome in ("hits", "misses")
+    }
+
+
+def reset_chart_cache_stats() -> None:
+    chart_cache().delete_many(
+        [f"{CHART_CACHE_PREFIX}:hits", f"{CHART_CACHE_PREFIX}:misses"]
+    )
@@ -1,6 +1,6 @@
 """Template context shared across authenticated application pages."""
 
-from .models import Notification
+from .notification_services import inbox_summary
 
 
 def notification_inbox(request):
@@ -10,11 +10,8 @@ def notification_inbox(request):
             "unread_notification_count": 0,
         }
 
-    visible = Notification.objects.filter(
-        recipient=request.user,
-        dismissed_at__isnull=True,
-    )
+    summary = inbox_summary(request.user)
     return {
-        "recent_notifications": visible.select_related("device", "item")[:5],
-        "unread_notification_count": visible.filter(read_at__isnull=True).count(),
+        "recent_notifications": summary["recent"],
+        "unread_notification_count": summary["unread_count"],
     }
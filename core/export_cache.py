@@ -0,0 +1,135 @@
+"""Caches generated Excel exports on disk under ``DATA_DIR``, so repeat requests for the same range are served from file.
+
+Entries are keyed by the normalized export parameters and the :class:`~core.models.TableVersion` token of the
+:class:`~core.models.Order` and :class:`~core.models.Item` tables. Importing or editing orders changes the token,
+so stale files are never served again and are removed once the cache grows past ``EXPORT_CACHE_MAX_BYTES``,
+least recently used first.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.dateparse import parse_date
+
+from .exports import write_orders_xlsx
+from .models import Item, Order, TableVersion
+
+
+def export_cache_dir() -> Path:
+    path = Path(settings.DATA_DIR) / "export_cache"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def normalize_export_params(start_date: str | None, end_date: str | None) -> dict:
+    """
+    Normalizes the date range of an export, so equivalent requests share a cache entry.
+
+    Args:
+        start_date (str | None): First day of the range (``YYYY-MM-DD``).
+        end_date (str | None): Last day of the range (``YYYY-MM-DD``).
+
+    Returns:
+        dict: The parsed dates as ISO strings, or ``None`` for both if the range does not apply
+        (as in :func:`core.exports.orders_for_export`).
+    """
+    start = parse_date(start_date) if start_date else None
+    end = parse_date(end_date) if end_date else None
+    if start is None or end is None:
+        return {"start_date": None, "end_date": None}
+    return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+
+def export_cache_key(start_date: str | None, end_date: str | None) -> str:
+    params = normalize_export_params(start_date, end_date)
+    params["version"] = TableVersion.token(Order, Item)
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def cached_export_path(key: str) -> Path | None:
+    """Gets the cached export for `key`, marking it as recently used, or ``None`` if it is not cached."""
+    path = export_cache_dir() / f"{key}.xlsx"
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def evict_exports(max_bytes: int | None = None, keep: Path | None = None) -> int:
+    """
+    Removes the least recently used exports until the cache fits in `max_bytes`.
+
+    Args:
+        max_bytes (int | None, optional): Size limit of the cache. Defaults to ``EXPORT_CACHE_MAX_BYTES``.
+        keep (Path | None, optional): An export that is about to be served, which is never removed.
+
+    Returns:
+        int: The number of files removed.
+    """
+    if max_bytes is None:
+        max_bytes = settings.EXPORT_CACHE_MAX_BYTES
+    entries = []
+    for path in export_cache_dir().glob("*.xlsx"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def get_or_build_export(
+    start_date: str | None, end_date: str | None, progress=None
+) -> Path:
+    """
+    Gets the Excel export of the selected date range, generating and caching it if needed.
+
+    The file is written under a temporary name and renamed into place, so concurrent requests
+    never read a partially written export.
+
+    Args:
+        start_date (str | None): First day of the range (``YYYY-MM-DD``).
+        end_date (str | None): Last day of the range (``YYYY-MM-DD``).
+        progress (optional): Passed to :func:`core.exports.write_orders_xlsx` if the export is generated.
+
+    Returns:
+        Path: The cached export.
+    """
+    key = export_cache_key(start_date, end_date)
+    path = cached_export_path(key)
+    if path is not None:
+        return path
+
+    params = normalize_export_params(start_date, end_date)
+    directory = export_cache_dir()
+    descriptor, temporary_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as output:
+            write_orders_xlsx(
+                output, params["start_date"], params["end_date"], progress=progress
+            )
+        path = directory / f"{key}.xlsx"
+        os.replace(temporary_name, path)
+    except BaseException:
+        Path(temporary_name).unlink(missing_ok=True)
+        raise
+    evict_exports(keep=path)
+    return path
@@ -0,0 +1,303 @@
+"""Builds :class:`~core.models.Order` exports formatted like the UIH materials-management ledger, and streams
+CSV/NDJSON exports of :class:`Orders <core.models.Order>` and :class:`ItemTransactions <core.models.ItemTransaction>`."""
+
+import csv
+import datetime
+import io
+import json
+import zoneinfo
+
+import xlsxwriter
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from djmoney.models.fields import MoneyFieldProxy
+from djmoney.money import Money
+
+from .models import Item, ItemTransaction, Order
+
+
+EXPORT_TIMEZONE = zoneinfo.ZoneInfo("America/Chicago")
+EXPORT_DATETIME_FORMAT = "%d/%m/%Y %I:%M:%S %p"
+EXPORT_PROGRESS_INTERVAL = 1000
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_STREAM_BLOCK_SIZE = 64 * 1024
+EXPORT_CURRENCY_FORMAT = '"$"#,##0.00'
+EXPORT_HEADER_FORMAT = {
+    "bold": True,
+    "font_color": "#000000",
+    "bg_color": "#C0C0C0",
+    "pattern": 1,
+    "align": "center",
+    "valign": "vcenter",
+    "border": 1,
+    "border_color": "#000000",
+}
+
+# Fields (by name or verbose name) left out of the export.
+EXCLUDED_EXPORT_FIELDS = {
+    "ID",
+    "price_currency",
+    "total_cost_currency",
+    "external_url",
+    "item",
+    "fingerprint",
+    "next_expiration_alert",
+}
+
+
+def export_fields(model) -> list:
+    """
+    Gets the fields of `model` that appear as columns of the export.
+
+    Args:
+        model: :class:`~core.models.Item` or :class:`~core.models.Order`.
+
+    Returns:
+        list: The exported fields, in model order.
+    """
+    return [
+        field
+        for field in model._meta.fields
+        if field.verbose_name not in EXCLUDED_EXPORT_FIELDS
+        and field.name not in EXCLUDED_EXPORT_FIELDS
+    ]
+
+
+def export_sheet_title(start_date: str | None, end_date: str | None) -> str:
+    """Excel limits sheet names to 31 characters."""
+    return f"{start_date}_{end_date}"[:31]
+
+
+def export_filename(start_date: str | None, end_date: str | None) -> str:
+    return f"Orders_{export_sheet_title(start_date, end_date)}.xlsx"
+
+
+def orders_for_export(start_date: str | None, end_date: str | None):
+    """
+    Gets the :class:`Orders <core.models.Order>` in the selected date range, newest first.
+
+    Args:
+        start_date (str | None): First day of the range (``YYYY-MM-DD``).
+        end_date (str | None): Last day of the range (``YYYY-MM-DD``). The range only applies if both dates are given.
+
+    Returns:
+        The queryset of :class:`Orders <core.models.Order>` to export, with their :class:`Items <core.models.Item>` and
+        the :class:`Devices <core.models.Device>` of those, which are exported with each row.
+    """
+    queryset = Order.objects.select_related("item__device").all().order_by("-po_date")
+    if start_date and end_date:
+        start_date_as_datetime = timezone.make_aware(
+            datetime.datetime.combine(parse_date(start_date), datetime.time(0, 0, 0))
+        )
+        end_date_as_datetime = timezone.make_aware(
+            datetime.datetime.combine(
+                parse_date(end_date), datetime.time(23, 59, 59, 999999)
+            )
+        )
+        queryset = queryset.filter(
+            po_date__range=[start_date_as_datetime, end_date_as_datetime]
+        )
+    return queryset
+
+
+def export_value(value):
+    """Converts a model value to what is written in the exported cell."""
+    if isinstance(value, Money):
+        return value.amount
+    if isinstance(value, datetime.datetime):
+        return value.astimezone(EXPORT_TIMEZONE).strftime(EXPORT_DATETIME_FORMAT)
+    if isinstance(value, models.Model):
+        return str(value)
+    return value
+
+
+def export_row(order: Order, item_fields, order_fields) -> list:
+    return [export_value(getattr(order.item, field.name)) for field in item_fields] + [
+        export_value(getattr(order, field.name)) for field in order_fields
+    ]
+
+
+def is_money_field(model, field) -> bool:
+    return isinstance(getattr(model, field.name), MoneyFieldProxy)
+
+
+class ExportColumns:
+    """
+    The columns of an order export, measuring the width each needs while rows are written.
+
+    Attributes:
+        headers (list): The header of each column.
+        is_money (list): Whether each column holds a :class:`~djmoney.models.fields.MoneyField`, to be currency formatted.
+        widths (list): The length of the longest value written to each column so far, header included.
+    """
+
+    def __init__(self):
+        self.item_fields = export_fields(Item)
+        self.order_fields = export_fields(Order)
+        self.headers = [field.verbose_name for field in self.item_fields] + [
+            field.verbose_name for field in self.order_fields
+        ]
+        self.is_money = [is_money_field(Item, field) for field in self.item_fields] + [
+            is_money_field(Order, field) for field in self.order_fields
+        ]
+        self.widths = [len(str(header)) for header in self.headers]
+
+    def row(self, order: Order) -> list:
+        """Gets the exported values of `order`, widening any column they do not fit in."""
+        values = export_row(order, self.item_fields, self.order_fields)
+        self.widths = [
+            max(width, len(str(value))) for width, value in zip(self.widths, values)
+        ]
+        return values
+
+
+def write_orders_xlsx(
+    output, start_date: str | None, end_date: str | None, progress=None
+) -> str:
+    """
+    Writes the selected date range of :class:`Orders <core.models.Order>` to an Excel workbook.
+    This sheet is formatted to match the output provided by UIH materials management.
+
+    XlsxWriter's constant-memory mode flushes each row to disk as soon as it is written, and orders are read from the
+    database in chunks, so memory use does not grow with the size of the range. Column widths are measured as rows
+    are written, so the sheet is styled in a single pass over the data.
+
+    Args:
+        output: Path or seekable, writable file-like object to save the workbook to.
+        start_date (str | None): First day of the range (``YYYY-MM-DD``).
+        end_date (str | None): Last day of the range (``YYYY-MM-DD``).
+        progress (optional): Called with the number of rows written so far, every few rows.
+
+    Returns:
+        str: The title of the written sheet.
+    """
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    title = export_sheet_title(start_date, end_date)
+    sheet = workbook.add_worksheet(title)
+    header_format = workbook.add_format(EXPORT_HEADER_FORMAT)
+    currency_format = workbook.add_format({"num_format": EXPORT_CURRENCY_FORMAT})
+
+    columns = ExportColumns()
+    cell_formats = [
+        currency_format if is_money else None for is_money in columns.is_money
+    ]
+
+    sheet.write_row(0, 0, columns.headers, header_format)
+    orders = orders_for_export(start_date, end_date).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    for written, order in enumerate(orders, start=1):
+        for column, (value, cell_format) in enumerate(
+            zip(columns.row(order), cell_formats)
+        ):
+            sheet.write(written, column, value, cell_format)
+        if progress is not None and written % EXPORT_PROGRESS_INTERVAL == 0:
+            progress(written)
+
+    for column, width in enumerate(columns.widths):
+        sheet.set_column(column, column, width + 2)
+
+    workbook.close()
+    return title
+
+
+# Fields left out of CSV/NDJSON exports; money amounts are exported without their currency.
+EXCLUDED_RECORD_FIELDS = {
+    "price_currency",
+    "total_cost_currency",
+    "fingerprint",
+    "next_expiration_alert",
+}
+
+
+def record_columns(model, prefix: str = "") -> list[str]:
+    """
+    Gets the columns of `model` included in CSV/NDJSON exports, as lookups usable with :meth:`~django.db.models.query.QuerySet.values_list`.
+
+    Args:
+        model: The model whose concrete fields to export.
+        prefix (str, optional): Lookup prefix of a related model, such as ``"item__"``, whose id is then left out. Defaults to "".
+
+    Returns:
+        list[str]: The lookups, with foreign keys exported as their ids.
+    """
+    return [
+        f"{prefix}{field.attname}"
+        for field in model._meta.concrete_fields
+        if field.name not in EXCLUDED_RECORD_FIELDS
+        and not (prefix and field.primary_key)
+    ]
+
+
+ORDER_RECORD_COLUMNS = record_columns(Order) + record_columns(Item, prefix="item__")
+ITEM_TRANSACTION_RECORD_COLUMNS = record_columns(ItemTransaction) + [
+    "item__item",
+    "item__item_no",
+]
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _buffered(lines):
+    """Joins `lines` into blocks of roughly ``EXPORT_STREAM_BLOCK_SIZE`` characters, so each is not sent on its own."""
+    buffer = io.StringIO()
+    for line in lines:
+        buffer.write(line)
+        if buffer.tell() >= EXPORT_STREAM_BLOCK_SIZE:
+            yield buffer.getvalue()
+            buffer = io.StringIO()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_csv(queryset, columns: list[str]):
+    """
+    Yields `queryset` as CSV, with a header row of `columns`.
+
+    The header is yielded before the query runs, and rows are read with a chunked iterator,
+    so output starts immediately and memory use does not grow with the number of rows.
+
+    Args:
+        queryset: The filtered and ordered queryset to export.
+        columns (list[str]): The lookups to export, such as :data:`ORDER_RECORD_COLUMNS`.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield line(columns)
+    rows = queryset.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    yield from _buffered(line([_csv_value(value) for value in row]) for row in rows)
+
+
+def stream_ndjson(queryset, columns: list[str]):
+    """
+    Yields `queryset` as newline-delimited JSON, one object keyed by `columns` per row.
+
+    Args:
+        queryset: The filtered and ordered queryset to export.
+        columns (list[str]): The lookups to export, such as :data:`ORDER_RECORD_COLUMNS`.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    rows = queryset.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    yield from _buffered(
+        encoder.encode(dict(zip(columns, row))) + "\n" for row in rows
+    )
+
+
+# Export format -> (content type, generator)
+RECORD_EXPORT_FORMATS = {
+    "csv": ("text/csv", stream_csv),
+    "ndjson": ("application/x-ndjson", stream_ndjson),
+}
@@ -3,11 +3,18 @@
 from django import forms
 from django.utils import timezone
 
+from .import_services import ImportMode
+
 
 class ExcelUploadForm(forms.Form):
     """Used in the admin panel for uploading an Excel file containing transaction data."""
 
     excel_file = forms.FileField(label="Upload Excel File")
+    mode = forms.ChoiceField(
+        choices=ImportMode.choices,
+        initial=ImportMode.SKIP,
+        label="Previously imported rows",
+    )
 
 class UDI_Form(forms.Form):
     """Used in the admin panel for uploading an UDI containing item data using a barcode."""
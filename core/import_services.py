@@ -0,0 +1,273 @@
+"""Bulk import of UIH materials-management ledgers into :class:`~core.models.Order` rows."""
+
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+import openpyxl
+import pandas as pd
+from django.db import models, transaction
+
+from .models import Item, LedgerDateBounds, Order, TableRowCount, TableVersion
+from .rollups import order_month, refresh_order_rollups
+from .utils import ledger_records
+
+
+IMPORT_BATCH_SIZE = 500
+
+
+class ImportMode(models.TextChoices):
+    """How rows whose fingerprint matches an existing :class:`~core.models.Order` are handled."""
+
+    SKIP = "skip", "Skip rows that were already imported"
+    UPDATE = "update", "Update rows that were already imported"
+    APPEND = "append", "Import every row, even if already imported"
+
+
+@dataclass
+class ImportResult:
+    """Summary of a completed ledger import."""
+
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    items_created: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"Processed {self.rows:,} rows: {self.created:,} orders created, "
+            f"{self.updated:,} updated, {self.skipped:,} skipped "
+            f"({self.items_created:,} new items) in {self.elapsed:.1f}s "
+            f"({self.rows_per_second:,.0f} rows/sec)."
+        )
+
+
+def batched(iterable, size: int):
+    """Yield lists of at most `size` elements from `iterable`."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _resolve_item_ids(records, item_ids: dict) -> int:
+    """Map every item identifier in `records` to an id, bulk-creating missing items.
+
+    `item_ids` is shared across batches, so each identifier is looked up at most once per import.
+    """
+    missing = {}
+    for identifier, defaults, _ in records:
+        if identifier not in item_ids:
+            missing.setdefault(identifier, defaults)
+    if not missing:
+        return 0
+
+    item_ids.update(
+        Item.objects.filter(item_no__in=list(missing)).values_list("item_no", "id")
+    )
+    new_items = [
+        Item(**{**defaults, "item_no": identifier})
+        for identifier, defaults in missing.items()
+        if identifier not in item_ids
+    ]
+    if new_items:
+        Item.objects.bulk_create(new_items)
+        if any(item.pk is None for item in new_items):
+            # The backend cannot return ids from a bulk insert, so look them up.
+            item_ids.update(
+                Item.objects.filter(
+                    item_no__in=[item.item_no for item in new_items]
+                ).values_list("item_no", "id")
+            )
+        else:
+            item_ids.update((item.item_no, item.pk) for item in new_items)
+    return len(new_items)
+
+
+def _existing_orders(batch) -> dict:
+    """Map the fingerprints in `batch` that are already stored to the id and rollup cell of each of their orders."""
+    existing = {}
+    fingerprints = {data["fingerprint"] for _, _, data in batch}
+    for fingerprint, order_id, po_date, item_id in Order.objects.filter(
+        fingerprint__in=fingerprints
+    ).values_list("fingerprint", "id", "po_date", "item_id"):
+        existing.setdefault(fingerprint, []).append(
+            (order_id, (order_month(po_date), item_id))
+        )
+    return existing
+
+
+def _write_batch(
+    batch,
+    item_ids: dict,
+    mode: str,
+    result: ImportResult,
+    rollup_cells: set,
+    po_date_bounds: list,
+) -> None:
+    existing = {} if mode == ImportMode.APPEND else _existing_orders(batch)
+    new_orders = []
+    updated_orders = []
+    seen = set()
+    for identifier, _, data in batch:
+        fingerprint = data.get("fingerprint")
+        if mode != ImportMode.APPEND and fingerprint in seen:
+            result.skipped += 1
+            continue
+        seen.add(fingerprint)
+        if fingerprint not in existing:
+            new_orders.append(Order(item_id=item_ids[identifier], **data))
+        elif mode == ImportMode.UPDATE:
+            updated_orders.extend(
+                Order(pk=order_id, item_id=item_ids[identifier], **data)
+                for order_id, _ in existing[fingerprint]
+            )
+            # The orders may have been edited into other months or items since they were imported.
+            rollup_cells.update(cell for _, cell in existing[fingerprint])
+            result.updated += 1
+        else:
+            result.skipped += 1
+
+    written = new_orders + updated_orders
+    rollup_cells.update((order_month(order.po_date), order.item_id) for order in written)
+    if written:
+        # The earliest and latest date of each batch, to widen the ledger's bounds once at the end.
+        po_date_bounds.append(min(order.po_date for order in written))
+        po_date_bounds.append(max(order.po_date for order in written))
+    Order.objects.bulk_create(new_orders)
+    result.created += len(new_orders)
+    if updated_orders:
+        Order.objects.bulk_update(
+            updated_orders,
+            [
+                field.name
+                for field in Order._meta.concrete_fields
+                if not field.primary_key
+            ],
+        )
+
+
+def bulk_import_orders(
+    records,
+    *,
+    mode: str = ImportMode.SKIP,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress=None,
+) -> ImportResult:
+    """Insert ledger records as :class:`Orders <core.models.Order>` in one transaction.
+
+    Rows are matched against existing :class:`Orders <core.models.Order>` by fingerprint with one indexed
+    lookup per batch, so re-importing an overlapping ledger only pays for the rows that are new.
+
+    Args:
+        records: Iterable of ``(item identifier, item defaults, order data)`` tuples, as produced by
+            :func:`core.utils.ledger_records`. It is consumed lazily, `batch_size` records at a time.
+        mode (str, optional): One of :class:`ImportMode`. Defaults to skipping rows that were already imported.
+        batch_size (int, optional): Number of rows resolved and inserted per round trip.
+        progress (optional): Called with the running :class:`ImportResult` after each batch.
+
+    Returns:
+        ImportResult: Row counts and throughput of the import.
+    """
+    result = ImportResult()
+    item_ids = {}
+    rollup_cells = set()
+    po_date_bounds = []
+    started = time.perf_counter()
+    with transaction.atomic():
+        for batch in batched(
+            ((str(identifier), defaults, data) for identifier, defaults, data in records),
+            batch_size,
+        ):
+            result.items_created += _resolve_item_ids(batch, item_ids)
+            _write_batch(batch, item_ids, mode, result, rollup_cells, po_date_bounds)
+            result.rows += len(batch)
+            if progress is not None:
+                progress(result)
+        # Bulk inserts skip the save signals that keep the row counts.
+        if result.items_created:
+            TableRowCount.adjust(Item, result.items_created)
+        if result.created:
+            TableRowCount.adjust(Order, result.created)
+        if result.created or result.updated:
+            # Bulk writes skip the save signals that normally record them.
+            TableVersion.bump(Item, Order)
+            refresh_order_rollups(rollup_cells)
+            if mode == ImportMode.UPDATE:
+                # Updated orders may have moved off a bound.
+                LedgerDateBounds.recompute(Order)
+            else:
+                LedgerDateBounds.widen(Order, min(po_date_bounds), max(po_date_bounds))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def read_ledger_chunks(file, *, chunk_size: int = IMPORT_BATCH_SIZE):
+    """Stream the first sheet of a ledger workbook as DataFrames of at most `chunk_size` rows.
+
+    The workbook is opened in read-only mode, so only the current chunk is held in memory
+    regardless of the size of the upload.
+
+    Args:
+        file: Path or file-like object of the ``.xlsx`` workbook.
+        chunk_size (int, optional): Maximum number of rows per yielded DataFrame.
+
+    Yields:
+        pd.DataFrame: The next rows of the sheet, with the header row as column names.
+    """
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [
+            str(name) if name is not None else f"Unnamed: {i}"
+            for i, name in enumerate(header)
+        ]
+        width = len(columns)
+        padding = (None,) * width
+        non_empty_rows = (
+            (row + padding)[:width]
+            for row in rows
+            if any(value is not None for value in row)
+        )
+        for batch in batched(non_empty_rows, chunk_size):
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def count_ledger_rows(file) -> int | None:
+    """Estimate the number of data rows in a ledger workbook from its dimensions, without reading the rows."""
+    workbook = openpyxl.load_workbook(file, read_only=True)
+    try:
+        max_row = workbook.active.max_row
+    finally:
+        workbook.close()
+    return max(max_row - 1, 0) if max_row else None
+
+
+def import_ledger(
+    file,
+    *,
+    mode: str = ImportMode.SKIP,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress=None,
+) -> ImportResult:
+    """Stream a ledger workbook into :class:`Orders <core.models.Order>` with constant memory."""
+    return bulk_import_orders(
+        (
+            record
+            for chunk in read_ledger_chunks(file, chunk_size=batch_size)
+            for record in ledger_records(chunk)
+        ),
+        mode=mode,
+        batch_size=batch_size,
+        progress=progress,
+    )
@@ -0,0 +1,171 @@
+"""Database-backed queue for imports and exports that are too slow to run inside a request.
+
+Requests enqueue a :class:`~core.models.Job` and return immediately; the ``run_jobs`` management command
+claims queued jobs one at a time and records their progress, so no external broker is required.
+
+An import runs in a single transaction, so progress written to its job row is only visible once it commits. The
+progress of a running job is therefore also published in the ``shared`` cache, which every process reads straight
+away, and :func:`job_progress` reads it from there.
+"""
+
+import logging
+import shutil
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .export_cache import get_or_build_export
+from .exports import export_filename, orders_for_export
+from .import_services import count_ledger_rows, import_ledger
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+JOB_PROGRESS_CACHE_ALIAS = "shared"
+# Seconds the published progress of a job is kept; a finished job's progress is read from its row.
+JOB_PROGRESS_TIMEOUT = 24 * 60 * 60
+
+
+def _progress_cache_key(job_id: int) -> str:
+    return f"jobs:progress:{job_id}"
+
+
+def jobs_dir() -> Path:
+    """Directory under ``DATA_DIR`` holding uploaded job inputs and generated results."""
+    path = Path(settings.DATA_DIR) / "jobs"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def save_job_input(uploaded_file) -> str:
+    """Store an uploaded file for a worker to read, returning its name within :func:`jobs_dir`."""
+    name = f"{uuid.uuid4().hex}{Path(uploaded_file.name).suffix}"
+    with open(jobs_dir() / name, "wb") as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return name
+
+
+def enqueue_job(kind: str, *, params=None, input_file: str = "", created_by=None) -> Job:
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        input_file=input_file,
+        created_by=created_by if getattr(created_by, "is_authenticated", False) else None,
+    )
+
+
+def report_progress(job: Job, progress: int, total: int | None = None) -> None:
+    """Persist the progress of a running job, and publish it so it can be polled from other workers straight away."""
+    job.progress = progress
+    update = {"progress": progress}
+    if total is not None:
+        job.total = total
+        update["total"] = total
+    Job.objects.filter(pk=job.pk).update(**update)
+    caches[JOB_PROGRESS_CACHE_ALIAS].set(
+        _progress_cache_key(job.pk),
+        (job.progress, job.total),
+        JOB_PROGRESS_TIMEOUT,
+    )
+
+
+def job_progress(job: Job) -> tuple[int, int | None]:
+    """
+    Gets the progress of `job`, as published by :func:`report_progress` while it runs.
+
+    Returns:
+        tuple[int, int | None]: The number of rows processed and the total, if known.
+    """
+    if not job.is_finished:
+        published = caches[JOB_PROGRESS_CACHE_ALIAS].get(_progress_cache_key(job.pk))
+        if published is not None:
+            return published
+    return job.progress, job.total
+
+
+def claim_next_job() -> Job | None:
+    """Atomically move the oldest queued job to running, or return ``None`` if the queue is empty."""
+    with transaction.atomic():
+        job = Job.objects.filter(status=Job.Status.QUEUED).order_by("id").first()
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, started_at=timezone.now()
+        )
+    if not claimed:
+        # Another worker claimed it first.
+        return claim_next_job()
+    job.refresh_from_db()
+    return job
+
+
+def requeue_interrupted_jobs() -> int:
+    """Return jobs left running by a worker that stopped mid-job to the queue."""
+    return Job.objects.filter(status=Job.Status.RUNNING).update(
+        status=Job.Status.QUEUED, started_at=None, progress=0
+    )
+
+
+def _run_import(job: Job) -> str:
+    # The upload is kept until the import succeeds, so a job interrupted by a stopped worker can run again.
+    path = jobs_dir() / job.input_file
+    report_progress(job, 0, count_ledger_rows(path))
+    result = import_ledger(
+        path,
+        mode=job.params.get("mode", "skip"),
+        progress=lambda result: report_progress(job, result.rows),
+    )
+    path.unlink(missing_ok=True)
+    report_progress(job, result.rows)
+    return str(result)
+
+
+def _run_export(job: Job) -> str:
+    start_date = job.params.get("start_date")
+    end_date = job.params.get("end_date")
+    total = orders_for_export(start_date, end_date).count()
+    report_progress(job, 0, total)
+    result_file = f"{job.pk}_{export_filename(start_date, end_date)}"
+    export = get_or_build_export(
+        start_date,
+        end_date,
+        progress=lambda written: report_progress(job, written),
+    )
+    # Copied so that the download survives the export being evicted from the cache.
+    shutil.copyfile(export, jobs_dir() / result_file)
+    job.result_file = result_file
+    Job.objects.filter(pk=job.pk).update(result_file=result_file)
+    report_progress(job, total)
+    return f"Exported {total:,} orders."
+
+
+JOB_HANDLERS = {
+    Job.Kind.IMPORT_ORDERS: _run_import,
+    Job.Kind.EXPORT_ORDERS: _run_export,
+}
+
+
+def run_job(job: Job) -> Job:
+    """Run a claimed job to completion, recording its outcome instead of raising."""
+    try:
+        message = JOB_HANDLERS[job.kind](job)
+    except Exception as exc:
+        logger.exception("Job %s failed", job.pk)
+        job.status = Job.Status.FAILED
+        job.message = f"{type(exc).__name__}: {exc}"
+        # Failed jobs are not run again, so their upload is no longer needed.
+        if job.input_file:
+            (jobs_dir() / job.input_file).unlink(missing_ok=True)
+    else:
+        job.status = Job.Status.SUCCEEDED
+        job.message = message
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "message", "finished_at"])
+    caches[JOB_PROGRESS_CACHE_ALIAS].delete(_progress_cache_key(job.pk))
+    return job
@@ -0,0 +1,160 @@
+"""Benchmark the Excel order exports against generated orders."""
+
+import datetime
+import os
+import tempfile
+import time
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from djmoney.models.fields import MoneyFieldProxy
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+from core.exports import (
+    export_fields,
+    export_row,
+    orders_for_export,
+    write_orders_xlsx,
+)
+from core.models import Item, Order
+
+
+GENERATE_BATCH_SIZE = 5_000
+
+
+def legacy_style_column(sheet, type, field, i, currency_style):
+    """The per-column styling used before the export measured columns while writing rows, kept for comparison."""
+    col_letter = openpyxl.utils.get_column_letter(i)
+    if isinstance(getattr(type, field.name), MoneyFieldProxy):
+        for row in range(2, sheet.max_row + 1):
+            sheet[f"{col_letter}{row}"].style = currency_style
+
+    cell_to_format = sheet.cell(row=1, column=i)
+    cell_to_format.fill = PatternFill(
+        start_color="C0C0C0", end_color="C0C0C0", fill_type="solid"
+    )
+    cell_to_format.font = Font(bold=True, color="000000")
+    cell_to_format.alignment = Alignment(horizontal="center", vertical="center")
+    cell_to_format.border = Border(
+        left=Side(style="thin", color="000000"),
+        right=Side(style="thin", color="000000"),
+        top=Side(style="thin", color="000000"),
+        bottom=Side(style="thin", color="000000"),
+    )
+
+    max_length = 0
+    for cell in list(sheet.columns)[i - 1]:
+        if len(str(cell.value)) > max_length:
+            max_length = len(str(cell.value))
+
+    sheet.column_dimensions[col_letter].width = max_length + 2
+
+
+def legacy_write_orders_workbook(output) -> None:
+    """The export as written before single-pass styling, kept for comparison."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    item_fields = export_fields(Item)
+    order_fields = export_fields(Order)
+    sheet.append(
+        [field.verbose_name for field in item_fields]
+        + [field.verbose_name for field in order_fields]
+    )
+    currency_style = NamedStyle(name="currency_style", number_format='"$"#,##0.00')
+    for order in orders_for_export(None, None):
+        sheet.append(export_row(order, item_fields, order_fields))
+
+    i = 0
+    for field in item_fields:
+        i += 1
+        legacy_style_column(sheet, Item, field, i, currency_style)
+    for field in order_fields:
+        i += 1
+        legacy_style_column(sheet, Order, field, i, currency_style)
+    workbook.save(output)
+
+
+def create_orders(rows: int, items: int) -> None:
+    """Create `rows` synthetic orders spread across `items` items."""
+    created_items = Item.objects.bulk_create(
+        Item(
+            item=f"Benchmark item {index}",
+            item_no=f"BENCH-{index:06d}",
+            mfr=f"Manufacturer {index % 50}",
+            mfr_cat=f"CAT-{index}",
+            descr=f"Synthetic export item {index}",
+        )
+        for index in range(items)
+    )
+    start = timezone.make_aware(datetime.datetime(2015, 1, 1, 8, 0))
+    batch = []
+    for index in range(1, rows + 1):
+        quantity = 1 + index % 5
+        batch.append(
+            Order(
+                item=created_items[index % items],
+                vendor=f"Vendor {index % 20}",
+                vend_cat=f"VC-{index % items}",
+                recv_qty=quantity,
+                um="EA",
+                price=12.5,
+                total_cost=12.5 * quantity,
+                expr1010="expr",
+                po_no=f"PO-{index}",
+                po_date=start + datetime.timedelta(days=index % 3650),
+                vend_code=f"V{index % 20}",
+                dbo_vend_name=f"Vendor {index % 20} Inc.",
+                dbo_cc_name="IR",
+                acct_no=4100,
+            )
+        )
+        if len(batch) == GENERATE_BATCH_SIZE:
+            Order.objects.bulk_create(batch)
+            batch = []
+    Order.objects.bulk_create(batch)
+
+
+def timed(write, path: str) -> float:
+    started = time.perf_counter()
+    write(path)
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Export generated orders inside a rolled-back transaction, comparing the "
+        "previous per-column styling with the single-pass export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000]
+        )
+        parser.add_argument("--items", type=int, default=1_000)
+        parser.add_argument(
+            "--skip-legacy",
+            action="store_true",
+            help="Only time the current export.",
+        )
+
+    def handle(self, *args, **options):
+        exports = {
+            "xlsxwriter, constant memory": lambda path: write_orders_xlsx(path, None, None),
+        }
+        if not options["skip_legacy"]:
+            exports = {"openpyxl, per column (before)": legacy_write_orders_workbook} | exports
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "orders.xlsx")
+            for rows in options["rows"]:
+                with transaction.atomic():
+                    create_orders(rows, options["items"])
+                    self.stdout.write(f"{rows:,} rows:")
+                    for name, write in exports.items():
+                        elapsed = timed(write, path)
+                        self.stdout.write(
+                            f"  {name:<30} {elapsed:8.2f}s ({rows / elapsed:,.0f} rows/sec)"
+                        )
+                    transaction.set_rollback(True)
@@ -0,0 +1,133 @@
+"""Benchmark the ledger import against a generated workbook."""
+
+import datetime
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import xlsxwriter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.import_services import IMPORT_BATCH_SIZE, import_ledger
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+LEDGER_COLUMNS = [
+    "ITEM",
+    "ITEM_NO",
+    "MFR",
+    "MFR CAT",
+    "DESCR",
+    "VENDOR",
+    "VEND CAT",
+    "RECV QTY",
+    "UM",
+    "PRICE",
+    "TOTAL COST",
+    "Expr1010",
+    "PO_NO",
+    "PO_DATE",
+    "VEND_CODE",
+    "dbo_VEND.NAME",
+    "dbo_CC.NAME",
+    "ACCT_NO",
+    "RCV_DATE",
+]
+
+
+def peak_memory_mb() -> float:
+    """
+    Peak memory of this process in MiB: the resident set size where :mod:`resource` is available, otherwise the
+    Python allocations traced since :mod:`tracemalloc` was started.
+    """
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# What peak_memory_mb measures on this platform.
+PEAK_MEMORY_LABEL = "peak RSS" if resource is not None else "peak traced Python memory"
+
+
+def write_ledger_workbook(path: str, rows: int, items: int) -> None:
+    """Write a synthetic UIH ledger with `rows` orders spread across `items` items."""
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = workbook.add_worksheet()
+    date_format = workbook.add_format({"num_format": "mm/dd/yyyy hh:mm"})
+    sheet.write_row(0, 0, LEDGER_COLUMNS)
+    start = datetime.datetime(2015, 1, 1, 8, 0)
+    for index in range(1, rows + 1):
+        item_index = index % items
+        po_date = start + datetime.timedelta(days=index % 3650)
+        sheet.write_row(
+            index,
+            0,
+            [
+                f"Benchmark item {item_index}",
+                f"BENCH-{item_index:06d}",
+                f"Manufacturer {item_index % 50}",
+                f"CAT-{item_index}",
+                f"Synthetic ledger item {item_index}",
+                f"Vendor {item_index % 20}",
+                f"VC-{item_index}",
+                1 + index % 5,
+                "EA",
+                12.5,
+                12.5 * (1 + index % 5),
+                "expr",
+                f"PO-{index}",
+            ],
+        )
+        sheet.write_datetime(index, 13, po_date, date_format)
+        sheet.write_row(
+            index,
+            14,
+            [f"V{item_index % 20}", f"Vendor {item_index % 20} Inc.", "IR", 4100],
+        )
+        sheet.write_datetime(
+            index, 18, po_date + datetime.timedelta(days=3), date_format
+        )
+    workbook.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a generated ledger workbook inside a rolled-back transaction and "
+        "report throughput and peak memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--items", type=int, default=5_000)
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if resource is None:
+            tracemalloc.start()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ledger.xlsx")
+            write_ledger_workbook(path, options["rows"], options["items"])
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            baseline = peak_memory_mb()
+            self.stdout.write(
+                f"Generated {options['rows']:,} rows ({size_mb:.1f} MiB); "
+                f"{PEAK_MEMORY_LABEL} before import {baseline:.1f} MiB."
+            )
+
+            with transaction.atomic():
+                result = import_ledger(path, batch_size=options["batch_size"])
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result} After import, {PEAK_MEMORY_LABEL} {peak_memory_mb():.1f} MiB "
+                f"(+{peak_memory_mb() - baseline:.1f} MiB during import)."
+            )
+        )
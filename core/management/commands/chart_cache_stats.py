@@ -0,0 +1,29 @@
+"""Report how often the order charts were served from the chart cache."""
+
+from django.core.management.base import BaseCommand
+
+from core.charts import chart_cache_stats, reset_chart_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the number of order chart payloads served from the shared cache "
+        "(hits) and computed (misses) since the counters were last reset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters after printing them."
+        )
+
+    def handle(self, *args, **options):
+        stats = chart_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        hit_rate = f"{stats['hits'] / total:.1%}" if total else "n/a"
+        self.stdout.write(
+            f"Chart cache: {stats['hits']:,} hits, {stats['misses']:,} misses "
+            f"(hit rate {hit_rate})."
+        )
+        if options["reset"]:
+            reset_chart_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Reset the chart cache counters."))
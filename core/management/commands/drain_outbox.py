@@ -0,0 +1,61 @@
+"""Deliver the notifications recorded in the outbox, and the low-stock digests."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notification_services import flush_low_stock_digest
+from core.outbox import OUTBOX_BATCH_SIZE, drain_batch, outbox_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Process the notification outbox in batches, polling it for new messages, "
+        "and report the queue lag. Also sends the low-stock digest when one is due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the outbox is empty instead of polling for new messages.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty outbox.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help="Number of messages claimed at a time.",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Report the number of pending messages and the queue lag, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            stats = outbox_stats()
+            self.stdout.write(
+                f"{stats['pending']:,} pending messages, {stats['dead']:,} no longer "
+                f"retried; queue lag {stats['lag']:.1f}s."
+            )
+            return
+
+        while True:
+            result = drain_batch(options["batch_size"])
+            if flush_low_stock_digest():
+                self.stdout.write(self.style.SUCCESS("Sent a low-stock digest."))
+            if not (result.processed or result.failed):
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+
+            style = self.style.ERROR if result.failed else self.style.SUCCESS
+            self.stdout.write(style(str(result)))
@@ -2,14 +2,27 @@
 
 from django.core.management.base import BaseCommand
 
+from core.models import Item
 from core.notification_services import generate_expiration_notifications
 
 
 class Command(BaseCommand):
     help = "Generate idempotent expiration notifications for available inventory."
 
-    def handle(self, *args, **options):
-        delivered = generate_expiration_notifications()
-        self.stdout.write(
-            self.style.SUCCESS(f"Delivered {delivered} expiration notifications.")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reschedule",
+            action="store_true",
+            help=(
+                "Schedule every available item from its first expiration milestone "
+                "again before generating, for example after items were changed "
+                "directly in the database."
+            ),
         )
+
+    def handle(self, *args, **options):
+        if options["reschedule"]:
+            rescheduled = Item.reschedule_expiration_alerts()
+            self.stdout.write(f"Rescheduled {rescheduled:,} items.")
+        result = generate_expiration_notifications()
+        self.stdout.write(self.style.SUCCESS(str(result)))
@@ -0,0 +1,16 @@
+"""Rebuild the monthly order rollups used by the order charts."""
+
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_order_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every monthly order rollup from the orders, for example after "
+        "orders were changed directly in the database."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_order_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count:,} order rollups."))
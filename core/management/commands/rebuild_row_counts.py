@@ -0,0 +1,17 @@
+"""Recount the rows shown on the home page."""
+
+from django.core.management.base import BaseCommand
+
+from core.models import COUNTED_MODELS, TableRowCount
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the rows of every model shown on the home page again, for example "
+        "after rows were inserted or deleted directly in the database."
+    )
+
+    def handle(self, *args, **options):
+        for table, rows in TableRowCount.rebuild(*COUNTED_MODELS).items():
+            self.stdout.write(f"{table}: {rows:,} rows")
+        self.stdout.write(self.style.SUCCESS("Rebuilt the row counts."))
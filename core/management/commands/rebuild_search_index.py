@@ -0,0 +1,19 @@
+"""Rebuild the full-text search indexes."""
+
+from django.core.management.base import BaseCommand
+
+from core.search import install_search_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate any missing full-text search indexes or sync triggers and rebuild "
+        "every index from its table. Only applies to SQLite databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        install_search_indexes(using=options["database"], rebuild=True)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the search indexes."))
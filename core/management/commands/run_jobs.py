@@ -0,0 +1,41 @@
+"""Run queued imports and exports."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import claim_next_job, requeue_interrupted_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued import and export jobs, polling the job table for new work."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_interrupted_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} interrupted jobs.")
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+
+            job = run_job(job)
+            style = self.style.SUCCESS if job.status == job.Status.SUCCEEDED else self.style.ERROR
+            self.stdout.write(style(f"{job}: {job.message}"))
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:18
+
+import datetime
+import hashlib
+
+from django.db import migrations, models
+
+
+# Frozen copies of Order.FINGERPRINT_DATE_FORMAT and core.models.ledger_fingerprint as of this migration.
+FINGERPRINT_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def ledger_fingerprint(*parts) -> str:
+    joined = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha256(joined.encode()).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Order = apps.get_model("core", "Order")
+    batch = []
+    orders = Order.objects.select_related("item").only(
+        "po_no", "po_date", "vend_cat", "recv_qty", "item__item_no"
+    )
+    for order in orders.iterator(chunk_size=2000):
+        po_date = order.po_date.astimezone(datetime.timezone.utc).strftime(
+            FINGERPRINT_DATE_FORMAT
+        )
+        order.fingerprint = ledger_fingerprint(
+            order.po_no, order.item.item_no, po_date, order.vend_cat, order.recv_qty
+        )
+        batch.append(order)
+        if len(batch) == 2000:
+            Order.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    Order.objects.bulk_update(batch, ["fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_notificationevent_remove_item_par_level_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def order_month(po_date):
+    """Frozen copy of core.rollups.order_month as of this migration."""
+    if timezone.is_aware(po_date):
+        po_date = timezone.localtime(po_date)
+    return po_date.date().replace(day=1)
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model("core", "Order")
+    OrderRollup = apps.get_model("core", "OrderRollup")
+    totals = (
+        Order.objects.annotate(month=TruncMonth("po_date"))
+        .values("month", "item_id")
+        .annotate(
+            order_count=Count("id"),
+            total_cost=Sum("total_cost"),
+            quantity=Sum("recv_qty"),
+        )
+        .order_by()
+    )
+    OrderRollup.objects.bulk_create(
+        (
+            OrderRollup(
+                month=order_month(row["month"]),
+                item_id=row["item_id"],
+                order_count=row["order_count"],
+                total_cost=row["total_cost"] or 0,
+                quantity=row["quantity"] or 0,
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_tableversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='po_date',
+            field=models.DateTimeField(db_index=True, verbose_name='PO_DATE'),
+        ),
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_rollups', to='core.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'item', 'order_count', 'total_cost'], name='order_rollup_totals_idx')],
+                'constraints': [models.UniqueConstraint(fields=('month', 'item'), name='one_order_rollup_per_item_month')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_orderrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerDateBounds',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('earliest', models.DateTimeField(blank=True, null=True)),
+                ('latest', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+COUNTED_MODELS = ("Device", "Item", "Order", "ItemTransaction", "WasteReversalRequest")
+
+
+def count_rows(apps, schema_editor):
+    TableRowCount = apps.get_model("core", "TableRowCount")
+    TableRowCount.objects.bulk_create(
+        TableRowCount(
+            table=model._meta.db_table, rows=model.objects.count()
+        )
+        for model in (apps.get_model("core", name) for name in COUNTED_MODELS)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_ledgerdatebounds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableRowCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('rows', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:51
+
+import datetime
+
+from django.db import migrations, models
+
+
+# The longest interval in Item.EXPIRATION_INTERVALS when this migration was written.
+FIRST_EXPIRATION_INTERVAL = datetime.timedelta(days=30)
+
+
+def schedule_expiration_alerts(apps, schema_editor):
+    Item = apps.get_model("core", "Item")
+    scheduled = Item.objects.filter(is_available=True, exp_date__isnull=False)
+    for exp_date in scheduled.order_by().values_list("exp_date", flat=True).distinct():
+        scheduled.filter(exp_date=exp_date).update(
+            next_expiration_alert=exp_date - FIRST_EXPIRATION_INTERVAL
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_tablerowcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='next_expiration_alert',
+            field=models.DateField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(schedule_expiration_alerts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+BROADCAST_KINDS = ("low_stock", "expiring_item", "expired_item")
+
+
+def merge_broadcasts(apps, schema_editor):
+    """Keeps one row of each low-stock and expiration event as its broadcast, moving the recipients' read and dismissed state to NotificationStates.
+
+    Only events delivered to every currently active user are merged, so a broadcast is not shown to users who were
+    inactive when its event was delivered. Other events keep their per-user rows.
+    """
+    Notification = apps.get_model("core", "Notification")
+    NotificationState = apps.get_model("core", "NotificationState")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    active_user_ids = set(
+        User.objects.filter(is_active=True).values_list("pk", flat=True)
+    )
+    fanned_out = Notification.objects.filter(
+        kind__in=BROADCAST_KINDS, recipient__isnull=False
+    )
+    event_keys = list(
+        fanned_out.order_by().values_list("event_key", flat=True).distinct()
+    )
+    for event_key in event_keys:
+        rows = list(
+            fanned_out.filter(event_key=event_key)
+            .order_by("pk")
+            .values("pk", "recipient_id", "read_at", "dismissed_at")
+        )
+        if not active_user_ids <= {row["recipient_id"] for row in rows}:
+            continue
+        broadcast_id = rows[0]["pk"]
+        NotificationState.objects.bulk_create(
+            NotificationState(
+                notification_id=broadcast_id,
+                user_id=row["recipient_id"],
+                read_at=row["read_at"],
+                dismissed_at=row["dismissed_at"],
+            )
+            for row in rows
+            if row["read_at"] or row["dismissed_at"]
+        )
+        Notification.objects.filter(pk__in=[row["pk"] for row in rows[1:]]).delete()
+        Notification.objects.filter(pk=broadcast_id).update(
+            recipient=None, read_at=None, dismissed_at=None
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_item_next_expiration_alert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('dismissed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='recipient',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('recipient__isnull', True)), fields=('event_key',), name='one_broadcast_per_event'),
+        ),
+        migrations.AddField(
+            model_name='notificationstate',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='states', to='core.notification'),
+        ),
+        migrations.AddField(
+            model_name='notificationstate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='notification_states', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationstate',
+            constraint=models.UniqueConstraint(fields=('notification', 'user'), name='one_state_per_user_notification'),
+        ),
+        migrations.RunPython(merge_broadcasts, migrations.RunPython.noop),
+    ]
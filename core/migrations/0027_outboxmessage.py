@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(choices=[('low_stock', 'Low Stock'), ('waste_reversal_requested', 'Waste Reversal Requested'), ('waste_reversal_reviewed', 'Waste Reversal Reviewed'), ('resolve_expiration', 'Resolve Expiration Alerts')], max_length=40)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('available_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, null=True)),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_change', to='core.device')),
+            ],
+        ),
+    ]
@@ -1,8 +1,12 @@
 """Defines models used across the Core app."""
 
+import datetime
+import hashlib
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.utils import timezone
 from djmoney.models.fields import MoneyField
 
@@ -48,6 +52,68 @@ class Item(models.Model):
         max_length=200,
         default="https://accessgudid.nlm.nih.gov/resources/developers/v3/device_lookup_api",
     )
+    # Days before an item's expiration date at which its expiration alerts are sent. It is also alerted on the day it expires.
+    EXPIRATION_INTERVALS = (1, 7, 14, 30)
+    # The date on which the expiration scheduler next checks this item, or None if it will not need an alert.
+    next_expiration_alert = models.DateField(null=True, editable=False, db_index=True)
+
+    def expiration_milestones(self) -> list[datetime.date]:
+        """
+        Gets the dates on which the :class:`~core.models.Item` reaches each expiration milestone.
+
+        Returns:
+            list[datetime.date]: One date per ``EXPIRATION_INTERVALS`` day count before `exp_date`, and `exp_date`
+            itself, earliest first.
+        """
+        return [
+            self.exp_date - datetime.timedelta(days=interval)
+            for interval in sorted((0, *self.EXPIRATION_INTERVALS), reverse=True)
+        ]
+
+    def schedule_expiration_alert(self, after: datetime.date | None = None) -> datetime.date | None:
+        """
+        Sets `next_expiration_alert` to the date of the next expiration milestone, without saving.
+
+        Args:
+            after (datetime.date, optional): The last date the scheduler checked the item on. Defaults to none, in which
+                case the item is scheduled from its first milestone, and checked on the next run if it already passed it.
+
+        Returns:
+            datetime.date: The new `next_expiration_alert`, or ``None`` if the item is unavailable, has no expiration
+            date, or has reached all its milestones.
+        """
+        self.next_expiration_alert = None
+        if self.is_available and self.exp_date is not None:
+            self.next_expiration_alert = next(
+                (
+                    milestone
+                    for milestone in self.expiration_milestones()
+                    if after is None or milestone > after
+                ),
+                None,
+            )
+        return self.next_expiration_alert
+
+    @classmethod
+    def reschedule_expiration_alerts(cls) -> int:
+        """
+        Schedules every :class:`~core.models.Item` from its first expiration milestone again, with one ``UPDATE`` per
+        distinct expiration date, for items written without their save signals (such as with ``bulk_create``).
+
+        Returns:
+            int: The number of available items with an expiration date.
+        """
+        first_interval = datetime.timedelta(days=max(cls.EXPIRATION_INTERVALS))
+        scheduled = cls.objects.filter(is_available=True, exp_date__isnull=False)
+        cls.objects.exclude(pk__in=scheduled.values("pk")).exclude(
+            next_expiration_alert=None
+        ).update(next_expiration_alert=None)
+        rescheduled = 0
+        for exp_date in scheduled.order_by().values_list("exp_date", flat=True).distinct():
+            rescheduled += scheduled.filter(exp_date=exp_date).update(
+                next_expiration_alert=exp_date - first_interval
+            )
+        return rescheduled
 
     @property
     def quantity(self):
@@ -67,11 +133,27 @@ class Item(models.Model):
         return self.item
 
 
+def ledger_fingerprint(*parts) -> str:
+    """
+    Builds the stable hash used to recognize a ledger row that was already imported.
+
+    Args:
+        *parts: The PO_NO, ITEM_NO, PO_DATE (UTC, ISO 8601 without offset), VEND CAT and RECV QTY values of the row.
+
+    Returns:
+        str: The hex SHA-256 digest of the values, with ``None`` treated as an empty string.
+    """
+    joined = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha256(joined.encode()).hexdigest()
+
+
 class Order(models.Model):
     """
     Defines an :class:`~core.models.Order` model representing an order for an :class:`~core.models.Item` in inventory.
     """
 
+    FINGERPRINT_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
     item = models.ForeignKey(Item, on_delete=models.PROTECT)
     vendor = models.CharField("VENDOR", max_length=200)
     vend_cat = models.CharField("VEND CAT", max_length=200)
@@ -90,12 +172,37 @@ class Order(models.Model):
     )
     expr1010 = models.CharField("Expr1010", max_length=200)
     po_no = models.CharField("PO_NO", max_length=200)
-    po_date = models.DateTimeField("PO_DATE")
+    po_date = models.DateTimeField("PO_DATE", db_index=True)
     vend_code = models.CharField("VEND_CODE", max_length=200)
     dbo_vend_name = models.CharField("dbo_VEND.NAME", max_length=200)
     dbo_cc_name = models.CharField("dbo_CC.NAME", max_length=200)
     acct_no = models.IntegerField("ACCT_NO", default=0)
     rcv_date = models.DateTimeField("RCV_DATE", null=True, blank=True)
+    fingerprint = models.CharField(
+        max_length=64, blank=True, editable=False, db_index=True
+    )
+
+    def compute_fingerprint(self) -> str:
+        """
+        Computes the :func:`~core.models.ledger_fingerprint` of this :class:`~core.models.Order`, matching the one computed on import.
+
+        Returns:
+            str: The fingerprint of the ledger row this :class:`~core.models.Order` represents.
+        """
+        po_date = self.po_date
+        if po_date is not None:
+            if timezone.is_aware(po_date):
+                po_date = po_date.astimezone(datetime.timezone.utc)
+            po_date = po_date.strftime(self.FINGERPRINT_DATE_FORMAT)
+        return ledger_fingerprint(
+            self.po_no, self.item.item_no, po_date, self.vend_cat, self.recv_qty
+        )
+
+    def save(self, *args, **kwargs):
+        """Keeps the fingerprint in step with the fields it is computed from on full saves."""
+        if kwargs.get("update_fields") is None:
+            self.fingerprint = self.compute_fingerprint()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """
@@ -260,7 +367,13 @@ class NotificationEvent(models.Model):
 
 
 class Notification(models.Model):
-    """A persistent in-app notification delivered to one user."""
+    """
+    A persistent in-app notification delivered to one user, or broadcast to every user.
+
+    Broadcasts (the ``BROADCAST_KINDS``) are stored once, without a `recipient`, and shown to every user who joined
+    before they were created. Each user's read and dismissed state of a broadcast is kept in a
+    :class:`~core.models.NotificationState`, created only once the user acts on it.
+    """
 
     class Kind(models.TextChoices):
         LOW_STOCK = "low_stock", "Low Stock"
@@ -284,8 +397,12 @@ class Notification(models.Model):
         WARNING = "warning", "Warning"
         CRITICAL = "critical", "Critical"
 
+    BROADCAST_KINDS = (Kind.LOW_STOCK, Kind.EXPIRING_ITEM, Kind.EXPIRED_ITEM)
+
     recipient = models.ForeignKey(
         settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
         on_delete=models.PROTECT,
         related_name="notifications",
     )
@@ -336,7 +453,12 @@ class Notification(models.Model):
             models.UniqueConstraint(
                 fields=["recipient", "event_key"],
                 name="one_notification_per_user_event",
-            )
+            ),
+            models.UniqueConstraint(
+                fields=["event_key"],
+                condition=models.Q(recipient__isnull=True),
+                name="one_broadcast_per_event",
+            ),
         ]
         indexes = [
             models.Index(
@@ -346,4 +468,320 @@ class Notification(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.recipient}: {self.title}"
+        return f"{self.recipient or 'Everyone'}: {self.title}"
+
+
+class NotificationState(models.Model):
+    """A user's read and dismissed state of a broadcast :class:`~core.models.Notification`."""
+
+    notification = models.ForeignKey(
+        Notification, on_delete=models.CASCADE, related_name="states"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name="notification_states",
+    )
+    read_at = models.DateTimeField(null=True, blank=True)
+    dismissed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["notification", "user"],
+                name="one_state_per_user_notification",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.notification.title}"
+
+
+class LowStockChange(models.Model):
+    """A :class:`~core.models.Device` that crossed its low-stock threshold since the last low-stock digest was sent."""
+
+    device = models.OneToOneField(
+        Device, on_delete=models.CASCADE, related_name="low_stock_change"
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.device} changed at {self.changed_at}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Notification work recorded in the transaction that caused it, and done later by the ``drain_outbox`` worker
+    (see :mod:`core.outbox`), so requests do not wait for notifications to be delivered.
+    """
+
+    class Task(models.TextChoices):
+        LOW_STOCK = "low_stock", "Low Stock"
+        WASTE_REVERSAL_REQUESTED = (
+            "waste_reversal_requested",
+            "Waste Reversal Requested",
+        )
+        WASTE_REVERSAL_REVIEWED = "waste_reversal_reviewed", "Waste Reversal Reviewed"
+        RESOLVE_EXPIRATION = "resolve_expiration", "Resolve Expiration Alerts"
+
+    task = models.CharField(max_length=40, choices=Task.choices)
+    params = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When a worker may next claim the message, or None once it has failed too many times to be retried.
+    available_at = models.DateTimeField(default=timezone.now, null=True, db_index=True)
+    claim = models.CharField(max_length=32, blank=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.get_task_display()} #{self.pk}"
+
+
+class Job(models.Model):
+    """A long-running import or export, queued by a request and run by the ``run_jobs`` worker."""
+
+    class Kind(models.TextChoices):
+        IMPORT_ORDERS = "import_orders", "Import Orders"
+        EXPORT_ORDERS = "export_orders", "Export Orders"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    kind = models.CharField(max_length=40, choices=Kind.choices)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.QUEUED, db_index=True
+    )
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.CharField(max_length=255, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+
+class OrderRollup(models.Model):
+    """
+    Totals of the :class:`Orders <core.models.Order>` of one :class:`~core.models.Item` in one month, kept up to date
+    by :mod:`core.rollups` so the order charts do not aggregate every order.
+    """
+
+    # First day of the month, in the project time zone.
+    month = models.DateField()
+    item = models.ForeignKey(
+        Item, on_delete=models.CASCADE, related_name="order_rollups"
+    )
+    order_count = models.PositiveIntegerField(default=0)
+    total_cost = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    quantity = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "item"], name="one_order_rollup_per_item_month"
+            )
+        ]
+        indexes = [
+            # Covers the chart queries, which sum a range of months without reading the table.
+            models.Index(
+                fields=["month", "item", "order_count", "total_cost"],
+                name="order_rollup_totals_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.item} {self.month:%B %Y}: {self.order_count} orders"
+
+
+class TableVersion(models.Model):
+    """
+    Counts writes to a table, so results derived from it (such as cached exports) can tell when they are stale.
+
+    Besides tables, a counter can track a narrower kind of write under a name of its own, such as edits to only
+    some fields of a table.
+    """
+
+    table = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    @staticmethod
+    def _name(table) -> str:
+        return table if isinstance(table, str) else table._meta.db_table
+
+    @classmethod
+    def bump(cls, *tables) -> None:
+        """Records a write to `tables`, given as model classes or counter names."""
+        tables = [cls._name(table) for table in tables]
+        updated = cls.objects.filter(table__in=tables).update(
+            version=models.F("version") + 1
+        )
+        if updated < len(tables):
+            existing = set(
+                cls.objects.filter(table__in=tables).values_list("table", flat=True)
+            )
+            cls.objects.bulk_create(
+                [cls(table=table, version=1) for table in tables if table not in existing],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def token(cls, *tables) -> str:
+        """
+        Gets a token that changes whenever rows of `tables`, given as model classes or counter names, are written.
+
+        Combines each table's write counter with its largest id, so that rows written without
+        :meth:`bump` (such as bulk inserts) also change the token.
+        """
+        versions = dict(
+            cls.objects.filter(
+                table__in=[cls._name(table) for table in tables]
+            ).values_list("table", "version")
+        )
+        parts = []
+        for table in tables:
+            name = cls._name(table)
+            part = f"{name}:{versions.get(name, 0)}"
+            if not isinstance(table, str):
+                max_id = table.objects.aggregate(max_id=models.Max("id"))["max_id"]
+                part += f":{max_id or 0}"
+            parts.append(part)
+        return "|".join(parts)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class LedgerDateBounds(models.Model):
+    """The earliest and latest date of a ledger table, so date pickers and quarter lists never scan the table."""
+
+    table = models.CharField(max_length=100, unique=True)
+    earliest = models.DateTimeField(null=True, blank=True)
+    latest = models.DateTimeField(null=True, blank=True)
+
+    @staticmethod
+    def date_field(model_class) -> str:
+        """Gets the name of the field that dates the rows of `model_class`."""
+        return {Order: "po_date", ItemTransaction: "timestamp"}[model_class]
+
+    @classmethod
+    def recompute(cls, model_class) -> "LedgerDateBounds":
+        """Reads the bounds of `model_class` from its table."""
+        field = cls.date_field(model_class)
+        dates = model_class.objects.aggregate(
+            earliest=models.Min(field), latest=models.Max(field)
+        )
+        bounds, _ = cls.objects.update_or_create(
+            table=model_class._meta.db_table, defaults=dates
+        )
+        return bounds
+
+    @classmethod
+    def bounds(cls, model_class) -> tuple:
+        """
+        Gets the earliest and latest date of `model_class`, reading them from its table the first time.
+
+        Returns:
+            tuple: The earliest and latest date, or ``(None, None)`` if the table is empty.
+        """
+        bounds = cls.objects.filter(table=model_class._meta.db_table).first()
+        if bounds is None:
+            bounds = cls.recompute(model_class)
+        return bounds.earliest, bounds.latest
+
+    @classmethod
+    def widen(cls, model_class, earliest, latest) -> None:
+        """Records rows of `model_class` dated between `earliest` and `latest` being written."""
+        earliest, latest = models.Value(earliest), models.Value(latest)
+        updated = cls.objects.filter(table=model_class._meta.db_table).update(
+            # The bounds of an empty table are null, which Least and Greatest return as null.
+            earliest=Coalesce(Least("earliest", earliest), earliest),
+            latest=Coalesce(Greatest("latest", latest), latest),
+        )
+        if not updated:
+            cls.recompute(model_class)
+
+    @classmethod
+    def forget(cls, model_class, date) -> None:
+        """Records a row of `model_class` dated `date` being deleted, reading the bounds again if it was on one."""
+        earliest, latest = cls.bounds(model_class)
+        if earliest is None or date <= earliest or date >= latest:
+            cls.recompute(model_class)
+
+    def __str__(self):
+        return f"{self.table}: {self.earliest} to {self.latest}"
+
+
+class TableRowCount(models.Model):
+    """The number of rows in a table, adjusted as rows are inserted and deleted so pages can show it without counting."""
+
+    table = models.CharField(max_length=100, unique=True)
+    rows = models.BigIntegerField(default=0)
+
+    @classmethod
+    def rebuild(cls, *model_classes) -> dict:
+        """Counts the rows of `model_classes` again, returning the count of each table."""
+        rows = {}
+        for model_class in model_classes:
+            counter, _ = cls.objects.update_or_create(
+                table=model_class._meta.db_table,
+                defaults={"rows": model_class.objects.count()},
+            )
+            rows[counter.table] = counter.rows
+        return rows
+
+    @classmethod
+    def adjust(cls, model_class, change: int) -> None:
+        """Records `change` rows being inserted into (or, if negative, deleted from) the table of `model_class`."""
+        updated = cls.objects.filter(table=model_class._meta.db_table).update(
+            rows=models.F("rows") + change
+        )
+        if not updated:
+            cls.rebuild(model_class)
+
+    @classmethod
+    def counts(cls, *model_classes) -> dict:
+        """
+        Gets the number of rows of each of `model_classes` in one query, counting any table not counted before.
+
+        Returns:
+            dict: The row count of each model class.
+        """
+        rows = dict(
+            cls.objects.filter(
+                table__in=[model_class._meta.db_table for model_class in model_classes]
+            ).values_list("table", "rows")
+        )
+        missing = [
+            model_class for model_class in model_classes if model_class._meta.db_table not in rows
+        ]
+        if missing:
+            rows.update(cls.rebuild(*missing))
+        return {
+            model_class: rows[model_class._meta.db_table] for model_class in model_classes
+        }
+
+    def __str__(self):
+        return f"{self.table}: {self.rows} rows"
+
+
+# The models whose rows are counted in TableRowCount, as shown on the home page.
+COUNTED_MODELS = (Device, Item, Order, ItemTransaction, WasteReversalRequest)
@@ -1,23 +1,208 @@
-"""Creation and lifecycle services for persistent in-app notifications."""
+"""Creation and lifecycle services for persistent in-app notifications.
+
+Low-stock and expiration alerts are broadcasts: each is stored once and merged into every user's inbox by
+:func:`inbox`, with the read and dismissed state of each user kept in a sparse
+:class:`~core.models.NotificationState`. Other notifications are stored once per recipient.
+
+The notification menu shown on every page reads a per-user inbox summary (the unread count and the most recent
+notifications) from the ``shared`` cache, so that every worker process can serve it without querying. Each service
+and view that changes a user's notifications drops that user's summary with :func:`invalidate_inboxes`, and changes to
+broadcasts drop every summary at once with :func:`invalidate_broadcasts`.
+"""
 
 import datetime
+import time
+import uuid
+from dataclasses import dataclass
 from urllib.parse import urlencode
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.db import transaction
+from django.db.models import F, FilteredRelation, Min, Q
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 
 from .models import (
     Device,
     Item,
+    LowStockChange,
     Notification,
     NotificationEvent,
+    NotificationState,
     WasteReversalRequest,
 )
 
 
-EXPIRATION_INTERVALS = (1, 7, 14, 30)
+# Due items handled per transaction when generating expiration alerts.
+EXPIRATION_BATCH_SIZE = 1_000
+INBOX_CACHE_ALIAS = "shared"
+# Changed whenever a broadcast is delivered or resolved, so every cached inbox summary is stale.
+BROADCAST_VERSION_KEY = "notifications:broadcasts"
+# Number of notifications listed in the notification menu.
+INBOX_RECENT_LIMIT = 5
+LOW_STOCK_DIGEST_PREFIX = "low-stock-digest:"
+
+
+def inbox(user):
+    """
+    Gets the notifications shown to `user`: their own, and the broadcasts created since they joined.
+
+    Args:
+        user: An authenticated user.
+
+    Returns:
+        QuerySet: The :class:`Notifications <core.models.Notification>`, annotated with ``inbox_read_at`` and
+        ``inbox_dismissed_at``, when `user` read and dismissed each of them.
+    """
+    return Notification.objects.filter(
+        Q(recipient=user) | Q(recipient__isnull=True, created_at__gte=user.date_joined)
+    ).annotate(
+        user_state=FilteredRelation("states", condition=Q(states__user=user)),
+        inbox_read_at=Coalesce("read_at", "user_state__read_at"),
+        inbox_dismissed_at=Coalesce("dismissed_at", "user_state__dismissed_at"),
+    )
+
+
+def _inbox_cache_key(user_id: int) -> str:
+    return f"notifications:inbox:{user_id}"
+
+
+def inbox_summary(user) -> dict:
+    """
+    Gets the notification menu of `user`, reading it from the database only if it is not cached.
+
+    Args:
+        user: An authenticated user.
+
+    Returns:
+        dict: ``unread_count``, the number of unread notifications, and ``recent``, the most recent notifications
+        as dictionaries of their ``title``, ``severity``, ``target_url``, ``read_at`` and ``resolved_at``.
+    """
+    cache = caches[INBOX_CACHE_ALIAS]
+    key = _inbox_cache_key(user.pk)
+    cached = cache.get_many([key, BROADCAST_VERSION_KEY])
+    broadcast_version = cached.get(BROADCAST_VERSION_KEY)
+    summary = cached.get(key)
+    if broadcast_version is None:
+        # A new version, so summaries cached before the version was evicted are not reused.
+        broadcast_version = uuid.uuid4().hex
+        if not cache.add(BROADCAST_VERSION_KEY, broadcast_version, None):
+            broadcast_version = cache.get(BROADCAST_VERSION_KEY)
+    if summary is None or summary["broadcast_version"] != broadcast_version:
+        visible = inbox(user).filter(inbox_dismissed_at__isnull=True)
+        summary = {
+            "broadcast_version": broadcast_version,
+            "unread_count": visible.filter(inbox_read_at__isnull=True).count(),
+            "recent": [
+                {
+                    "title": title,
+                    "severity": severity,
+                    "target_url": target_url,
+                    "read_at": read_at,
+                    "resolved_at": resolved_at,
+                }
+                for title, severity, target_url, read_at, resolved_at in visible.values_list(
+                    "title", "severity", "target_url", "inbox_read_at", "resolved_at"
+                )[:INBOX_RECENT_LIMIT]
+            ],
+        }
+        cache.set(key, summary, settings.NOTIFICATION_INBOX_TIMEOUT)
+    return summary
+
+
+def invalidate_inboxes(user_ids) -> None:
+    """
+    Drops the cached inbox summaries of `user_ids`, after their notifications were changed.
+
+    The summaries are dropped again once the current transaction commits, in case another request cached one
+    from the data before the change.
+    """
+    keys = [_inbox_cache_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    cache = caches[INBOX_CACHE_ALIAS]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_broadcasts() -> None:
+    """Makes every cached inbox summary stale, after broadcasts were delivered or resolved, now and on commit."""
+    cache = caches[INBOX_CACHE_ALIAS]
+
+    def new_version():
+        cache.set(BROADCAST_VERSION_KEY, uuid.uuid4().hex, None)
+
+    new_version()
+    transaction.on_commit(new_version)
+
+
+def _update_inbox(user, notifications, **state) -> int:
+    """
+    Sets `state` (``read_at`` and ``dismissed_at``) of `notifications` in `user`'s inbox.
+
+    The user's own notifications are updated in place, and their state of broadcasts is inserted or updated in
+    :class:`~core.models.NotificationState`.
+
+    Returns:
+        int: The number of notifications changed.
+    """
+    own_ids = []
+    broadcast_ids = []
+    for pk, recipient_id in notifications.values_list("pk", "recipient_id"):
+        (broadcast_ids if recipient_id is None else own_ids).append(pk)
+    if own_ids:
+        Notification.objects.filter(pk__in=own_ids).update(**state)
+    if broadcast_ids:
+        NotificationState.objects.bulk_create(
+            [
+                NotificationState(notification_id=pk, user=user, **state)
+                for pk in broadcast_ids
+            ],
+            update_conflicts=True,
+            unique_fields=["notification", "user"],
+            update_fields=list(state),
+        )
+    changed = len(own_ids) + len(broadcast_ids)
+    if changed:
+        invalidate_inboxes([user.pk])
+    return changed
+
+
+def mark_notification_read(user, notification_id: int) -> int:
+    return _update_inbox(
+        user,
+        inbox(user).filter(
+            pk=notification_id,
+            inbox_dismissed_at__isnull=True,
+            inbox_read_at__isnull=True,
+        ),
+        read_at=timezone.now(),
+    )
+
+
+def dismiss_notifications(user, notification_id: int | None = None) -> int:
+    """Dismisses the notification `notification_id` in `user`'s inbox, or all of them if it is ``None``."""
+    notifications = inbox(user).filter(inbox_dismissed_at__isnull=True)
+    if notification_id is not None:
+        notifications = notifications.filter(pk=notification_id)
+    now = timezone.now()
+    return _update_inbox(user, notifications, read_at=now, dismissed_at=now)
+
+
+def _resolve_notifications(notifications) -> int:
+    """Marks `notifications` resolved, dropping the inbox summaries of their recipients."""
+    recipient_ids = set(
+        notifications.order_by().values_list("recipient_id", flat=True).distinct()
+    )
+    resolved = notifications.update(resolved_at=timezone.now())
+    if None in recipient_ids:
+        recipient_ids.discard(None)
+        invalidate_broadcasts()
+    invalidate_inboxes(recipient_ids)
+    return resolved
 
 
 def _item_url(item: Item) -> str:
@@ -46,9 +231,22 @@ def _deliver_event(*, recipients, event_key: str, **notification_data) -> int:
             ],
             ignore_conflicts=True,
         )
+        invalidate_inboxes(recipient_ids)
         return len(recipient_ids)
 
 
+def _broadcast_event(*, event_key: str, **notification_data) -> int:
+    """Idempotently deliver one event to every user, as a single broadcast notification."""
+    with transaction.atomic():
+        _, event_created = NotificationEvent.objects.get_or_create(event_key=event_key)
+        if not event_created:
+            return 0
+
+        Notification.objects.create(event_key=event_key, **notification_data)
+        invalidate_broadcasts()
+        return 1
+
+
 def _all_active_users():
     return get_user_model().objects.filter(is_active=True)
 
@@ -61,21 +259,33 @@ def notify_low_stock_state_change(
     event_key: str,
     actor_id: int | None = None,
 ) -> int:
-    """Create a threshold-crossing alert or resolve prior low-stock alerts."""
+    """
+    Create a threshold-crossing alert or resolve prior low-stock alerts.
+
+    When ``LOW_STOCK_DIGEST_INTERVAL`` is set, the crossing is only recorded as a
+    :class:`~core.models.LowStockChange`, and :func:`flush_low_stock_digest` alerts about it later.
+    """
     if was_low == is_low:
         return 0
 
+    if settings.LOW_STOCK_DIGEST_INTERVAL:
+        # Keeps the time of the device's first crossing since the last digest.
+        LowStockChange.objects.get_or_create(device_id=device_id)
+        if is_low:
+            return 0
+
     if not is_low:
-        Notification.objects.filter(
-            device_id=device_id,
-            kind=Notification.Kind.LOW_STOCK,
-            resolved_at__isnull=True,
-        ).update(resolved_at=timezone.now())
+        _resolve_notifications(
+            Notification.objects.filter(
+                device_id=device_id,
+                kind=Notification.Kind.LOW_STOCK,
+                resolved_at__isnull=True,
+            )
+        )
         return 0
 
     device = Device.objects.get(pk=device_id)
-    return _deliver_event(
-        recipients=_all_active_users(),
+    return _broadcast_event(
         event_key=event_key,
         kind=Notification.Kind.LOW_STOCK,
         severity=Notification.Severity.WARNING,
@@ -90,6 +300,69 @@ def notify_low_stock_state_change(
     )
 
 
+def flush_low_stock_digest(now=None) -> int:
+    """
+    Sends a low-stock digest, listing every device currently at or below its threshold, once the first threshold
+    crossing since the last digest is ``LOW_STOCK_DIGEST_INTERVAL`` seconds old.
+
+    Crossings are therefore buffered for a full interval, and digests are at least an interval apart. The digest's
+    event key is the time of that first crossing, so concurrent workers send it once. The new digest resolves the
+    previous one, and is not sent if no device is low any more.
+
+    Args:
+        now (optional): The time of the flush. Defaults to the current time.
+
+    Returns:
+        int: 1 if a digest was sent, otherwise 0.
+    """
+    interval = settings.LOW_STOCK_DIGEST_INTERVAL
+    now = now or timezone.now()
+    if not interval:
+        return 0
+    changes = LowStockChange.objects.filter(changed_at__lte=now)
+    first_change = changes.aggregate(first_change=Min("changed_at"))["first_change"]
+    if first_change is None or (now - first_change).total_seconds() < interval:
+        return 0
+
+    event_key = f"{LOW_STOCK_DIGEST_PREFIX}{first_change.isoformat()}"
+    with transaction.atomic():
+        _, event_created = NotificationEvent.objects.get_or_create(event_key=event_key)
+        if not event_created:
+            return 0
+
+        _resolve_notifications(
+            Notification.objects.filter(
+                event_key__startswith=LOW_STOCK_DIGEST_PREFIX, resolved_at__isnull=True
+            )
+        )
+        low_devices = list(
+            Device.objects.filter(current_count__lte=F("low_stock_threshold")).order_by(
+                "device_name", "pk"
+            )
+        )
+        changes.delete()
+        if not low_devices:
+            return 0
+
+        Notification.objects.create(
+            event_key=event_key,
+            kind=Notification.Kind.LOW_STOCK,
+            severity=Notification.Severity.WARNING,
+            title=(
+                f"Low stock: {len(low_devices)} device{'s' if len(low_devices) != 1 else ''}"
+            ),
+            message="\n".join(
+                f"{device.device_name or device.device_identifier}: "
+                f"{device.current_count} available, threshold {device.low_stock_threshold}."
+                for device in low_devices
+            ),
+            device=low_devices[0] if len(low_devices) == 1 else None,
+            target_url=reverse("device-details"),
+        )
+        invalidate_broadcasts()
+        return 1
+
+
 def notify_waste_reversal_requested(reversal_request_id: int) -> int:
     reversal_request = WasteReversalRequest.objects.select_related(
         "waste_transaction__item", "requested_by"
@@ -118,10 +391,12 @@ def notify_waste_reversal_reviewed(reversal_request_id: int) -> int:
     ).get(pk=reversal_request_id)
     approved = reversal_request.status == WasteReversalRequest.Status.APPROVED
     status_label = "approved" if approved else "rejected"
-    Notification.objects.filter(
-        event_key=f"waste-reversal-requested:{reversal_request.pk}",
-        resolved_at__isnull=True,
-    ).update(resolved_at=timezone.now())
+    _resolve_notifications(
+        Notification.objects.filter(
+            event_key=f"waste-reversal-requested:{reversal_request.pk}",
+            resolved_at__isnull=True,
+        )
+    )
     kind = (
         Notification.Kind.WASTE_REVERSAL_APPROVED
         if approved
@@ -149,67 +424,153 @@ def notify_waste_reversal_reviewed(reversal_request_id: int) -> int:
 
 
 def resolve_item_expiration_notifications(item_id: int) -> None:
-    Notification.objects.filter(
-        item_id=item_id,
-        kind__in=[Notification.Kind.EXPIRING_ITEM, Notification.Kind.EXPIRED_ITEM],
-        resolved_at__isnull=True,
-    ).update(resolved_at=timezone.now())
+    _resolve_notifications(
+        Notification.objects.filter(
+            item_id=item_id,
+            kind__in=[Notification.Kind.EXPIRING_ITEM, Notification.Kind.EXPIRED_ITEM],
+            resolved_at__isnull=True,
+        )
+    )
+
+
+@dataclass
+class ExpirationResult:
+    """Summary of a run of :func:`generate_expiration_notifications`."""
+
+    items: int = 0
+    events: int = 0
+    recipients: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def delivered(self) -> int:
+        """The number of notifications delivered: each new milestone is broadcast to every active user."""
+        return self.events * self.recipients
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"Checked {self.items:,} due items: {self.events:,} new milestones broadcast "
+            f"to {self.recipients:,} active users in {self.elapsed:.1f}s "
+            f"({self.items_per_second:,.0f} items/sec)."
+        )
+
 
+def _expiration_event(item: Item, today: datetime.date) -> tuple[str, dict] | None:
+    """Gets the event key and notification fields of the milestone `item` has reached, or ``None`` if it has not reached one."""
+    days_remaining = (item.exp_date - today).days
+    if days_remaining <= 0:
+        milestone = 0
+        kind = Notification.Kind.EXPIRED_ITEM
+        severity = Notification.Severity.CRITICAL
+        title = f"Expired item: {item.item_no}"
+        message = f"UDI {item.item_no} expired on {item.exp_date:%Y-%m-%d}."
+    else:
+        milestone = next(
+            (
+                interval
+                for interval in Item.EXPIRATION_INTERVALS
+                if days_remaining <= interval
+            ),
+            None,
+        )
+        if milestone is None:
+            return None
+        kind = Notification.Kind.EXPIRING_ITEM
+        severity = (
+            Notification.Severity.CRITICAL
+            if milestone == 1
+            else Notification.Severity.WARNING
+        )
+        title = f"Item expires within {milestone} day{'s' if milestone != 1 else ''}"
+        message = (
+            f"UDI {item.item_no} expires on {item.exp_date:%Y-%m-%d} "
+            f"({days_remaining} day{'s' if days_remaining != 1 else ''} remaining)."
+        )
 
-def generate_expiration_notifications(*, today=None) -> int:
-    """Generate idempotent expiration milestones for currently available items."""
+    event_key = (
+        f"expiration:item:{item.pk}:date:{item.exp_date.isoformat()}:"
+        f"milestone:{milestone}"
+    )
+    return event_key, {
+        "kind": kind,
+        "severity": severity,
+        "title": title,
+        "message": message,
+        "item_id": item.pk,
+        "device_id": item.device_id,
+        "target_url": _item_url(item),
+    }
+
+
+def generate_expiration_notifications(
+    *, today=None, batch_size: int = EXPIRATION_BATCH_SIZE
+) -> ExpirationResult:
+    """
+    Generate idempotent expiration milestones for the available items due to be checked.
+
+    Only the items whose ``next_expiration_alert`` is `today` or earlier are read, `batch_size` at a time, each batch
+    locked in one transaction. The milestones already delivered are found with one ``IN`` query, one
+    :class:`~core.models.NotificationEvent` and one broadcast :class:`~core.models.Notification` are bulk-inserted per
+    new milestone, and each item is scheduled for its next milestone after `today`.
+
+    Args:
+        today (optional): The date to compute milestones from. Defaults to the current local date.
+        batch_size (int, optional): Number of due items handled per transaction.
+
+    Returns:
+        ExpirationResult: Counts and throughput of the run.
+    """
     today = today or timezone.localdate()
-    delivered = 0
-    items = Item.objects.filter(
-        is_available=True,
-        exp_date__isnull=False,
-        exp_date__lte=today + datetime.timedelta(days=max(EXPIRATION_INTERVALS)),
-    ).select_related("device")
-
-    for item in items:
-        days_remaining = (item.exp_date - today).days
-        if days_remaining <= 0:
-            milestone = 0
-            kind = Notification.Kind.EXPIRED_ITEM
-            severity = Notification.Severity.CRITICAL
-            title = f"Expired item: {item.item_no}"
-            message = f"UDI {item.item_no} expired on {item.exp_date:%Y-%m-%d}."
-        else:
-            milestone = next(
-                (
-                    interval
-                    for interval in EXPIRATION_INTERVALS
-                    if days_remaining <= interval
-                ),
-                None,
+    result = ExpirationResult(recipients=_all_active_users().count())
+    started = time.perf_counter()
+    due_items = Item.objects.filter(
+        is_available=True, next_expiration_alert__lte=today
+    ).order_by("pk")
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                due_items.select_for_update().filter(pk__gt=last_pk)[:batch_size]
             )
-            if milestone is None:
-                continue
-            kind = Notification.Kind.EXPIRING_ITEM
-            severity = (
-                Notification.Severity.CRITICAL
-                if milestone == 1
-                else Notification.Severity.WARNING
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            result.items += len(batch)
+            events = dict(
+                filter(None, (_expiration_event(item, today) for item in batch))
             )
-            title = f"Item expires within {milestone} day{'s' if milestone != 1 else ''}"
-            message = (
-                f"UDI {item.item_no} expires on {item.exp_date:%Y-%m-%d} "
-                f"({days_remaining} day{'s' if days_remaining != 1 else ''} remaining)."
+            delivered_keys = set(
+                NotificationEvent.objects.filter(event_key__in=events).values_list(
+                    "event_key", flat=True
+                )
             )
+            new_events = {
+                event_key: notification_data
+                for event_key, notification_data in events.items()
+                if event_key not in delivered_keys
+            }
+            NotificationEvent.objects.bulk_create(
+                [NotificationEvent(event_key=event_key) for event_key in new_events],
+                ignore_conflicts=True,
+            )
+            Notification.objects.bulk_create(
+                [
+                    Notification(event_key=event_key, **notification_data)
+                    for event_key, notification_data in new_events.items()
+                ],
+                ignore_conflicts=True,
+            )
+            for item in batch:
+                item.schedule_expiration_alert(after=today)
+            Item.objects.bulk_update(batch, ["next_expiration_alert"])
+        result.events += len(new_events)
 
-        delivered += _deliver_event(
-            recipients=_all_active_users(),
-            event_key=(
-                f"expiration:item:{item.pk}:date:{item.exp_date.isoformat()}:"
-                f"milestone:{milestone}"
-            ),
-            kind=kind,
-            severity=severity,
-            title=title,
-            message=message,
-            item=item,
-            device=item.device,
-            target_url=_item_url(item),
-        )
-
-    return delivered
+    if result.events:
+        invalidate_broadcasts()
+    result.elapsed = time.perf_counter() - started
+    return result
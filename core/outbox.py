@@ -0,0 +1,168 @@
+"""Durable outbox for the notification work caused by inventory changes.
+
+Services record an :class:`~core.models.OutboxMessage` in the same transaction as the change that causes it, so the
+work is neither lost if the process stops after committing nor done if the change is rolled back. The
+``drain_outbox`` management command claims messages in batches and runs their handler, deleting each message in the
+transaction of its handler.
+
+Delivery is at least once: a message whose worker stopped mid-batch is claimed again once its lease expires, and a
+failed message is retried with a growing delay. The handlers are idempotent, through the ``event_key`` of each
+notification event, so repeated deliveries do not notify anyone twice.
+"""
+
+import datetime
+import functools
+import logging
+import uuid
+from dataclasses import dataclass
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .notification_services import (
+    notify_low_stock_state_change,
+    notify_waste_reversal_requested,
+    notify_waste_reversal_reviewed,
+    resolve_item_expiration_notifications,
+)
+
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+# A claimed message is hidden from other workers for this long, then claimed again if it was not done.
+OUTBOX_LEASE = datetime.timedelta(minutes=5)
+# A failed message is retried after this delay, times the number of attempts so far.
+OUTBOX_RETRY_DELAY = datetime.timedelta(seconds=30)
+OUTBOX_MAX_ATTEMPTS = 10
+
+OUTBOX_HANDLERS = {
+    OutboxMessage.Task.LOW_STOCK: notify_low_stock_state_change,
+    OutboxMessage.Task.WASTE_REVERSAL_REQUESTED: notify_waste_reversal_requested,
+    OutboxMessage.Task.WASTE_REVERSAL_REVIEWED: notify_waste_reversal_reviewed,
+    OutboxMessage.Task.RESOLVE_EXPIRATION: resolve_item_expiration_notifications,
+}
+
+
+def enqueue(task: str, **params) -> OutboxMessage:
+    """Records `task` to run with the keyword arguments `params`, once the current transaction commits."""
+    return OutboxMessage.objects.create(task=task, params=params)
+
+
+def claim_messages(batch_size: int = OUTBOX_BATCH_SIZE) -> list[OutboxMessage]:
+    """
+    Claims up to `batch_size` of the oldest available messages for this worker.
+
+    The messages are read, then claimed with an ``UPDATE`` that only matches those still holding the claim they were
+    read with, so if another worker claimed one in between, it is left to that worker. On databases that support it,
+    the rows read are also locked with ``SKIP LOCKED``, so concurrent workers read different messages to begin with.
+
+    Returns:
+        list[OutboxMessage]: The messages this worker claimed, which may be fewer than were available.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        available = OutboxMessage.objects.filter(available_at__lte=now).order_by("pk")
+        if connection.features.has_select_for_update_skip_locked:
+            available = available.select_for_update(skip_locked=True)
+        read = list(available.values_list("pk", "claim")[:batch_size])
+        if not read:
+            return []
+        claim = uuid.uuid4().hex
+        still_unclaimed = functools.reduce(
+            or_, (Q(pk=pk, claim=previous) for pk, previous in read)
+        )
+        OutboxMessage.objects.filter(still_unclaimed, available_at__lte=now).update(
+            claim=claim, available_at=now + OUTBOX_LEASE, attempts=F("attempts") + 1
+        )
+    return list(OutboxMessage.objects.filter(claim=claim).order_by("pk"))
+
+
+def process_message(message: OutboxMessage) -> bool:
+    """
+    Runs the handler of a claimed message, deleting the message in the same transaction.
+
+    Returns:
+        bool: Whether the handler succeeded. A failed message is made available again after a delay, or never again
+        once it has been attempted ``OUTBOX_MAX_ATTEMPTS`` times.
+    """
+    try:
+        with transaction.atomic():
+            OUTBOX_HANDLERS[message.task](**message.params)
+            message.delete()
+    except Exception as exc:
+        logger.exception("Outbox message %s failed", message.pk)
+        retry_at = None
+        if message.attempts < OUTBOX_MAX_ATTEMPTS:
+            retry_at = timezone.now() + OUTBOX_RETRY_DELAY * message.attempts
+        OutboxMessage.objects.filter(pk=message.pk, claim=message.claim).update(
+            claim="",
+            available_at=retry_at,
+            last_error=f"{type(exc).__name__}: {exc}",
+        )
+        return False
+    return True
+
+
+@dataclass
+class DrainResult:
+    """Summary of a batch drained by :func:`drain_batch`."""
+
+    processed: int = 0
+    failed: int = 0
+    # Seconds the oldest message of the batch waited in the outbox before it was claimed.
+    lag: float = 0.0
+
+    def __str__(self):
+        return (
+            f"Processed {self.processed:,} outbox messages ({self.failed:,} failed); "
+            f"queue lag {self.lag:.1f}s."
+        )
+
+
+def drain_batch(batch_size: int = OUTBOX_BATCH_SIZE) -> DrainResult:
+    """Claims and processes one batch of messages, oldest first."""
+    claimed_at = timezone.now()
+    messages = claim_messages(batch_size)
+    result = DrainResult()
+    if messages:
+        oldest = min(message.created_at for message in messages)
+        result.lag = max((claimed_at - oldest).total_seconds(), 0.0)
+    for message in messages:
+        if process_message(message):
+            result.processed += 1
+        else:
+            result.failed += 1
+    return result
+
+
+def drain_outbox(batch_size: int = OUTBOX_BATCH_SIZE) -> DrainResult:
+    """Processes every available message, a batch at a time, returning the totals and the largest lag."""
+    total = DrainResult()
+    while True:
+        result = drain_batch(batch_size)
+        if not (result.processed or result.failed):
+            return total
+        total.processed += result.processed
+        total.failed += result.failed
+        total.lag = max(total.lag, result.lag)
+
+
+def outbox_stats() -> dict:
+    """
+    Gets the state of the outbox.
+
+    Returns:
+        dict: ``pending``, the number of messages still to be processed, ``dead``, the number no longer retried,
+        and ``lag``, the seconds the oldest pending message has waited (0 if there is none).
+    """
+    pending = OutboxMessage.objects.filter(available_at__isnull=False)
+    oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+    return {
+        "pending": pending.count(),
+        "dead": OutboxMessage.objects.filter(available_at__isnull=True).count(),
+        "lag": (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
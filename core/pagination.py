@@ -0,0 +1,469 @@
+"""Pagination for list views over tables too large to count or page through with ``OFFSET`` on every request.
+
+Keyset (cursor) pagination reads each page with an indexed range condition on the sort key and id of the row it
+starts after (or before, when paging backwards), held in an opaque, signed token, so deep pages cost the same as
+the first one. List views start with page numbers, and their pager switches to keyset pages from
+``CURSOR_PAGE_THRESHOLD`` on.
+
+Page-number pagination uses :class:`CachedCountPaginator`, which counts each filtered queryset at most once per
+``COUNT_CACHE_TIMEOUT`` seconds, and estimates the size of unfiltered tables with more than
+``ESTIMATED_COUNT_THRESHOLD`` rows instead of scanning them.
+
+Showing all rows (``per_page=All``) streams the page instead with :class:`StreamAllMixin`, reading and rendering the
+rows in fixed-size batches, so memory use does not grow with the number of rows.
+"""
+
+import datetime
+import hashlib
+from dataclasses import dataclass, field
+from decimal import Decimal
+from functools import cached_property
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Max, Min, Q
+from django.db.models.expressions import OrderBy
+from django.http import StreamingHttpResponse
+from django.template import loader
+from django.utils.safestring import mark_safe
+from djmoney.money import Money
+
+from .models import TableVersion
+
+
+CURSOR_PARAM = "cursor"
+CURSOR_SALT = "core.pagination.cursor"
+# Rendered in place of the table rows of a streamed page, then replaced by the streamed batches.
+STREAM_ROWS_MARKER = "<!-- streamed rows -->"
+STREAM_BATCH_SIZE = 500
+
+
+@dataclass
+class CursorPage:
+    """A page of results read by :func:`paginate_by_cursor`, standing in for Django's :class:`~django.core.paginator.Page`."""
+
+    object_list: list
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+    sort: str = field(default="id", repr=False)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+def _resolve_field(model, lookup: str):
+    """Gets the model field at the end of a lookup such as ``item__item_no``."""
+    *relations, name = lookup.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _sort_value(obj, lookup: str):
+    *relations, name = lookup.split("__")
+    for relation in relations:
+        obj = getattr(obj, relation, None)
+        if obj is None:
+            return None
+    value = getattr(obj, obj._meta.get_field(name).attname)
+    return value.amount if isinstance(value, Money) else value
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(model, lookup: str, value):
+    if value is None:
+        return None
+    model_field = _resolve_field(model, lookup)
+    if model_field.is_relation:
+        model_field = model_field.target_field
+    return model_field.to_python(value)
+
+
+def _ordering(lookup: str, descending: bool) -> list:
+    """Orders by `lookup` then id, with ``NULL`` values first when ascending so descending is its exact reverse."""
+    if lookup in ("id", "pk"):
+        return ["-pk" if descending else "pk"]
+    if descending:
+        return [F(lookup).desc(nulls_last=True), "-pk"]
+    return [F(lookup).asc(nulls_first=True), "pk"]
+
+
+def _after(lookup: str, value, pk, descending: bool) -> Q:
+    """Matches the rows that follow the row with sort value `value` and id `pk` in :func:`_ordering`."""
+    if lookup in ("id", "pk"):
+        return Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+    if descending:
+        if value is None:
+            return Q(**{f"{lookup}__isnull": True, "pk__lt": pk})
+        return (
+            Q(**{f"{lookup}__lt": value})
+            | Q(**{lookup: value, "pk__lt": pk})
+            | Q(**{f"{lookup}__isnull": True})
+        )
+    if value is None:
+        return Q(**{f"{lookup}__isnull": True, "pk__gt": pk}) | Q(
+            **{f"{lookup}__isnull": False}
+        )
+    return Q(**{f"{lookup}__gt": value}) | Q(**{lookup: value, "pk__gt": pk})
+
+
+def make_cursor(obj, sort: str, backwards: bool = False) -> str:
+    """
+    Creates the cursor for the page starting after (or, if `backwards`, ending before) `obj`.
+
+    Args:
+        obj: The last row of the current page, or the first row when paging backwards. ``None`` leads to the first
+            page, or to the last page if `backwards`.
+        sort (str): The sort of the page, as a field lookup optionally prefixed with ``-``.
+        backwards (bool, optional): Whether the cursor leads to the previous page. Defaults to False.
+
+    Returns:
+        str: The opaque cursor token.
+    """
+    lookup = sort.lstrip("-")
+    value = (
+        None
+        if obj is None or lookup in ("id", "pk")
+        else _dump_value(_sort_value(obj, lookup))
+    )
+    return signing.dumps(
+        {"s": sort, "v": value, "id": None if obj is None else obj.pk, "b": backwards},
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def read_cursor(token: str, sort: str) -> dict | None:
+    """Decodes a cursor created by :func:`make_cursor`, or returns ``None`` if it is invalid or for a different sort."""
+    if not token:
+        return None
+    try:
+        cursor = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if cursor.get("s") != sort:
+        return None
+    return cursor
+
+
+def paginate_by_cursor(queryset, sort: str, token: str, page_size: int) -> CursorPage:
+    """
+    Reads one page of `queryset` by keyset, ordered by `sort` with the id as a tie-breaker.
+
+    Args:
+        queryset: The filtered queryset to page through. Its ordering is replaced.
+        sort (str): A field lookup, optionally prefixed with ``-`` for descending order.
+        token (str): The cursor of the requested page, or an empty string for the first page.
+        page_size (int): The number of rows per page.
+
+    Returns:
+        CursorPage: The rows of the page and the cursors of its neighbours.
+    """
+    lookup = sort.lstrip("-")
+    descending = sort.startswith("-")
+    cursor = read_cursor(token, sort)
+    backwards = bool(cursor and cursor["b"])
+    anchored = cursor is not None and cursor["id"] is not None
+
+    rows = queryset.order_by(*_ordering(lookup, descending != backwards))
+    if anchored:
+        value = (
+            None
+            if lookup in ("id", "pk")
+            else _load_value(queryset.model, lookup, cursor["v"])
+        )
+        rows = rows.filter(_after(lookup, value, cursor["id"], descending != backwards))
+    rows = list(rows[: page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if backwards:
+        rows.reverse()
+        has_previous, has_next = more, anchored
+    else:
+        has_previous, has_next = anchored, more
+
+    return CursorPage(
+        object_list=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=make_cursor(rows[-1], sort) if has_next and rows else None,
+        previous_cursor=(
+            make_cursor(rows[0], sort, backwards=True) if has_previous and rows else None
+        ),
+        sort=sort,
+    )
+
+
+def estimated_count(queryset) -> int | None:
+    """
+    Estimates the number of rows in the table of `queryset` without scanning it.
+
+    Uses the planner statistics on PostgreSQL, and the id range on SQLite, which overestimates by the number of
+    deleted rows.
+
+    Returns:
+        int | None: The estimate, or ``None`` if the database cannot provide one.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+    if connection.vendor == "sqlite":
+        bounds = queryset.model._default_manager.using(queryset.db).aggregate(
+            low=Min("pk"), high=Max("pk")
+        )
+        if bounds["high"] is None:
+            return 0
+        return bounds["high"] - bounds["low"] + 1
+    return None
+
+
+def is_unfiltered(queryset) -> bool:
+    query = queryset.query
+    return not query.where and not query.distinct and not query.is_sliced
+
+
+def _count_cache_key(queryset) -> str:
+    query = queryset.order_by().query
+    fingerprint = "|".join(
+        [queryset.db, str(query), TableVersion.token(queryset.model)]
+    )
+    return "row-count:" + hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def count_rows(queryset) -> tuple[int, bool]:
+    """
+    Counts the rows of `queryset`, reusing the count of an identical query from the last ``COUNT_CACHE_TIMEOUT``
+    seconds. Unfiltered tables larger than ``ESTIMATED_COUNT_THRESHOLD`` rows are estimated instead of counted.
+
+    The cache key includes the :class:`~core.models.TableVersion` token of the table, so new rows (and any write
+    to a table whose counter is kept) are counted straight away.
+
+    Returns:
+        tuple[int, bool]: The number of rows, and whether it is an estimate.
+    """
+    if queryset.query.is_empty():
+        return 0, False
+    if is_unfiltered(queryset):
+        estimate = estimated_count(queryset)
+        if estimate is not None and estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+            return estimate, True
+    try:
+        key = _count_cache_key(queryset)
+    except EmptyResultSet:
+        return 0, False
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count, False
+
+
+class CachedCountPaginator(Paginator):
+    """A :class:`~django.core.paginator.Paginator` that gets its count from :func:`count_rows`."""
+
+    @cached_property
+    def _row_count(self) -> tuple[int, bool]:
+        return count_rows(self.object_list)
+
+    @cached_property
+    def count(self) -> int:
+        return self._row_count[0]
+
+    @property
+    def count_is_estimate(self) -> bool:
+        return self._row_count[1]
+
+
+def orders_by_annotation(queryset) -> bool:
+    """Whether `queryset` is ordered by an annotation, such as a search rank, which a cursor cannot seek on."""
+    annotations = queryset.query.annotations
+    for ordering in queryset.query.order_by:
+        if isinstance(ordering, str):
+            names = [ordering.lstrip("-")]
+        else:
+            expression = ordering.expression if isinstance(ordering, OrderBy) else ordering
+            names = [getattr(expression, "name", None)]
+        if any(name in annotations for name in names):
+            return True
+    return False
+
+
+class CursorPaginationMixin:
+    """
+    Pages a :class:`~django.views.generic.ListView` by keyset instead of page number when the request has a
+    ``cursor`` parameter (an empty one for the first page).
+
+    Page-number pages link to the last page by keyset once there are more than ``CURSOR_PAGE_THRESHOLD`` pages, and
+    from that page on to the next page by keyset too, as ``cursor_last`` and ``cursor_next``. They are ordered like
+    the keyset pages, so those continue exactly where they end.
+    Querysets ordered by an annotation, such as search results ranked by relevance, keep that order and are always
+    paged by number.
+
+    In cursor mode, ``page_obj`` is a :class:`CursorPage`, ``paginator`` is ``None`` (nothing is counted) and
+    ``cursor_query_string`` holds the other query parameters for building page links.
+    """
+
+    default_cursor_sort = "-id"
+
+    def get_cursor_sort(self) -> str:
+        """The sort of the cursor pages; defaults to the ``sort_param`` chosen by ``get_queryset``."""
+        return getattr(self, "sort_param", None) or self.default_cursor_sort
+
+    def supports_cursor(self, queryset) -> bool:
+        return not orders_by_annotation(queryset)
+
+    def uses_cursor(self) -> bool:
+        return CURSOR_PARAM in self.request.GET and self.supports_cursor(self.object_list)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.supports_cursor(queryset):
+            return super().paginate_queryset(queryset, page_size)
+        sort = self.get_cursor_sort()
+        if not self.uses_cursor():
+            queryset = queryset.order_by(*_ordering(sort.lstrip("-"), sort.startswith("-")))
+            paginator, page, object_list, is_paginated = super().paginate_queryset(
+                queryset, page_size
+            )
+            # Loaded once here, since the last row also makes the link to the next keyset page.
+            page.object_list = list(object_list)
+            return paginator, page, page.object_list, is_paginated
+        page = paginate_by_cursor(
+            queryset,
+            sort,
+            self.request.GET.get(CURSOR_PARAM, ""),
+            page_size,
+        )
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["cursor_pagination"] = self.uses_cursor()
+        params = self.request.GET.copy()
+        params.pop(CURSOR_PARAM, None)
+        params.pop("page", None)
+        context["cursor_query_string"] = params.urlencode()
+
+        page = context.get("page_obj")
+        context["cursor_next"] = context["cursor_last"] = None
+        if page is None or not self.supports_cursor(self.object_list):
+            return context
+        sort = self.get_cursor_sort()
+        if context["cursor_pagination"]:
+            if page.has_next:
+                context["cursor_last"] = make_cursor(None, sort, backwards=True)
+            return context
+        if not page.has_next():
+            return context
+        if page.number >= settings.CURSOR_PAGE_THRESHOLD:
+            context["cursor_next"] = make_cursor(page.object_list[-1], sort)
+        if page.paginator.num_pages > settings.CURSOR_PAGE_THRESHOLD:
+            context["cursor_last"] = make_cursor(None, sort, backwards=True)
+        return context
+
+
+class StreamedRows:
+    """
+    Stands in for the object list of a streamed page, so the view and template can test whether there are any
+    rows without loading them. Iterates as empty; the rows are rendered separately by :class:`StreamAllMixin`.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    @cached_property
+    def _exists(self) -> bool:
+        return self.queryset.exists()
+
+    def __bool__(self):
+        return self._exists
+
+    def __iter__(self):
+        return iter(())
+
+
+class StreamAllMixin:
+    """
+    Streams a :class:`~django.views.generic.ListView` when all rows are requested (``per_page=All``), instead of
+    loading and rendering them in one go.
+
+    The page template is rendered once with ``stream_rows_marker`` in its context, which it outputs in place of its
+    rows. The response sends the page up to the marker, then the rows, read with a chunked iterator and rendered
+    ``stream_batch_size`` at a time by ``stream_rows_template_name`` (which should also render the rows of the
+    paginated page), then the rest of the page.
+    """
+
+    stream_rows_template_name = None
+    stream_batch_size = STREAM_BATCH_SIZE
+    # Relations used by the row template, loaded with each batch instead of a query per row.
+    stream_select_related = ()
+
+    def streams_all(self) -> bool:
+        """Whether all rows were requested, in which case ``get_paginate_by`` should return ``None``."""
+        return self.request.GET.get("per_page") == "All"
+
+    def get(self, request, *args, **kwargs):
+        if not self.streams_all():
+            return super().get(request, *args, **kwargs)
+        self.object_list = self.get_queryset()
+        context = self.get_context_data()
+        return StreamingHttpResponse(
+            self.stream_page(context), content_type="text/html; charset=utf-8"
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.streams_all():
+            rows = StreamedRows(self.object_list)
+            context["object_list"] = rows
+            context_object_name = self.get_context_object_name(self.object_list)
+            if context_object_name is not None:
+                context[context_object_name] = rows
+            context["stream_rows_marker"] = mark_safe(STREAM_ROWS_MARKER)
+        return context
+
+    def stream_page(self, context):
+        """Yields the rendered page, with its rows rendered in batches from a chunked iterator."""
+        page = loader.render_to_string(self.get_template_names(), context, self.request)
+        head, marker, tail = page.partition(STREAM_ROWS_MARKER)
+        yield head
+        if marker:
+            rows_template = loader.get_template(self.stream_rows_template_name)
+            context_object_name = self.get_context_object_name(self.object_list)
+            queryset = self.object_list
+            if self.stream_select_related:
+                queryset = queryset.select_related(*self.stream_select_related)
+            batch = []
+            for row in queryset.iterator(chunk_size=self.stream_batch_size):
+                batch.append(row)
+                if len(batch) == self.stream_batch_size:
+                    yield rows_template.render({**context, context_object_name: batch})
+                    batch = []
+            if batch:
+                yield rows_template.render({**context, context_object_name: batch})
+        yield tail
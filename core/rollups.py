@@ -0,0 +1,268 @@
+"""Monthly per-:class:`~core.models.Item` rollups of :class:`Orders <core.models.Order>` for the order charts.
+
+Each :class:`~core.models.OrderRollup` holds the order count, total cost and quantity of one item in one month. Saving
+or deleting an :class:`~core.models.Order` recomputes its rollups, and imports recompute the rollups they touched once
+at the end. :func:`summarize_orders` answers a date range from the rollups of the months it fully covers, and
+aggregates only the orders of the partial months at either end.
+"""
+
+import datetime
+import functools
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Item, Order, OrderRollup
+
+
+# Most (month, item) cells recomputed by one aggregate query, keeping its parameters under SQLite's limit.
+ROLLUP_CELL_BATCH_SIZE = 500
+
+
+def order_month(po_date: datetime.datetime) -> datetime.date:
+    """Gets the month an order placed at `po_date` is rolled up into, as its first day in the project time zone."""
+    if timezone.is_aware(po_date):
+        po_date = timezone.localtime(po_date)
+    return po_date.date().replace(day=1)
+
+
+def month_start(month: datetime.date) -> datetime.datetime:
+    """Gets the first moment of `month` in the project time zone."""
+    return timezone.make_aware(datetime.datetime.combine(month, datetime.time.min))
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _monthly_totals(orders):
+    return (
+        orders.annotate(month=TruncMonth("po_date"))
+        .values("month", "item_id")
+        .annotate(
+            order_count=Count("id"),
+            total_cost=Sum("total_cost"),
+            quantity=Sum("recv_qty"),
+        )
+        .order_by()
+    )
+
+
+def _cell_batches(cells):
+    """Groups `cells` by month, yielding lists of ``(month, item_ids)`` that cover at most ``ROLLUP_CELL_BATCH_SIZE`` cells each."""
+    items_by_month = defaultdict(list)
+    for month, item_id in cells:
+        items_by_month[month].append(item_id)
+    batch, size = [], 0
+    for month in sorted(items_by_month):
+        item_ids = sorted(items_by_month[month])
+        for start in range(0, len(item_ids), ROLLUP_CELL_BATCH_SIZE):
+            chunk = item_ids[start : start + ROLLUP_CELL_BATCH_SIZE]
+            if batch and size + len(chunk) > ROLLUP_CELL_BATCH_SIZE:
+                yield batch
+                batch, size = [], 0
+            batch.append((month, chunk))
+            size += len(chunk)
+    if batch:
+        yield batch
+
+
+def refresh_order_rollups(cells) -> None:
+    """
+    Recomputes the rollups of the given months and items from their orders.
+
+    Only the listed cells are recomputed, a batch of them per aggregate query, so refreshing after an import costs
+    in proportion to the months and items it wrote, however far apart they are.
+
+    Args:
+        cells: Iterable of ``(month, item_id)`` pairs, with each month as returned by :func:`order_month`.
+    """
+    with transaction.atomic():
+        for batch in _cell_batches(set(cells)):
+            orders = functools.reduce(
+                or_,
+                (
+                    Q(
+                        po_date__gte=month_start(month),
+                        po_date__lt=month_start(next_month(month)),
+                        item_id__in=item_ids,
+                    )
+                    for month, item_ids in batch
+                ),
+            )
+            rollups = functools.reduce(
+                or_, (Q(month=month, item_id__in=item_ids) for month, item_ids in batch)
+            )
+            OrderRollup.objects.filter(rollups).delete()
+            _create_rollups(Order.objects.filter(orders))
+
+
+def _create_rollups(orders) -> int:
+    return len(
+        OrderRollup.objects.bulk_create(
+            (
+                OrderRollup(
+                    month=order_month(row["month"]),
+                    item_id=row["item_id"],
+                    order_count=row["order_count"],
+                    total_cost=row["total_cost"] or 0,
+                    quantity=row["quantity"] or 0,
+                )
+                for row in _monthly_totals(orders).iterator()
+            ),
+            batch_size=2000,
+        )
+    )
+
+
+def rebuild_order_rollups() -> int:
+    """Recomputes every rollup from scratch, returning the number of rollups written."""
+    with transaction.atomic():
+        OrderRollup.objects.all().delete()
+        return _create_rollups(Order.objects.all())
+
+
+@dataclass
+class OrderSummary:
+    """Order counts and costs over a date range, as charted by :class:`~core.views.OrderDetailsAdvancedView`."""
+
+    # Month (first day) to order count and total cost, in month order.
+    months: dict = field(default_factory=dict)
+    # Manufacturer or item name to order count.
+    manufacturers: Counter = field(default_factory=Counter)
+    items: Counter = field(default_factory=Counter)
+
+    def add_month(self, month: datetime.date, order_count: int, total_cost) -> None:
+        count, cost = self.months.get(month, (0, Decimal(0)))
+        self.months[month] = (count + order_count, cost + (total_cost or 0))
+
+    @property
+    def quarters(self) -> dict:
+        """Quarter (first day) to order count and total cost, in quarter order."""
+        quarters = {}
+        for month, (order_count, total_cost) in sorted(self.months.items()):
+            quarter = month.replace(month=(month.month - 1) // 3 * 3 + 1)
+            count, cost = quarters.get(quarter, (0, Decimal(0)))
+            quarters[quarter] = (count + order_count, cost + total_cost)
+        return quarters
+
+
+def _covered_months(
+    start_date: datetime.datetime, end_date: datetime.datetime
+) -> tuple[datetime.date, datetime.date] | None:
+    """Gets the first and last month lying entirely within the range, or ``None`` if there is no such month."""
+    first = order_month(start_date)
+    if month_start(first) < start_date:
+        first = next_month(first)
+    last = order_month(end_date)
+    if month_start(next_month(last)) - datetime.timedelta(microseconds=1) > end_date:
+        last = (last - datetime.timedelta(days=1)).replace(day=1)
+    return (first, last) if first <= last else None
+
+
+def _partial_months(start_date, end_date, covered) -> list[tuple[datetime.date, Q]]:
+    """
+    Gets the months of the range that are only partly covered by it, with a filter on the orders of each that fall
+    in the range. There are at most two: the months of `start_date` and `end_date`.
+    """
+    if covered is None:
+        first_month, last_month = order_month(start_date), order_month(end_date)
+        if first_month == last_month:
+            return [(first_month, Q(po_date__range=(start_date, end_date)))]
+        boundary = month_start(last_month)
+        return [
+            (first_month, Q(po_date__gte=start_date, po_date__lt=boundary)),
+            (last_month, Q(po_date__gte=boundary, po_date__lte=end_date)),
+        ]
+    first, last = covered
+    covered_start, covered_end = month_start(first), month_start(next_month(last))
+    partial_months = []
+    if start_date < covered_start:
+        partial_months.append(
+            (order_month(start_date), Q(po_date__gte=start_date, po_date__lt=covered_start))
+        )
+    if end_date >= covered_end:
+        partial_months.append(
+            (order_month(end_date), Q(po_date__gte=covered_end, po_date__lte=end_date))
+        )
+    return partial_months
+
+
+def summarize_orders(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    item_nos=None,
+    by_month: bool = True,
+    by_item: bool = True,
+) -> OrderSummary:
+    """
+    Totals the :class:`Orders <core.models.Order>` placed between `start_date` and `end_date` (inclusive) by month,
+    manufacturer and item.
+
+    Args:
+        start_date (datetime.datetime): Start of the range.
+        end_date (datetime.datetime): End of the range.
+        item_nos (optional): Only count orders of the items with these numbers. Defaults to all items.
+        by_month (bool, optional): Total the orders by month. Defaults to True.
+        by_item (bool, optional): Count the orders by manufacturer and item. Defaults to True.
+
+    Returns:
+        OrderSummary: The totals, leaving out the ones not requested.
+    """
+    summary = OrderSummary()
+    covered = _covered_months(start_date, end_date)
+    if covered is not None:
+        first, last = covered
+        rollups = OrderRollup.objects.filter(month__gte=first, month__lte=last)
+        if item_nos:
+            rollups = rollups.filter(item__item_no__in=item_nos)
+        if by_month:
+            for row in (
+                rollups.values("month")
+                .annotate(order_count=Sum("order_count"), total_cost=Sum("total_cost"))
+                .order_by()
+            ):
+                summary.add_month(row["month"], row["order_count"], row["total_cost"])
+        if by_item:
+            item_counts = dict(
+                rollups.values("item_id")
+                .annotate(count=Sum("order_count"))
+                .order_by()
+                .values_list("item_id", "count")
+            )
+            # Name the items in one lookup instead of grouping the rollups by joined item fields.
+            for item_id, name, mfr in Item.objects.filter(
+                pk__in=item_counts
+            ).values_list("pk", "item", "mfr"):
+                summary.items[name] += item_counts[item_id]
+                summary.manufacturers[mfr] += item_counts[item_id]
+
+    partial_months = _partial_months(start_date, end_date, covered)
+    if partial_months:
+        orders = Order.objects.all()
+        if item_nos:
+            orders = orders.filter(item__item_no__in=item_nos)
+        if by_month:
+            for month, dates in partial_months:
+                totals = orders.filter(dates).aggregate(
+                    order_count=Count("id"), total_cost=Sum("total_cost")
+                )
+                if totals["order_count"]:
+                    summary.add_month(month, totals["order_count"], totals["total_cost"])
+        if by_item:
+            orders = orders.filter(
+                functools.reduce(or_, (dates for _, dates in partial_months))
+            )
+            for row in orders.values("item__item").annotate(count=Count("id")).order_by():
+                summary.items[row["item__item"]] += row["count"]
+            for row in orders.values("item__mfr").annotate(count=Count("id")).order_by():
+                summary.manufacturers[row["item__mfr"]] += row["count"]
+
+    summary.months = dict(sorted(summary.months.items()))
+    return summary
@@ -0,0 +1,250 @@
+"""Full-text search over :class:`Items <core.models.Item>`, :class:`Orders <core.models.Order>` and :class:`~core.models.ItemTransaction` notes.
+
+On SQLite, each searchable table has an FTS5 index using the trigram tokenizer, which answers the same case-insensitive
+substring matches as ``icontains`` without scanning the table, and ranks matches with bm25. The indexes are created
+(and kept in sync by triggers) after every ``migrate``, since rebuilding a table in a later migration drops its triggers.
+Other database engines, and search terms shorter than a trigram, fall back to ``icontains`` filters.
+
+:func:`autocomplete_items` answers the type-ahead item pickers from the same index, plus an indexed prefix match on
+item numbers, a page at a time.
+"""
+
+import functools
+import logging
+from dataclasses import dataclass
+from operator import or_
+
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Item, ItemTransaction, Order
+
+
+logger = logging.getLogger(__name__)
+
+# The trigram tokenizer cannot match shorter terms.
+MIN_SEARCH_TERM_LENGTH = 3
+AUTOCOMPLETE_LIMIT = 20
+MAX_AUTOCOMPLETE_LIMIT = 100
+AUTOCOMPLETE_FIELDS = ("item", "item_no", "descr")
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """An FTS5 index over the text `fields` of `model`."""
+
+    model: type
+    fields: tuple[str, ...]
+
+    @property
+    def table(self) -> str:
+        return f"{self.model._meta.db_table}_fts"
+
+    @property
+    def content_table(self) -> str:
+        return self.model._meta.db_table
+
+    def columns(self, prefix: str = "") -> str:
+        return ", ".join(f"{prefix}{field}" for field in self.fields)
+
+
+SEARCH_INDEXES = {
+    index.model: index
+    for index in (
+        SearchIndex(Item, ("item", "item_no", "mfr", "mfr_cat", "descr")),
+        SearchIndex(
+            Order,
+            (
+                "vendor",
+                "vend_cat",
+                "um",
+                "expr1010",
+                "po_no",
+                "vend_code",
+                "dbo_vend_name",
+                "dbo_cc_name",
+            ),
+        ),
+        SearchIndex(ItemTransaction, ("reason",)),
+    )
+}
+
+
+def _index_statements(index: SearchIndex) -> list[str]:
+    table, content = index.table, index.content_table
+    insert = (
+        f"INSERT INTO {table}(rowid, {index.columns()}) "
+        f"VALUES (new.id, {index.columns('new.')});"
+    )
+    delete = (
+        f"INSERT INTO {table}({table}, rowid, {index.columns()}) "
+        f"VALUES ('delete', old.id, {index.columns('old.')});"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        f"{index.columns()}, content='{content}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {content} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {content} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE ON {content} BEGIN {delete} {insert} END",
+    ]
+
+
+def install_search_indexes(using: str = "default", rebuild: bool = False, **kwargs) -> None:
+    """
+    Creates any missing FTS5 indexes and sync triggers, rebuilding the indexes that were missing a trigger.
+    Connected to ``post_migrate``; does nothing on other database engines.
+
+    Args:
+        using (str, optional): The database alias. Defaults to "default".
+        rebuild (bool, optional): Rebuild every index from its table, even if all triggers were present. Defaults to False.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES.values():
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                [f"{index.table}_ai", f"{index.table}_ad", f"{index.table}_au"],
+            )
+            triggers_present = cursor.fetchone()[0] == 3
+            try:
+                for statement in _index_statements(index):
+                    cursor.execute(statement)
+            except DatabaseError:
+                logger.warning("SQLite FTS5 is unavailable; search will scan tables.")
+                return
+            if rebuild or not triggers_present:
+                cursor.execute(
+                    f"INSERT INTO {index.table}({index.table}) VALUES ('rebuild')"
+                )
+    _index_tables.cache_clear()
+
+
+@functools.lru_cache
+def _index_tables(using: str, database_name) -> frozenset:
+    """The tables of the `using` database, cached per database file, since introspecting them costs a query."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        return frozenset(connection.introspection.table_names(cursor))
+
+
+def search_index(model, fields=None) -> SearchIndex | None:
+    """
+    Gets the index that can answer a search of `fields` of `model`.
+
+    Args:
+        model: The model being searched.
+        fields (optional): The fields searched, or ``None`` for all of the indexed fields.
+
+    Returns:
+        SearchIndex | None: The index, or ``None`` if the fields are not indexed on this database.
+    """
+    index = SEARCH_INDEXES.get(model)
+    connection = connections["default"]
+    if index is None or connection.vendor != "sqlite":
+        return None
+    if fields is not None and not set(fields) <= set(index.fields):
+        return None
+    if index.table not in _index_tables(connection.alias, connection.settings_dict["NAME"]):
+        return None
+    return index
+
+
+def match_expression(term: str, fields=None) -> str | None:
+    """Builds an FTS5 query matching `term` as a substring, or ``None`` if it is too short to use the index."""
+    term = term.strip()
+    if len(term) < MIN_SEARCH_TERM_LENGTH:
+        return None
+    phrase = '"' + term.replace('"', '""') + '"'
+    if fields:
+        return "{" + " ".join(fields) + "} : " + phrase
+    return phrase
+
+
+def search_filter(model, term: str, fields=None, lookup: str = "pk") -> Q | None:
+    """
+    Gets a filter matching rows whose indexed `fields` contain `term`, ignoring case.
+
+    Args:
+        model: The model being searched.
+        term (str): The search term.
+        fields (optional): The fields to search. Defaults to all of the indexed fields.
+        lookup (str, optional): The lookup to filter on, such as ``item_id`` to match the :class:`Items <core.models.Item>` of other rows. Defaults to "pk".
+
+    Returns:
+        Q | None: The filter, or ``None`` if the index cannot answer this search and an ``icontains`` filter should be used instead.
+    """
+    index = search_index(model, fields)
+    expression = match_expression(term, fields)
+    if index is None or expression is None:
+        return None
+    return Q(
+        **{
+            f"{lookup}__in": RawSQL(
+                f"SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s",
+                (expression,),
+            )
+        }
+    )
+
+
+def search_rank(model, term: str, fields=None) -> RawSQL | None:
+    """
+    Gets the bm25 rank of each row against `term` (lower is better), for ordering results filtered by :func:`search_filter`.
+
+    Returns:
+        RawSQL | None: The rank expression, or ``None`` if the index cannot answer this search.
+    """
+    index = search_index(model, fields)
+    expression = match_expression(term, fields)
+    if index is None or expression is None:
+        return None
+    return RawSQL(
+        f"SELECT rank FROM {index.table} WHERE {index.table} MATCH %s "
+        f"AND rowid = {index.content_table}.id",
+        (expression,),
+    )
+
+
+def autocomplete_items(
+    term: str, after: str | None = None, limit: int = AUTOCOMPLETE_LIMIT
+) -> tuple[list[dict], str | None]:
+    """
+    Finds the :class:`Items <core.models.Item>` whose number starts with `term`, or whose name, number or description
+    contains it, ordered by item number.
+
+    Args:
+        term (str): The text typed so far. An empty term matches every item.
+        after (str | None, optional): The last item number already loaded, to continue from. Defaults to None.
+        limit (int, optional): The most items to return. Defaults to ``AUTOCOMPLETE_LIMIT``.
+
+    Returns:
+        tuple[list[dict], str | None]: The matching items, as ``item_no`` and ``label``, and the ``after`` value that
+        loads the next ones, or ``None`` if there are no more.
+    """
+    term = term.strip()
+    items = Item.objects.all()
+    if term:
+        # A range on the unique item_no index, unlike LIKE, which ignores case and so cannot use it.
+        query = Q(item_no__gte=term, item_no__lt=term + "\U0010ffff")
+        contains = search_filter(Item, term, AUTOCOMPLETE_FIELDS)
+        if contains is None and len(term) >= MIN_SEARCH_TERM_LENGTH:
+            contains = functools.reduce(
+                or_, (Q(**{f"{field}__icontains": term}) for field in AUTOCOMPLETE_FIELDS)
+            )
+        if contains is not None:
+            query |= contains
+        items = items.filter(query)
+    if after:
+        items = items.filter(item_no__gt=after)
+
+    rows = list(
+        items.order_by("item_no").values_list("item_no", "descr")[: limit + 1]
+    )
+    results = [
+        {"item_no": item_no, "label": f"{descr} ({item_no})"}
+        for item_no, descr in rows[:limit]
+    ]
+    return results, (results[-1]["item_no"] if len(rows) > limit else None)
@@ -11,8 +11,10 @@ from .models import (
     DeviceThresholdTransaction,
     Item,
     ItemTransaction,
+    OutboxMessage,
     WasteReversalRequest,
 )
+from .outbox import enqueue
 
 
 class InventoryError(Exception):
@@ -73,20 +75,31 @@ def _change_device_count(device_id: int | None, change: int):
     return device, previous_count, new_count
 
 
+def _schedule_low_stock_notification(
+    *, device_id: int, was_low: bool, is_low: bool, event_key: str, actor
+) -> None:
+    """Records a low-stock alert or resolution in the outbox if the device crossed its threshold."""
+    if was_low == is_low:
+        return
+    enqueue(
+        OutboxMessage.Task.LOW_STOCK,
+        device_id=device_id,
+        was_low=was_low,
+        is_low=is_low,
+        event_key=event_key,
+        actor_id=getattr(actor, "pk", None),
+    )
+
+
 def _schedule_stock_notification(
     *, device, previous_count: int, new_count: int, event_key: str, actor
 ) -> None:
-    from .notification_services import notify_low_stock_state_change
-
-    transaction.on_commit(
-        lambda: notify_low_stock_state_change(
-            device_id=device.pk,
-            was_low=previous_count <= device.low_stock_threshold,
-            is_low=new_count <= device.low_stock_threshold,
-            event_key=event_key,
-            actor_id=getattr(actor, "pk", None),
-        ),
-        robust=True,
+    _schedule_low_stock_notification(
+        device_id=device.pk,
+        was_low=previous_count <= device.low_stock_threshold,
+        is_low=new_count <= device.low_stock_threshold,
+        event_key=event_key,
+        actor=actor,
     )
 
 
@@ -97,7 +110,7 @@ def record_stock_in(*, item: Item, actor, occurred_at=None) -> ItemTransaction:
         raise ItemAlreadyAvailableError("This UDI is already available in inventory.")
 
     locked_item.is_available = True
-    locked_item.save(update_fields=["is_available"])
+    locked_item.save(update_fields=["is_available", "next_expiration_alert"])
     count_change = _change_device_count(locked_item.device_id, 1)
 
     inventory_transaction = ItemTransaction.objects.create(
@@ -151,7 +164,7 @@ def record_item_removal(
         raise ItemUnavailableError("This item is not currently available in inventory.")
 
     item.is_available = False
-    item.save(update_fields=["is_available"])
+    item.save(update_fields=["is_available", "next_expiration_alert"])
     count_change = _change_device_count(item.device_id, -1)
 
     inventory_transaction = ItemTransaction.objects.create(
@@ -177,12 +190,7 @@ def record_item_removal(
             event_key=f"low-stock:inventory-transaction:{inventory_transaction.pk}",
             actor=actor,
         )
-    from .notification_services import resolve_item_expiration_notifications
-
-    transaction.on_commit(
-        lambda: resolve_item_expiration_notifications(item.pk),
-        robust=True,
-    )
+    enqueue(OutboxMessage.Task.RESOLVE_EXPIRATION, item_id=item.pk)
     return inventory_transaction
 
 
@@ -210,11 +218,9 @@ def request_waste_reversal(
         requested_by=requested_by,
         reason=reason,
     )
-    from .notification_services import notify_waste_reversal_requested
-
-    transaction.on_commit(
-        lambda: notify_waste_reversal_requested(reversal_request.pk),
-        robust=True,
+    enqueue(
+        OutboxMessage.Task.WASTE_REVERSAL_REQUESTED,
+        reversal_request_id=reversal_request.pk,
     )
     return reversal_request
 
@@ -247,11 +253,9 @@ def review_waste_reversal(*, request_id: int, reviewer, approve: bool):
         reversal_request.save(
             update_fields=["status", "reviewed_by", "reviewed_at"]
         )
-        from .notification_services import notify_waste_reversal_reviewed
-
-        transaction.on_commit(
-            lambda: notify_waste_reversal_reviewed(reversal_request.pk),
-            robust=True,
+        enqueue(
+            OutboxMessage.Task.WASTE_REVERSAL_REVIEWED,
+            reversal_request_id=reversal_request.pk,
         )
         return None
 
@@ -266,7 +270,7 @@ def review_waste_reversal(*, request_id: int, reviewer, approve: bool):
         )
 
     item.is_available = True
-    item.save(update_fields=["is_available"])
+    item.save(update_fields=["is_available", "next_expiration_alert"])
     count_change = _change_device_count(item.device_id, 1)
 
     reversal = ItemTransaction.objects.create(
@@ -290,11 +294,9 @@ def review_waste_reversal(*, request_id: int, reviewer, approve: bool):
             event_key=f"low-stock:inventory-transaction:{reversal.pk}",
             actor=reviewer,
         )
-    from .notification_services import notify_waste_reversal_reviewed
-
-    transaction.on_commit(
-        lambda: notify_waste_reversal_reviewed(reversal_request.pk),
-        robust=True,
+    enqueue(
+        OutboxMessage.Task.WASTE_REVERSAL_REVIEWED,
+        reversal_request_id=reversal_request.pk,
     )
     return reversal
 
@@ -336,16 +338,11 @@ def update_device_threshold(
         changed_by=actor,
     )
 
-    from .notification_services import notify_low_stock_state_change
-
-    transaction.on_commit(
-        lambda: notify_low_stock_state_change(
-            device_id=device.pk,
-            was_low=was_low,
-            is_low=is_low,
-            event_key=f"low-stock:threshold-change:{threshold_change.pk}",
-            actor_id=getattr(actor, "pk", None),
-        ),
-        robust=True,
+    _schedule_low_stock_notification(
+        device_id=device.pk,
+        was_low=was_low,
+        is_low=is_low,
+        event_key=f"low-stock:threshold-change:{threshold_change.pk}",
+        actor=actor,
     )
     return threshold_change
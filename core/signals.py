@@ -0,0 +1,117 @@
+"""
+Keeps :class:`~core.models.TableVersion` counters up to date as :class:`Orders <core.models.Order>`, :class:`Items <core.models.Item>` (and the charted fields of those) and :class:`ItemTransactions <core.models.ItemTransaction>` change,
+the :class:`~core.models.TableRowCount` of each counted model, the :class:`~core.models.LedgerDateBounds` of the order and transaction ledgers, the :class:`~core.models.OrderRollup` of each saved or deleted :class:`~core.models.Order`,
+and the next expiration alert of each :class:`~core.models.Item` whose availability or expiration date is saved.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    COUNTED_MODELS,
+    Item,
+    ItemTransaction,
+    LedgerDateBounds,
+    Order,
+    TableRowCount,
+    TableVersion,
+)
+from .charts import CHART_ITEM_FIELDS, CHART_ITEM_VERSION
+from .rollups import order_month, refresh_order_rollups
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=ItemTransaction)
+@receiver(post_delete, sender=ItemTransaction)
+def bump_table_version(sender, **kwargs):
+    TableVersion.bump(sender)
+
+
+@receiver(post_save, sender=Item)
+def bump_chart_item_version(sender, update_fields=None, **kwargs):
+    """Records edits to the fields shown in the order charts, but not saves of other fields such as availability."""
+    if update_fields is None or CHART_ITEM_FIELDS & update_fields:
+        TableVersion.bump(CHART_ITEM_VERSION)
+
+
+def count_inserted_row(sender, created=False, **kwargs):
+    if created:
+        TableRowCount.adjust(sender, 1)
+
+
+def count_deleted_row(sender, **kwargs):
+    TableRowCount.adjust(sender, -1)
+
+
+for counted_model in COUNTED_MODELS:
+    post_save.connect(count_inserted_row, sender=counted_model)
+    post_delete.connect(count_deleted_row, sender=counted_model)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=ItemTransaction)
+def widen_ledger_date_bounds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    date = getattr(instance, LedgerDateBounds.date_field(sender))
+    LedgerDateBounds.widen(sender, date, date)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=ItemTransaction)
+def shrink_ledger_date_bounds(sender, instance, **kwargs):
+    LedgerDateBounds.forget(sender, getattr(instance, LedgerDateBounds.date_field(sender)))
+
+
+# Saving either of these fields of an Item schedules its expiration alerts again.
+EXPIRATION_SCHEDULE_FIELDS = {"is_available", "exp_date"}
+
+
+@receiver(pre_save, sender=Item)
+def schedule_expiration_alert(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is None or EXPIRATION_SCHEDULE_FIELDS & update_fields:
+        instance.schedule_expiration_alert()
+
+
+@receiver(post_save, sender=Item)
+def save_expiration_schedule(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Saves the schedule set by :func:`schedule_expiration_alert` when the fields saved did not include it."""
+    if raw or update_fields is None or "next_expiration_alert" in update_fields:
+        return
+    if EXPIRATION_SCHEDULE_FIELDS & update_fields:
+        Item.objects.filter(pk=instance.pk).update(
+            next_expiration_alert=instance.next_expiration_alert
+        )
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_rollup(sender, instance, raw=False, **kwargs):
+    """Notes the rollup an existing order is counted in before it is saved, in case its date or item changes."""
+    instance._previous_rollup = None
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Order.objects.filter(pk=instance.pk).values_list("po_date", "item_id").first()
+    )
+    if previous is not None:
+        instance._previous_rollup = (order_month(previous[0]), previous[1])
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cells = {(order_month(instance.po_date), instance.item_id)}
+    if getattr(instance, "_previous_rollup", None) is not None:
+        cells.add(instance._previous_rollup)
+    refresh_order_rollups(cells)
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_order_rollup(sender, instance, **kwargs):
+    refresh_order_rollups({(order_month(instance.po_date), instance.item_id)})
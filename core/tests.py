@@ -1,20 +1,62 @@
+import csv
+import datetime
+import importlib
+import io
+import json
+import os
+import tempfile
+import uuid
 from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
+from urllib.parse import quote
 
+import openpyxl
+import pandas as pd
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import RequestFactory, TestCase
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
 from .models import (
+    COUNTED_MODELS,
     Device,
     DeviceThresholdTransaction,
     Item,
     ItemTransaction,
+    Job,
+    LedgerDateBounds,
+    LowStockChange,
     Notification,
+    NotificationState,
+    Order,
+    OutboxMessage,
+    OrderRollup,
+    TableRowCount,
     WasteReversalRequest,
 )
-from .notification_services import generate_expiration_notifications
+from .export_cache import evict_exports, export_cache_dir, export_cache_key
+from .exports import ExportColumns, orders_for_export, write_orders_xlsx
+from .import_services import ImportMode, import_ledger
+from .jobs import jobs_dir
+from .notification_services import (
+    flush_low_stock_digest,
+    generate_expiration_notifications,
+    inbox,
+)
+from .outbox import claim_messages, drain_outbox, outbox_stats
+from .pagination import STREAM_ROWS_MARKER
+from .rollups import rebuild_order_rollups, refresh_order_rollups, summarize_orders
+from .charts import chart_cache_key, chart_cache_stats
+from .utils import ledger_records, quarters_between
 from .services import (
     ItemAlreadyAvailableError,
     ItemAlreadyWastedError,
@@ -27,11 +69,23 @@ from .services import (
     review_waste_reversal,
     update_device_threshold,
 )
-from .views import HomePageView, WasteLogView
+from .views import HomePageView, ItemDetailsView, WasteLogView
+
 
+# Keeps tests away from the "shared" file cache under the real DATA_DIR, which setUp clears.
+TEST_CACHES = settings.CACHES | {
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared-tests",
+    },
+}
 
+
+@override_settings(CACHES=TEST_CACHES)
 class InventoryTestCase(TestCase):
     def setUp(self):
+        cache.clear()
+        caches["shared"].clear()
         user_model = get_user_model()
         self.user = user_model.objects.create_user(
             username="inventory-user", password="test-password"
@@ -227,18 +281,17 @@ class NotificationServiceTests(InventoryTestCase):
     def test_low_stock_crossing_notifies_existing_active_users_and_resolves(self):
         self._add_second_available_item()
 
-        with self.captureOnCommitCallbacks(execute=True):
-            record_item_removal(udi=self.item.item_no, actor=self.user)
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        drain_outbox()
 
-        notifications = Notification.objects.filter(kind=Notification.Kind.LOW_STOCK)
-        self.assertEqual(notifications.count(), 3)
-        self.assertSetEqual(
-            set(notifications.values_list("recipient__username", flat=True)),
-            {"inventory-user", "inventory-staff", "other-inventory-staff"},
-        )
+        # One broadcast is stored and shown to every user.
+        notification = Notification.objects.get(kind=Notification.Kind.LOW_STOCK)
+        self.assertIsNone(notification.recipient)
+        for user in (self.user, self.staff_user, self.other_staff_user):
+            self.assertTrue(inbox(user).filter(pk=notification.pk).exists())
 
-        with self.captureOnCommitCallbacks(execute=True):
-            record_stock_in(item=self.item, actor=self.user)
+        record_stock_in(item=self.item, actor=self.user)
+        drain_outbox()
 
         self.assertFalse(
             Notification.objects.filter(
@@ -258,13 +311,13 @@ class NotificationServiceTests(InventoryTestCase):
                 actor=self.user,
             )
 
-        with self.captureOnCommitCallbacks(execute=True):
-            change = update_device_threshold(
-                device_id=self.device.pk,
-                threshold=2,
-                actor=self.staff_user,
-                reason="Expected usage increased",
-            )
+        change = update_device_threshold(
+            device_id=self.device.pk,
+            threshold=2,
+            actor=self.staff_user,
+            reason="Expected usage increased",
+        )
+        drain_outbox()
 
         self.device.refresh_from_db()
         self.assertEqual(self.device.low_stock_threshold, 2)
@@ -274,19 +327,60 @@ class NotificationServiceTests(InventoryTestCase):
         self.assertEqual(DeviceThresholdTransaction.objects.count(), 1)
         self.assertEqual(
             Notification.objects.filter(kind=Notification.Kind.LOW_STOCK).count(),
-            3,
+            1,
         )
 
     def test_expiration_generation_is_idempotent_and_does_not_backfill_new_users(self):
         self.item.exp_date = timezone.localdate() + timedelta(days=30)
         self.item.save(update_fields=["exp_date"])
 
-        self.assertEqual(generate_expiration_notifications(), 3)
-        self.assertEqual(generate_expiration_notifications(), 0)
+        self.assertEqual(generate_expiration_notifications().delivered, 3)
+        self.assertEqual(generate_expiration_notifications().delivered, 0)
 
         late_user = get_user_model().objects.create_user(username="late-user")
-        self.assertEqual(generate_expiration_notifications(), 0)
+        self.assertEqual(generate_expiration_notifications().delivered, 0)
         self.assertFalse(Notification.objects.filter(recipient=late_user).exists())
+        self.assertFalse(inbox(late_user).exists())
+
+    def test_broadcast_migration_merges_only_events_every_active_user_received(self):
+        merge_broadcasts = importlib.import_module(
+            "core.migrations.0026_broadcast_notifications"
+        ).merge_broadcasts
+        everyone = (self.user, self.staff_user, self.other_staff_user)
+
+        def fan_out(event_key, recipients):
+            Notification.objects.bulk_create(
+                Notification(
+                    recipient=recipient,
+                    kind=Notification.Kind.EXPIRING_ITEM,
+                    title="Item expiring",
+                    message="An item expires soon.",
+                    event_key=event_key,
+                    read_at=timezone.now() if recipient == self.user else None,
+                )
+                for recipient in recipients
+            )
+
+        fan_out("delivered-to-everyone", everyone)
+        # The other staff user was inactive when this event was delivered.
+        fan_out("delivered-to-some", everyone[:2])
+
+        merge_broadcasts(django_apps, None)
+
+        broadcast = Notification.objects.get(event_key="delivered-to-everyone")
+        self.assertIsNone(broadcast.recipient)
+        self.assertIsNotNone(inbox(self.user).get(pk=broadcast.pk).inbox_read_at)
+        self.assertEqual(
+            set(
+                Notification.objects.filter(
+                    event_key="delivered-to-some"
+                ).values_list("recipient", flat=True)
+            ),
+            {self.user.pk, self.staff_user.pk},
+        )
+        self.assertFalse(
+            inbox(self.other_staff_user).filter(event_key="delivered-to-some").exists()
+        )
 
     def test_expired_item_alert_is_generated_at_zero_days(self):
         self.item.exp_date = timezone.localdate()
@@ -296,11 +390,11 @@ class NotificationServiceTests(InventoryTestCase):
 
         self.assertEqual(
             Notification.objects.filter(kind=Notification.Kind.EXPIRED_ITEM).count(),
-            3,
+            1,
         )
 
-        with self.captureOnCommitCallbacks(execute=True):
-            record_item_removal(udi=self.item.item_no, actor=self.user)
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        drain_outbox()
         self.assertFalse(
             Notification.objects.filter(
                 kind=Notification.Kind.EXPIRED_ITEM,
@@ -316,26 +410,74 @@ class NotificationServiceTests(InventoryTestCase):
         for days_remaining in (30, 14, 7, 1, 0):
             delivered = generate_expiration_notifications(
                 today=expiration_date - timedelta(days=days_remaining)
-            )
+            ).delivered
             self.assertEqual(delivered, 3)
 
-        self.assertEqual(Notification.objects.count(), 15)
+        self.assertEqual(Notification.objects.count(), 5)
         self.assertEqual(
             Notification.objects.filter(kind=Notification.Kind.EXPIRED_ITEM).count(),
-            3,
+            1,
         )
 
+    def test_expiration_alerts_are_generated_in_batches(self):
+        today = timezone.localdate()
+        Item.objects.bulk_create(
+            Item(
+                item=f"Expiring {index}",
+                item_no=f"EXP-{index:03d}",
+                exp_date=today + timedelta(days=index % 40),
+                device=self.device,
+                is_available=True,
+            )
+            for index in range(40)
+        )
+        self.assertEqual(Item.reschedule_expiration_alerts(), 40)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = generate_expiration_notifications(batch_size=20)
+
+        # Only the items expiring within 30 days are due, and each has reached a milestone.
+        self.assertEqual((result.items, result.events, result.delivered), (31, 31, 93))
+        self.assertEqual(Notification.objects.count(), 31)
+        self.assertLess(len(queries), 20)
+        self.assertIn("items/sec", str(result))
+        self.assertEqual(generate_expiration_notifications(batch_size=20).delivered, 0)
+
+    def test_expiration_alerts_are_scheduled_on_write_and_advanced_when_sent(self):
+        today = timezone.localdate()
+        self.assertIsNone(self.item.next_expiration_alert)
+
+        self.item.exp_date = today + timedelta(days=10)
+        self.item.save(update_fields=["exp_date"])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.next_expiration_alert, today - timedelta(days=20))
+
+        self.assertEqual(generate_expiration_notifications().events, 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.next_expiration_alert, today + timedelta(days=3))
+        # Nothing is due again until the 7-day milestone.
+        self.assertEqual(generate_expiration_notifications(today=today + timedelta(days=2)).items, 0)
+        self.assertEqual(generate_expiration_notifications(today=today + timedelta(days=3)).events, 1)
+
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        self.item.refresh_from_db()
+        self.assertIsNone(self.item.next_expiration_alert)
+
+        record_stock_in(item=self.item, actor=self.user)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.next_expiration_alert, today - timedelta(days=20))
+
     def test_waste_reversal_notifications_follow_review_permissions(self):
         waste_transaction = record_item_removal(
             udi=self.item.item_no,
             actor=self.user,
             is_waste=True,
         )
-        with self.captureOnCommitCallbacks(execute=True):
-            reversal_request = request_waste_reversal(
-                transaction_id=waste_transaction.pk,
-                requested_by=self.user,
-            )
+        reversal_request = request_waste_reversal(
+            transaction_id=waste_transaction.pk,
+            requested_by=self.user,
+        )
+        drain_outbox()
 
         review_notifications = Notification.objects.filter(
             kind=Notification.Kind.WASTE_REVERSAL_REQUESTED
@@ -345,12 +487,12 @@ class NotificationServiceTests(InventoryTestCase):
             {self.staff_user.pk, self.other_staff_user.pk},
         )
 
-        with self.captureOnCommitCallbacks(execute=True):
-            review_waste_reversal(
-                request_id=reversal_request.pk,
-                reviewer=self.staff_user,
-                approve=True,
-            )
+        review_waste_reversal(
+            request_id=reversal_request.pk,
+            reviewer=self.staff_user,
+            approve=True,
+        )
+        drain_outbox()
 
         resolution = Notification.objects.get(
             kind=Notification.Kind.WASTE_REVERSAL_APPROVED
@@ -422,6 +564,32 @@ class InventoryBrowserTests(InventoryTestCase):
         self.assertIsNotNone(second_own_notification.dismissed_at)
         self.assertIsNone(other_notification.dismissed_at)
 
+    def test_broadcast_read_and_dismiss_state_is_kept_per_user(self):
+        broadcast = Notification.objects.create(
+            kind=Notification.Kind.LOW_STOCK,
+            severity=Notification.Severity.WARNING,
+            title="Broadcast alert",
+            message="Broadcast message",
+            event_key="broadcast-event",
+        )
+        self.client.force_login(self.user)
+
+        self.client.post(reverse("mark-notification-read", args=[broadcast.pk]))
+        self.assertIsNotNone(inbox(self.user).get(pk=broadcast.pk).inbox_read_at)
+        self.assertIsNone(inbox(self.staff_user).get(pk=broadcast.pk).inbox_read_at)
+
+        self.client.post(reverse("dismiss-notification", args=[broadcast.pk]))
+        response = self.client.get(reverse("notifications"))
+        self.assertNotContains(response, "Broadcast alert")
+        self.client.force_login(self.staff_user)
+        self.assertContains(self.client.get(reverse("notifications")), "Broadcast alert")
+
+        # Only the user who acted on the broadcast has a state row, and the broadcast itself is unchanged.
+        self.assertEqual(NotificationState.objects.get().user, self.user)
+        broadcast.refresh_from_db()
+        self.assertIsNone(broadcast.read_at)
+        self.assertIsNone(broadcast.dismissed_at)
+
     def test_device_links_to_item_page_filtered_to_that_device(self):
         other_device = Device.objects.create(
             manufacturer="Other Manufacturer",
@@ -549,3 +717,1305 @@ class InventoryBrowserTests(InventoryTestCase):
         self.assertEqual(
             reversal_request.status, WasteReversalRequest.Status.APPROVED
         )
+
+
+LEDGER_COLUMNS = [
+    "ITEM",
+    "ITEM_NO",
+    "MFR",
+    "MFR CAT",
+    "DESCR",
+    "VENDOR",
+    "VEND CAT",
+    "RECV QTY",
+    "UM",
+    "PRICE",
+    "TOTAL COST",
+    "Expr1010",
+    "PO_NO",
+    "PO_DATE",
+    "VEND_CODE",
+    "dbo_VEND.NAME",
+    "dbo_CC.NAME",
+    "ACCT_NO",
+    "RCV_DATE",
+]
+
+
+def ledger_row(index, item_no="LEDGER-ITEM-1", po_date=None):
+    po_date = po_date or datetime.datetime(2025, 1, 15, 9, 30)
+    return [
+        f"Ledger item {item_no}",
+        item_no,
+        "Ledger Manufacturer",
+        "LEDGER-CAT",
+        "Ledger description",
+        "Ledger Vendor",
+        f"VEND-{index}",
+        2,
+        "EA",
+        12.5,
+        25.0,
+        "expr",
+        f"PO-{index}",
+        po_date,
+        "VC-1",
+        "Ledger Vendor Inc.",
+        "Interventional Radiology",
+        4100,
+        po_date + timedelta(days=3),
+    ]
+
+
+def ledger_workbook(rows) -> bytes:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(LEDGER_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class JobQueueTestCase(InventoryTestCase):
+    """Keeps job inputs and results in a temporary ``DATA_DIR``."""
+
+    def setUp(self):
+        super().setUp()
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        settings_override = override_settings(DATA_DIR=data_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def run_jobs(self):
+        call_command("run_jobs", "--once", stdout=io.StringIO())
+
+
+class LedgerImportTests(JobQueueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin_user = get_user_model().objects.create_superuser(
+            username="ledger-admin", password="test-password"
+        )
+        self.client.force_login(self.admin_user)
+
+    def _upload(self, rows):
+        return self.client.post(
+            reverse("admin:import_excel"),
+            {
+                "excel_file": SimpleUploadedFile(
+                    "ledger.xlsx",
+                    ledger_workbook(rows),
+                    content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                ),
+                "mode": ImportMode.SKIP,
+            },
+        )
+
+    def test_import_creates_orders_and_missing_items_in_bulk(self):
+        rows = [
+            ledger_row(index, item_no=f"LEDGER-ITEM-{index % 2}")
+            for index in range(1, 40)
+        ]
+        rows.append(ledger_row(40, item_no=self.item.item_no))
+
+        response = self._upload(rows)
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse("job-details", args=[job.pk]))
+        self.assertEqual(Order.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual((job.progress, job.total), (40, 40))
+        self.assertLess(len(queries), 40)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(Item.objects.count(), 3)
+        self.assertEqual(
+            Order.objects.filter(item__item_no="LEDGER-ITEM-1").count(), 20
+        )
+        order = Order.objects.get(po_no="PO-40")
+        self.assertEqual(order.item, self.item)
+        self.assertEqual(order.total_cost.amount, Decimal("25.00"))
+        self.assertEqual(order.acct_no, 4100)
+        self.assertEqual(
+            order.po_date,
+            datetime.datetime(2025, 1, 15, 15, 30, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_import_progress_is_published_outside_the_import_transaction(self):
+        self._upload([ledger_row(index) for index in range(1, 6)])
+        job = Job.objects.get()
+        seen = []
+
+        def import_in_batches(path, *, mode, progress):
+            def report(result):
+                progress(result)
+                # Read as another process would: a new cache connection, not the import's transaction.
+                seen.append(
+                    caches.create_connection("shared").get(f"jobs:progress:{job.pk}")
+                )
+
+            return import_ledger(path, mode=mode, batch_size=2, progress=report)
+
+        with mock.patch("core.jobs.import_ledger", import_in_batches):
+            self.run_jobs()
+
+        self.assertEqual(seen, [(2, 5), (4, 5), (5, 5)])
+        response = self.client.get(reverse("job-progress", args=[job.pk]))
+        self.assertEqual((response.json()["progress"], response.json()["total"]), (5, 5))
+
+    def test_interrupted_import_keeps_its_upload_and_runs_again(self):
+        self._upload([ledger_row(index) for index in range(1, 6)])
+        job = Job.objects.get()
+
+        with mock.patch("core.jobs.import_ledger", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_jobs()
+        self.assertTrue((jobs_dir() / job.input_file).exists())
+
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(Order.objects.count(), 5)
+        self.assertFalse((jobs_dir() / job.input_file).exists())
+
+    def test_streamed_import_handles_chunks_without_receive_dates(self):
+        rows = [ledger_row(index) for index in range(1, 6)]
+        for row in rows[2:4]:
+            row[-1] = None
+        rows.insert(3, [None] * len(LEDGER_COLUMNS))
+
+        result = import_ledger(io.BytesIO(ledger_workbook(rows)), batch_size=2)
+
+        self.assertEqual(result.rows, 5)
+        self.assertEqual(result.items_created, 1)
+        self.assertEqual(Order.objects.filter(rcv_date__isnull=True).count(), 2)
+
+    def test_ledger_normalization_resolves_aliases_and_converts_columns(self):
+        aliases = {"dbo_CC.NAME": "Expr1016", "ACCT_NO": "Expr1017"}
+        columns = [aliases.get(column, column) for column in LEDGER_COLUMNS]
+        row = ledger_row(7, po_date=datetime.datetime(2025, 7, 1, 8, 0))
+        row[1] = None
+        row[12] = 70001
+        frame = pd.DataFrame([row], columns=columns)
+
+        [(identifier, item_defaults, data)] = ledger_records(frame)
+
+        self.assertEqual(identifier, "Ledger item LEDGER-ITEM-1")
+        self.assertEqual(item_defaults["item_no"], "")
+        self.assertEqual(data["dbo_cc_name"], "Interventional Radiology")
+        self.assertEqual(data["acct_no"], 4100)
+        self.assertEqual(data["po_no"], "70001")
+        self.assertEqual(data["total_cost"], 25.0)
+        self.assertEqual(
+            data["po_date"],
+            datetime.datetime(2025, 7, 1, 13, 0, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_reimport_skips_or_updates_rows_by_fingerprint(self):
+        rows = [ledger_row(index) for index in range(1, 4)]
+        import_ledger(io.BytesIO(ledger_workbook(rows)))
+        self.assertEqual(Order.objects.exclude(fingerprint="").count(), 3)
+
+        rows[0][9] = 99.0
+        rows.append(ledger_row(4))
+        result = import_ledger(io.BytesIO(ledger_workbook(rows)))
+        self.assertEqual((result.created, result.skipped), (1, 3))
+        self.assertEqual(Order.objects.count(), 4)
+        self.assertEqual(Order.objects.get(po_no="PO-1").price.amount, Decimal("12.50"))
+
+        result = import_ledger(
+            io.BytesIO(ledger_workbook(rows)), mode=ImportMode.UPDATE
+        )
+        self.assertEqual((result.created, result.updated), (0, 4))
+        self.assertEqual(Order.objects.count(), 4)
+        self.assertEqual(Order.objects.get(po_no="PO-1").price.amount, Decimal("99.00"))
+
+    def test_saved_order_fingerprint_matches_imported_row(self):
+        import_ledger(io.BytesIO(ledger_workbook([ledger_row(1)])))
+        order = Order.objects.get()
+        imported_fingerprint = order.fingerprint
+
+        order.save()
+
+        self.assertEqual(order.fingerprint, imported_fingerprint)
+
+
+class ExportJobTests(JobQueueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        import_ledger(io.BytesIO(ledger_workbook([ledger_row(1), ledger_row(2)])))
+
+    def test_export_runs_in_background_and_can_be_downloaded(self):
+        response = self.client.get(
+            reverse("export-orders"),
+            {"start_date": "2025-01-01", "end_date": "2025-01-31"},
+        )
+        job = Job.objects.get(kind=Job.Kind.EXPORT_ORDERS)
+        self.assertRedirects(response, reverse("job-details", args=[job.pk]))
+
+        progress = self.client.get(reverse("job-progress", args=[job.pk])).json()
+        self.assertEqual(progress["status"], Job.Status.QUEUED)
+        self.assertIsNone(progress["result_url"])
+
+        self.run_jobs()
+
+        progress = self.client.get(reverse("job-progress", args=[job.pk])).json()
+        self.assertEqual(progress["status"], Job.Status.SUCCEEDED)
+        self.assertEqual((progress["progress"], progress["total"]), (2, 2))
+
+        response = self.client.get(progress["result_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'filename="Orders_2025-01-01_2025-01-31.xlsx"',
+            response["Content-Disposition"],
+        )
+        sheet = openpyxl.load_workbook(
+            io.BytesIO(b"".join(response.streaming_content))
+        ).active
+        self.assertEqual(sheet.max_row, 3)
+
+    def test_export_queries_do_not_grow_with_rows(self):
+        def export_queries() -> int:
+            Item.objects.update(device=self.device)
+            with CaptureQueriesContext(connection) as queries:
+                write_orders_xlsx(io.BytesIO(), None, None)
+            return len(queries)
+
+        queries = export_queries()
+        import_ledger(
+            io.BytesIO(
+                ledger_workbook(
+                    [
+                        ledger_row(index, item_no=f"LEDGER-ITEM-{index}")
+                        for index in range(3, 9)
+                    ]
+                )
+            )
+        )
+
+        self.assertEqual(export_queries(), queries)
+
+    def test_export_is_formatted_like_the_ledger(self):
+        params = {"start_date": "2025-01-01", "end_date": "2025-01-31"}
+        self.client.get(reverse("export-orders"), params)
+        self.run_jobs()
+        response = self.client.get(reverse("export-orders"), params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        streamed = openpyxl.load_workbook(
+            io.BytesIO(b"".join(response.streaming_content))
+        ).active
+        columns = ExportColumns()
+        expected_rows = [columns.headers] + [
+            columns.row(order)
+            for order in orders_for_export(params["start_date"], params["end_date"])
+        ]
+
+        self.assertEqual(streamed.title, "2025-01-01_2025-01-31")
+        self.assertEqual(
+            [[cell.value for cell in row] for row in streamed.iter_rows()],
+            expected_rows,
+        )
+        header = streamed.cell(row=1, column=1)
+        self.assertTrue(header.font.bold)
+        self.assertEqual(header.fill.fgColor.rgb, "FFC0C0C0")
+        price_column = [cell.value for cell in streamed[1]].index("PRICE") + 1
+        self.assertEqual(
+            streamed.cell(row=2, column=price_column).number_format,
+            '"$"#,##0.00',
+        )
+        # XlsxWriter merges adjacent columns of equal width into one range.
+        streamed_widths = {
+            column: dimension.width
+            for dimension in streamed.column_dimensions.values()
+            if dimension.min
+            for column in range(dimension.min, dimension.max + 1)
+        }
+        for column, width in enumerate(columns.widths, start=1):
+            self.assertAlmostEqual(streamed_widths[column], width + 2, delta=1)
+
+    def test_repeat_export_is_served_from_cache_until_orders_change(self):
+        params = {"start_date": "2025-01-01", "end_date": "2025-01-31"}
+        self.client.get(reverse("export-orders"), params)
+        self.run_jobs()
+
+        response = self.client.get(reverse("export-orders"), params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'filename="Orders_2025-01-01_2025-01-31.xlsx"',
+            response["Content-Disposition"],
+        )
+        self.assertEqual(Job.objects.count(), 1)
+
+        order = Order.objects.first()
+        order.vendor = "Edited Vendor"
+        order.save()
+        response = self.client.get(reverse("export-orders"), params)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_import_changes_export_cache_key(self):
+        key = export_cache_key("2025-01-01", "2025-01-31")
+        self.assertEqual(key, export_cache_key("2025-1-01", "2025-01-31"))
+
+        import_ledger(io.BytesIO(ledger_workbook([ledger_row(1)])))
+        self.assertEqual(key, export_cache_key("2025-01-01", "2025-01-31"))
+
+        import_ledger(io.BytesIO(ledger_workbook([ledger_row(3)])))
+        self.assertNotEqual(key, export_cache_key("2025-01-01", "2025-01-31"))
+
+    def test_export_cache_evicts_least_recently_used_files(self):
+        for age, name in enumerate(["newest", "middle", "oldest"]):
+            path = export_cache_dir() / f"{name}.xlsx"
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (1_000_000 - age, 1_000_000 - age))
+
+        self.assertEqual(evict_exports(max_bytes=250), 1)
+
+        self.assertEqual(
+            sorted(path.stem for path in export_cache_dir().iterdir()),
+            ["middle", "newest"],
+        )
+
+    def test_failed_job_records_its_error(self):
+        job = Job.objects.create(
+            kind=Job.Kind.IMPORT_ORDERS, input_file="missing.xlsx"
+        )
+
+        with self.assertLogs("core.jobs", level="ERROR"):
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn("FileNotFoundError", job.message)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_import_removes_its_upload(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser(username="ledger-admin")
+        )
+        self.client.post(
+            reverse("admin:import_excel"),
+            {
+                "excel_file": SimpleUploadedFile("ledger.xlsx", b"not a workbook"),
+                "mode": ImportMode.SKIP,
+            },
+        )
+        job = Job.objects.get()
+
+        with self.assertLogs("core.jobs", level="ERROR"):
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertFalse((jobs_dir() / job.input_file).exists())
+
+
+class RecordExportTests(InventoryTestCase):
+    def test_order_csv_export_applies_order_details_filters(self):
+        import_ledger(
+            io.BytesIO(
+                ledger_workbook(
+                    [
+                        ledger_row(1),
+                        ledger_row(2),
+                        ledger_row(3, po_date=datetime.datetime(2024, 6, 1, 9, 0)),
+                    ]
+                )
+            )
+        )
+
+        response = self.client.get(
+            reverse("export-order-records", args=["csv"]),
+            {
+                "start_date": "2025-01-01",
+                "end_date": "2025-01-31",
+                "search_field": "po_no",
+                "search_term": "PO-2",
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn(
+            'filename="Orders_2025-01-01_2025-01-31.csv"',
+            response["Content-Disposition"],
+        )
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["po_no"], "PO-2")
+        self.assertEqual(rows[0]["price"], "12.50")
+        self.assertEqual(rows[0]["item__item_no"], "LEDGER-ITEM-1")
+        self.assertEqual(rows[0]["po_date"], "2025-01-15T15:30:00+00:00")
+
+    def test_item_transaction_ndjson_export_streams_one_object_per_row(self):
+        first = record_item_removal(udi=self.item.item_no, actor=self.user)
+        second = record_stock_in(item=self.item, actor=self.user)
+
+        response = self.client.get(
+            reverse("export-itemtransaction-records", args=["ndjson"]),
+            {"sort": "-id"},
+        )
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([record["id"] for record in records], [second.pk, first.pk])
+        self.assertEqual(records[0]["item__item_no"], self.item.item_no)
+        self.assertEqual(records[0]["created_by_id"], self.user.pk)
+
+    def test_unsupported_export_format_is_not_found(self):
+        response = self.client.get(reverse("export-order-records", args=["xml"]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchIndexTests(InventoryTestCase):
+    def _search(self, url_name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        return response, queries
+
+    def test_item_search_uses_index_and_stays_in_sync(self):
+        response, queries = self._search("item-details", search_term="physical inv")
+        self.assertEqual(list(response.context["items"]), [self.item])
+        self.assertTrue(any("MATCH" in query["sql"] for query in queries))
+
+        self.item.descr = "Replacement description"
+        self.item.save()
+        response, _ = self._search("item-details", search_term="physical inv")
+        self.assertEqual(list(response.context["items"]), [])
+        response, _ = self._search(
+            "item-details", search_field="descr", search_term="REPLACEMENT"
+        )
+        self.assertEqual(list(response.context["items"]), [self.item])
+
+    def test_order_search_ranks_best_matches_first(self):
+        import_ledger(
+            io.BytesIO(ledger_workbook([ledger_row(1), ledger_row(2), ledger_row(3)]))
+        )
+        Order.objects.filter(po_no="PO-2").update(
+            vendor="Acme Acme", dbo_vend_name="Acme Supply"
+        )
+        Order.objects.filter(po_no="PO-3").update(vendor="Acme")
+
+        response, _ = self._search(
+            "order-details", start_date="2025-01-01", search_term="acme"
+        )
+
+        self.assertEqual(
+            [order.po_no for order in response.context["orders"]], ["PO-2", "PO-3"]
+        )
+
+    def test_transaction_search_matches_notes_and_item_fields(self):
+        removal = record_item_removal(
+            udi=self.item.item_no,
+            actor=self.user,
+            is_waste=True,
+            notes="Dropped on the floor",
+        )
+        response, _ = self._search(
+            "itemtransaction-details", start_date="2020-01-01", search_term="floor"
+        )
+        self.assertEqual(list(response.context["item_transactions"]), [removal])
+
+        response, _ = self._search(
+            "itemtransaction-details", start_date="2020-01-01", search_term="CAT-001"
+        )
+        self.assertEqual(list(response.context["item_transactions"]), [removal])
+
+    def test_transaction_search_matches_unindexed_type_fields(self):
+        removal = record_item_removal(
+            udi=self.item.item_no,
+            actor=self.user,
+            is_waste=True,
+            notes="Dropped on the floor",
+        )
+        response, queries = self._search(
+            "itemtransaction-details", start_date="2020-01-01", search_term="WASTE"
+        )
+        self.assertTrue(any("MATCH" in query["sql"] for query in queries))
+        self.assertEqual(list(response.context["item_transactions"]), [removal])
+
+    def test_short_terms_fall_back_to_contains(self):
+        response, queries = self._search("item-details", search_term="01")
+
+        self.assertEqual(list(response.context["items"]), [self.item])
+        self.assertFalse(any("MATCH" in query["sql"] for query in queries))
+
+
+class CursorPaginationTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        other_device = Device.objects.create(
+            manufacturer="Example Manufacturer",
+            device_name="Other Device",
+            device_identifier="DI-002",
+        )
+        for index in range(11):
+            Item.objects.create(
+                item=f"Paged item {index}",
+                item_no=f"PAGE-{index:03d}",
+                mfr=f"Manufacturer {index % 3}",
+                mfr_cat=f"CAT-{index}",
+                descr="Paged item",
+                device=[None, self.device, other_device][index % 3],
+            )
+        self.client.force_login(self.user)
+
+    def _walk(self, sort):
+        """Follows the cursors of the item list with `sort`, returning the ids of each page."""
+        pages, cursor = [], ""
+        while cursor is not None:
+            response = self.client.get(
+                reverse("item-details"), {"sort": sort, "per_page": 5, "cursor": cursor}
+            )
+            page = response.context["page_obj"]
+            pages.append([item.pk for item in page])
+            cursor = page.next_cursor
+        return pages, page
+
+    def _expected(self, sort):
+        lookup = sort.lstrip("-")
+        ordering = (
+            [F(lookup).desc(nulls_last=True), "-pk"]
+            if sort.startswith("-")
+            else [F(lookup).asc(nulls_first=True), "pk"]
+        )
+        return list(Item.objects.order_by(*ordering).values_list("pk", flat=True))
+
+    def test_cursors_walk_every_row_once_in_sort_order(self):
+        for sort in ("mfr", "-mfr", "device", "-device", "-id"):
+            with self.subTest(sort=sort):
+                pages, _ = self._walk(sort)
+
+                self.assertEqual([len(page) for page in pages], [5, 5, 2])
+                self.assertEqual(sum(pages, []), self._expected(sort))
+
+    def test_previous_cursor_returns_the_same_pages(self):
+        pages, last_page = self._walk("-device")
+
+        response = self.client.get(
+            reverse("item-details"),
+            {"sort": "-device", "per_page": 5, "cursor": last_page.previous_cursor},
+        )
+
+        page = response.context["page_obj"]
+        self.assertEqual([item.pk for item in page], pages[1])
+        self.assertTrue(page.has_previous)
+        self.assertTrue(page.has_next)
+
+    def test_deep_pages_seek_instead_of_counting_or_skipping(self):
+        _, last_page = self._walk("mfr")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("item-details"),
+                {"sort": "mfr", "per_page": 5, "cursor": last_page.previous_cursor},
+            )
+
+        self.assertIsNone(response.context["paginator"])
+        self.assertContains(response, "cursor=")
+        item_queries = [
+            query["sql"] for query in queries if 'FROM "core_item"' in query["sql"]
+        ]
+        self.assertEqual(len(item_queries), 1)
+        self.assertNotIn("OFFSET", item_queries[0])
+        self.assertNotIn("COUNT(", item_queries[0])
+
+    @override_settings(CURSOR_PAGE_THRESHOLD=2)
+    def test_pager_switches_to_cursors_past_the_threshold(self):
+        expected = self._expected("mfr")
+        params = {"sort": "mfr", "per_page": 3}
+
+        response = self.client.get(reverse("item-details"), params)
+        self.assertIsNone(response.context["cursor_next"])
+        self.assertIsNotNone(response.context["cursor_last"])
+
+        response = self.client.get(reverse("item-details"), {**params, "page": 2})
+        self.assertEqual([item.pk for item in response.context["page_obj"]], expected[3:6])
+        cursor = response.context["cursor_next"]
+        self.assertContains(response, f"cursor={quote(cursor)}")
+
+        response = self.client.get(reverse("item-details"), {**params, "cursor": cursor})
+        page = response.context["page_obj"]
+        self.assertTrue(response.context["cursor_pagination"])
+        self.assertEqual([item.pk for item in page], expected[6:9])
+
+        response = self.client.get(
+            reverse("item-details"), {**params, "cursor": response.context["cursor_last"]}
+        )
+        page = response.context["page_obj"]
+        self.assertEqual([item.pk for item in page], expected[-3:])
+        self.assertTrue(page.has_previous)
+        self.assertFalse(page.has_next)
+
+    @override_settings(CURSOR_PAGE_THRESHOLD=1)
+    def test_ranked_search_keeps_page_numbers(self):
+        params = {"search_term": "Paged item", "per_page": 3}
+        ranked = self.client.get(reverse("item-details"), params)
+
+        response = self.client.get(reverse("item-details"), {**params, "cursor": ""})
+
+        self.assertFalse(response.context["cursor_pagination"])
+        self.assertIsNone(response.context["cursor_next"])
+        self.assertIsNotNone(response.context["paginator"])
+        self.assertEqual(
+            list(response.context["page_obj"]), list(ranked.context["page_obj"])
+        )
+
+    def test_invalid_cursor_starts_from_the_first_page(self):
+        response = self.client.get(reverse("waste-log"), {"cursor": "tampered"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["page_obj"].has_previous)
+
+
+class CachedCountTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(3):
+            record_item_removal(udi=self.item.item_no, actor=self.user)
+            record_stock_in(item=self.item, actor=self.user)
+        self.client.force_login(self.user)
+
+    def _count_queries(self, url_name, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        counts = [
+            query["sql"]
+            for query in queries
+            if "COUNT(" in query["sql"] and "core_notification" not in query["sql"]
+        ]
+        return response, counts
+
+    def test_filtered_count_runs_once_and_is_reused(self):
+        params = {"start_date": "2020-01-01", "per_page": 5, "search_term": "Example"}
+
+        response, counts = self._count_queries("itemtransaction-details", params)
+        self.assertEqual(response.context["items_count"], 6)
+        self.assertEqual(len(counts), 1)
+
+        response, counts = self._count_queries("itemtransaction-details", params)
+        self.assertEqual(response.context["items_count"], 6)
+        self.assertEqual(counts, [])
+
+    def test_new_rows_invalidate_the_cached_count(self):
+        params = {"start_date": "2020-01-01"}
+        self._count_queries("itemtransaction-details", params)
+
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        response, counts = self._count_queries("itemtransaction-details", params)
+
+        self.assertEqual(response.context["items_count"], 7)
+        self.assertEqual(len(counts), 1)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_unfiltered_large_table_is_estimated(self):
+        response, counts = self._count_queries("item-details", {})
+
+        self.assertEqual(counts, [])
+        self.assertTrue(response.context["paginator"].count_is_estimate)
+        self.assertEqual(response.context["items_count"], 1)
+
+        response, counts = self._count_queries("item-details", {"search_term": "Example"})
+        self.assertFalse(response.context["paginator"].count_is_estimate)
+        self.assertEqual(len(counts), 1)
+
+
+class StreamAllTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(4):
+            Item.objects.create(
+                item=f"Streamed item {index}",
+                item_no=f"STREAM-{index:03d}",
+                mfr="Example Manufacturer",
+                mfr_cat=f"CAT-{index}",
+                descr="Streamed item",
+                device=self.device,
+            )
+        self.client.force_login(self.user)
+
+    def test_all_rows_are_streamed_in_batches(self):
+        with mock.patch.object(ItemDetailsView, "stream_batch_size", 2):
+            response = self.client.get(
+                reverse("item-details"), {"per_page": "All", "sort": "item_no"}
+            )
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+
+        self.assertTrue(response.streaming)
+        # The page up to the rows, three batches of rows, then the rest of the page.
+        self.assertEqual(len(chunks), 5)
+        self.assertIn("</thead>", chunks[0])
+        self.assertEqual([chunk.count("<tr>") for chunk in chunks[1:4]], [2, 2, 1])
+        self.assertLess(chunks[1].index("STREAM-000"), chunks[1].index("STREAM-001"))
+        self.assertIn("UDI-001", chunks[3])
+        self.assertIn("</html>", chunks[4])
+
+    def test_streamed_page_without_rows_shows_message(self):
+        response = self.client.get(
+            reverse("order-details"), {"per_page": "All", "start_date": "2025-01-01"}
+        )
+
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("No orders available yet.", content)
+        self.assertNotIn(STREAM_ROWS_MARKER, content)
+
+
+class ItemAutocompleteTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            Item.objects.create(
+                item=f"Catheter {index}",
+                item_no=f"CATH-{index:03d}",
+                mfr="Example Manufacturer",
+                mfr_cat=f"CAT-{index}",
+                descr=f"Balloon catheter size {index}",
+            )
+
+    def _suggest(self, **params):
+        response = self.client.get(reverse("item-autocomplete"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_prefix_and_substring_matches(self):
+        data = self._suggest(q="CATH-00")
+        self.assertEqual(
+            [result["item_no"] for result in data["results"]],
+            [f"CATH-{index:03d}" for index in range(5)],
+        )
+        self.assertEqual(data["results"][0]["label"], "Balloon catheter size 0 (CATH-000)")
+
+        data = self._suggest(q="physical")
+        self.assertEqual([result["item_no"] for result in data["results"]], ["UDI-001"])
+
+    def test_results_load_incrementally(self):
+        data = self._suggest(q="catheter", limit=2)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(data["next"], "CATH-001")
+
+        loaded = [result["item_no"] for result in data["results"]]
+        while data["next"]:
+            data = self._suggest(q="catheter", limit=2, after=data["next"])
+            loaded += [result["item_no"] for result in data["results"]]
+        self.assertEqual(loaded, [f"CATH-{index:03d}" for index in range(5)])
+
+    def test_ledger_page_only_lists_selected_items(self):
+        response = self.client.get(
+            reverse("itemtransaction-details"), {"category[]": ["CATH-002"]}
+        )
+
+        self.assertNotIn("all_items", response.context)
+        self.assertEqual(
+            response.context["selected_items"],
+            [("CATH-002", "Balloon catheter size 2")],
+        )
+        self.assertContains(response, reverse("item-autocomplete"))
+        self.assertNotContains(response, "CATH-003")
+
+
+class OrderRollupTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        import_ledger(
+            io.BytesIO(
+                ledger_workbook(
+                    [
+                        ledger_row(1, po_date=datetime.datetime(2025, 1, 15, 9, 30)),
+                        ledger_row(2, po_date=datetime.datetime(2025, 1, 31, 22, 0)),
+                        ledger_row(3, po_date=datetime.datetime(2025, 2, 3, 9, 30)),
+                        ledger_row(
+                            4,
+                            item_no=self.item.item_no,
+                            po_date=datetime.datetime(2025, 3, 10, 9, 30),
+                        ),
+                    ]
+                )
+            )
+        )
+
+    def _rollups(self):
+        return {
+            (rollup.month.isoformat(), rollup.item.item_no): (
+                rollup.order_count,
+                rollup.total_cost,
+                rollup.quantity,
+            )
+            for rollup in OrderRollup.objects.select_related("item")
+        }
+
+    def test_import_and_order_changes_keep_rollups_current(self):
+        self.assertEqual(
+            self._rollups(),
+            {
+                ("2025-01-01", "LEDGER-ITEM-1"): (2, Decimal("50.00"), 4),
+                ("2025-02-01", "LEDGER-ITEM-1"): (1, Decimal("25.00"), 2),
+                ("2025-03-01", "UDI-001"): (1, Decimal("25.00"), 2),
+            },
+        )
+
+        order = Order.objects.get(po_no="PO-3")
+        order.po_date = timezone.make_aware(datetime.datetime(2025, 3, 1, 8, 0))
+        order.item = self.item
+        order.save()
+        Order.objects.get(po_no="PO-1").delete()
+
+        expected = {
+            ("2025-01-01", "LEDGER-ITEM-1"): (1, Decimal("25.00"), 2),
+            ("2025-03-01", "UDI-001"): (2, Decimal("50.00"), 4),
+        }
+        self.assertEqual(self._rollups(), expected)
+        rebuild_order_rollups()
+        self.assertEqual(self._rollups(), expected)
+
+    def test_refresh_recomputes_only_the_given_cells(self):
+        item = Item.objects.get(item_no="LEDGER-ITEM-1")
+        OrderRollup.objects.update(order_count=99)
+
+        refresh_order_rollups(
+            {
+                (datetime.date(2025, 1, 1), item.pk),
+                (datetime.date(2025, 3, 1), self.item.pk),
+            }
+        )
+
+        self.assertEqual(
+            {key: counts[0] for key, counts in self._rollups().items()},
+            {
+                ("2025-01-01", "LEDGER-ITEM-1"): 2,
+                ("2025-02-01", "LEDGER-ITEM-1"): 99,
+                ("2025-03-01", "UDI-001"): 1,
+            },
+        )
+
+    def test_update_import_refreshes_the_rollup_an_order_moved_from(self):
+        order = Order.objects.get(po_no="PO-3")
+        order.po_date = timezone.make_aware(datetime.datetime(2025, 3, 1, 8, 0))
+        order.save(update_fields=["po_date"])
+        self.assertIn(("2025-03-01", "LEDGER-ITEM-1"), self._rollups())
+
+        import_ledger(
+            io.BytesIO(
+                ledger_workbook(
+                    [ledger_row(3, po_date=datetime.datetime(2025, 2, 3, 9, 30))]
+                )
+            ),
+            mode=ImportMode.UPDATE,
+        )
+
+        self.assertEqual(
+            self._rollups(),
+            {
+                ("2025-01-01", "LEDGER-ITEM-1"): (2, Decimal("50.00"), 4),
+                ("2025-02-01", "LEDGER-ITEM-1"): (1, Decimal("25.00"), 2),
+                ("2025-03-01", "UDI-001"): (1, Decimal("25.00"), 2),
+            },
+        )
+
+    def test_summary_combines_rollups_with_partial_months(self):
+        start = timezone.make_aware(datetime.datetime(2025, 1, 20))
+        end = timezone.make_aware(datetime.datetime(2025, 3, 5, 23, 59, 59, 999999))
+
+        summary = summarize_orders(start, end)
+
+        self.assertEqual(
+            summary.months,
+            {
+                datetime.date(2025, 1, 1): (1, Decimal("25.00")),
+                datetime.date(2025, 2, 1): (1, Decimal("25.00")),
+            },
+        )
+        self.assertEqual(
+            summary.quarters, {datetime.date(2025, 1, 1): (2, Decimal("50.00"))}
+        )
+        self.assertEqual(summary.items, {"Ledger item LEDGER-ITEM-1": 2})
+
+        full_range = summarize_orders(
+            timezone.make_aware(datetime.datetime(2025, 1, 1)),
+            timezone.make_aware(datetime.datetime(2025, 3, 31, 23, 59, 59, 999999)),
+            item_nos=[self.item.item_no],
+        )
+        self.assertEqual(
+            full_range.months, {datetime.date(2025, 3, 1): (1, Decimal("25.00"))}
+        )
+        self.assertEqual(full_range.manufacturers, {"Example Manufacturer": 1})
+
+    def _chart(self, chart, **headers):
+        return self.client.get(
+            reverse("order-chart-data", args=[chart]),
+            {"start_date": "2025-01-01", "end_date": "2025-03-31"},
+            **headers,
+        )
+
+    def test_chart_data_reads_rollups(self):
+        with CaptureQueriesContext(connection) as queries:
+            monthly = self._chart("monthly").json()
+
+        self.assertEqual(monthly["labels"], ["January 2025", "February 2025", "March 2025"])
+        self.assertEqual(monthly["orders"], [2, 1, 1])
+        self.assertEqual(monthly["costs"], [50.0, 25.0, 25.0])
+        self.assertEqual(self._chart("quarterly").json()["orders"], [4])
+        self.assertEqual(
+            self._chart("manufacturers").json()["cumulative_percentages"], [75.0, 100.0]
+        )
+        self.assertFalse(
+            any(
+                "GROUP BY" in query["sql"] and 'FROM "core_order"' in query["sql"]
+                for query in queries
+            )
+        )
+        self.assertEqual(self._chart("unknown").status_code, 404)
+
+        page = self.client.get(
+            reverse("order-details-advanced"), {"quarter": "January 2025"}, follow=True
+        )
+        self.assertEqual(page.context["start_date"], "2025-01-01")
+        self.assertContains(page, reverse("order-chart-data", args=["monthly"]))
+
+    def test_chart_data_is_cached_until_orders_change(self):
+        first = self._chart("monthly")
+        with CaptureQueriesContext(connection) as queries:
+            second = self._chart("monthly")
+
+        self.assertEqual(chart_cache_stats(), {"hits": 1, "misses": 1})
+        self.assertFalse(any("core_orderrollup" in query["sql"] for query in queries))
+        self.assertEqual(second.content, first.content)
+
+        not_modified = self._chart("monthly", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        Order.objects.get(po_no="PO-1").delete()
+        third = self._chart("monthly", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third["ETag"], first["ETag"])
+        self.assertEqual(chart_cache_stats(), {"hits": 1, "misses": 2})
+        self.assertEqual(third.json()["orders"], [1, 1, 1])
+
+    def test_chart_etag_survives_barcode_scans(self):
+        first = self._chart("monthly")
+
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        not_modified = self._chart("monthly", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_chart_cache_key_normalizes_item_set(self):
+        start = timezone.make_aware(datetime.datetime(2025, 1, 1))
+        end = timezone.make_aware(datetime.datetime(2025, 3, 31, 23, 59, 59, 999999))
+
+        self.assertEqual(
+            chart_cache_key("monthly", start, end, ["B", "A", "A"]),
+            chart_cache_key("monthly", start.replace(hour=5), end, ["A", "B"]),
+        )
+        self.assertNotEqual(
+            chart_cache_key("monthly", start, end, ["A"]),
+            chart_cache_key("monthly", start, end),
+        )
+        self.assertNotEqual(
+            chart_cache_key("monthly", start, end), chart_cache_key("items", start, end)
+        )
+
+    def test_chart_cache_key_ignores_scans_but_not_item_renames(self):
+        start = timezone.make_aware(datetime.datetime(2025, 1, 1))
+        end = timezone.make_aware(datetime.datetime(2025, 3, 31, 23, 59, 59, 999999))
+        key = chart_cache_key("monthly", start, end)
+
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        self.assertEqual(chart_cache_key("monthly", start, end), key)
+
+        self.item.mfr = "Renamed Manufacturer"
+        self.item.save()
+        self.assertNotEqual(chart_cache_key("monthly", start, end), key)
+
+
+class LedgerDateBoundsTests(InventoryTestCase):
+    def _import(self, *po_dates, mode=ImportMode.SKIP):
+        import_ledger(
+            io.BytesIO(
+                ledger_workbook(
+                    [ledger_row(index, po_date=po_date) for index, po_date in po_dates]
+                )
+            ),
+            mode=mode,
+        )
+
+    def _bounds(self):
+        return [
+            timezone.localtime(date).date().isoformat() if date else None
+            for date in LedgerDateBounds.bounds(Order)
+        ]
+
+    def test_bounds_follow_imports_saves_and_deletes(self):
+        self.assertEqual(self._bounds(), [None, None])
+
+        self._import((1, datetime.datetime(2025, 2, 3, 9)), (2, datetime.datetime(2025, 5, 3, 9)))
+        self.assertEqual(self._bounds(), ["2025-02-03", "2025-05-03"])
+        self._import((3, datetime.datetime(2024, 11, 20, 9)))
+        self.assertEqual(self._bounds(), ["2024-11-20", "2025-05-03"])
+
+        order = Order.objects.get(po_no="PO-2")
+        order.po_date = timezone.make_aware(datetime.datetime(2025, 8, 1, 9))
+        order.save()
+        self.assertEqual(self._bounds(), ["2024-11-20", "2025-08-01"])
+
+        Order.objects.get(po_no="PO-3").delete()
+        self.assertEqual(self._bounds(), ["2025-02-03", "2025-08-01"])
+
+    def test_views_read_bounds_without_scanning_ledgers(self):
+        self._import((1, datetime.datetime(2024, 11, 20, 9)), (2, datetime.datetime(2025, 5, 3, 9)))
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            orders = self.client.get(reverse("order-details"))
+            advanced = self.client.get(reverse("order-details-advanced"))
+            transactions = self.client.get(reverse("itemtransaction-details"))
+
+        self.assertEqual(orders.context["lower_date_bound"], "2024-11-20")
+        self.assertEqual(
+            list(advanced.context["all_quarters"].items()),
+            [
+                ("October 2024", "Q4 2024"),
+                ("January 2025", "Q1 2025"),
+                ("April 2025", "Q2 2025"),
+            ],
+        )
+        self.assertEqual(
+            transactions.context["lower_date_bound"], timezone.localdate().isoformat()
+        )
+        self.assertEqual(len(transactions.context["all_quarters"]), 1)
+        self.assertFalse(
+            any(
+                'ORDER BY "core_order"."po_date"' in query["sql"]
+                or 'ORDER BY "core_itemtransaction"."timestamp"' in query["sql"]
+                for query in queries
+            )
+        )
+
+    def test_quarters_between_spans_year_ends(self):
+        self.assertEqual(
+            quarters_between(datetime.date(2024, 10, 1), datetime.date(2025, 1, 1)),
+            (("October 2024", "Q4 2024"), ("January 2025", "Q1 2025")),
+        )
+
+
+class TableRowCountTests(InventoryTestCase):
+    def _home_counts(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("home"))
+        # The notification badge is still counted by the context processor.
+        self.assertEqual(
+            [
+                query["sql"]
+                for query in queries
+                if "COUNT(" in query["sql"] and "core_notification" not in query["sql"]
+            ],
+            [],
+        )
+        return response.context["models"]
+
+    def test_counts_follow_inserts_deletes_and_imports(self):
+        TableRowCount.rebuild(*COUNTED_MODELS)
+        Item.objects.create(item="Second", item_no="UDI-002", device=self.device)
+        import_ledger(io.BytesIO(ledger_workbook([ledger_row(1), ledger_row(2)])))
+        Order.objects.get(po_no="PO-1").delete()
+
+        counts = self._home_counts()
+
+        self.assertEqual(counts["Device"], 1)
+        self.assertEqual(counts["Item"], Item.objects.count())
+        self.assertEqual(counts["Order"], 1)
+        self.assertEqual(counts["ItemTransaction"], ItemTransaction.objects.count())
+
+    def test_rebuild_command_corrects_drift(self):
+        TableRowCount.counts(Item)
+        TableRowCount.objects.filter(table=Item._meta.db_table).update(rows=99)
+
+        call_command("rebuild_row_counts", stdout=io.StringIO())
+
+        self.assertEqual(TableRowCount.counts(Item), {Item: Item.objects.count()})
+
+
+class NotificationInboxCacheTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.device.current_count = 2
+        self.device.save(update_fields=["current_count"])
+        Item.objects.create(
+            item="Example Item", item_no="UDI-002", device=self.device, is_available=True
+        )
+
+    def _badge(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("home"))
+        notification_queries = [
+            query["sql"] for query in queries if "core_notification" in query["sql"]
+        ]
+        return response.context["unread_notification_count"], notification_queries
+
+    def test_cached_inbox_runs_no_notification_queries(self):
+        self.assertEqual(self._badge()[0], 0)
+        self.assertEqual(self._badge(), (0, []))
+
+    def test_notification_changes_invalidate_the_inbox(self):
+        self._badge()
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        drain_outbox()
+        count, queries = self._badge()
+        self.assertEqual(count, 1)
+        self.assertTrue(queries)
+        notification = inbox(self.user).get()
+
+        self.client.post(reverse("mark-notification-read", args=[notification.pk]))
+        self.assertEqual(self._badge()[0], 0)
+
+        record_stock_in(item=self.item, actor=self.user)
+        drain_outbox()
+        self.assertIsNotNone(
+            self.client.get(reverse("home")).context["recent_notifications"][0][
+                "resolved_at"
+            ]
+        )
+
+        self.client.post(reverse("clear-notifications"))
+        self.assertEqual(self.client.get(reverse("home")).context["recent_notifications"], [])
+
+
+class NotificationOutboxTests(InventoryTestCase):
+    def test_scan_records_outbox_message_delivered_at_least_once(self):
+        self.device.current_count = 2
+        self.device.save(update_fields=["current_count"])
+        Item.objects.create(
+            item="Example Item", item_no="UDI-002", device=self.device, is_available=True
+        )
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+
+        message = OutboxMessage.objects.get(task=OutboxMessage.Task.LOW_STOCK)
+        self.assertFalse(Notification.objects.exists())
+
+        params = message.params
+        result = drain_outbox()
+        self.assertEqual((result.processed, result.failed), (2, 0))
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(Notification.objects.count(), 1)
+
+        # Delivering the same message again does not notify anyone twice.
+        OutboxMessage.objects.create(task=OutboxMessage.Task.LOW_STOCK, params=params)
+        drain_outbox()
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_message_read_by_two_workers_is_claimed_once(self):
+        message = OutboxMessage.objects.create(
+            task=OutboxMessage.Task.RESOLVE_EXPIRATION,
+            params={"item_id": self.item.pk},
+            available_at=timezone.now() - timedelta(hours=2),
+        )
+        new_claim = uuid.uuid4
+        other_worker = []
+
+        def claim_in_between():
+            # Another worker, with a clock an hour behind, claims the message between this worker's read and update.
+            if not other_worker:
+                other_worker.append(None)
+                with mock.patch(
+                    "django.utils.timezone.now",
+                    return_value=timezone.now() - timedelta(hours=1),
+                ):
+                    other_worker[:] = claim_messages()
+            return new_claim()
+
+        with mock.patch("core.outbox.uuid.uuid4", side_effect=claim_in_between):
+            claimed = claim_messages()
+
+        self.assertEqual(claimed, [])
+        self.assertEqual(other_worker, [message])
+
+    def test_failed_message_is_retried_and_lag_is_reported(self):
+        message = OutboxMessage.objects.create(
+            task=OutboxMessage.Task.WASTE_REVERSAL_REQUESTED,
+            params={"reversal_request_id": 0},
+        )
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            created_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        with self.assertLogs("core.outbox", level="ERROR"):
+            result = drain_outbox()
+        self.assertEqual((result.processed, result.failed), (0, 1))
+        self.assertGreaterEqual(result.lag, 60)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertIn("DoesNotExist", message.last_error)
+        self.assertGreater(message.available_at, timezone.now())
+
+        stats = outbox_stats()
+        self.assertEqual((stats["pending"], stats["dead"]), (1, 0))
+        self.assertGreaterEqual(stats["lag"], 60)
+        output = io.StringIO()
+        call_command("drain_outbox", "--stats", stdout=output)
+        self.assertIn("1 pending messages", output.getvalue())
+
+    @override_settings(LOW_STOCK_DIGEST_INTERVAL=900)
+    def test_low_stock_crossings_are_coalesced_into_a_digest(self):
+        self.device.current_count = 2
+        self.device.save(update_fields=["current_count"])
+        Item.objects.create(
+            item="Example Item", item_no="UDI-002", device=self.device, is_available=True
+        )
+        for _ in range(3):
+            record_item_removal(udi=self.item.item_no, actor=self.user)
+            record_stock_in(item=self.item, actor=self.user)
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        drain_outbox()
+
+        self.assertFalse(Notification.objects.filter(kind=Notification.Kind.LOW_STOCK).exists())
+        change = LowStockChange.objects.get()
+        self.assertEqual(change.device, self.device)
+
+        # The crossings are buffered for a full interval after the first one.
+        first_change = change.changed_at
+        self.assertEqual(flush_low_stock_digest(first_change + timedelta(seconds=60)), 0)
+        self.assertEqual(flush_low_stock_digest(first_change + timedelta(seconds=900)), 1)
+        digest = Notification.objects.get(kind=Notification.Kind.LOW_STOCK)
+        self.assertEqual(digest.title, "Low stock: 1 device")
+        self.assertIn("Example Device: 1 available, threshold 1.", digest.message)
+        self.assertFalse(LowStockChange.objects.exists())
+
+        # A crossing right after a digest waits another full interval, so flushing twice within it sends nothing.
+        record_stock_in(item=self.item, actor=self.user)
+        record_item_removal(udi=self.item.item_no, actor=self.user)
+        drain_outbox()
+        flushed_at = first_change + timedelta(seconds=900)
+        LowStockChange.objects.update(changed_at=flushed_at)
+        self.assertEqual(flush_low_stock_digest(flushed_at + timedelta(seconds=1)), 0)
+        self.assertEqual(flush_low_stock_digest(flushed_at + timedelta(seconds=899)), 0)
+        self.assertEqual(flush_low_stock_digest(flushed_at + timedelta(seconds=900)), 1)
+        digest.refresh_from_db()
+        self.assertIsNotNone(digest.resolved_at)
+        self.assertEqual(
+            Notification.objects.filter(
+                kind=Notification.Kind.LOW_STOCK, resolved_at__isnull=True
+            ).count(),
+            1,
+        )
@@ -4,10 +4,17 @@ Defines URLs used across the Core app.
 The following URL patterns are defined:
 
 * **items/**: Displays details for :class:`Items <core.models.Item>` (item-details).
+* **items/autocomplete/**: Suggests :class:`Items <core.models.Item>` matching the typed text as JSON (item-autocomplete).
 * **orders/**: Displays details for :class:`Orders <core.models.Order>` (order-details).
 * **item-transactions/**: Handles :class:`~core.models.ItemTransaction` details (itemtransaction-details).
-* **orders/export**: Exports :class:`~core.models.Order` data to Excel (export-orders).
+* **orders/export**: Queues an export of :class:`~core.models.Order` data to Excel (export-orders).
+* **orders/export.<format>**: Streams the filtered :class:`~core.models.Order` data as ``csv`` or ``ndjson`` (export-order-records).
+* **item-transactions/export.<format>**: Streams the filtered :class:`~core.models.ItemTransaction` data as ``csv`` or ``ndjson`` (export-itemtransaction-records).
+* **jobs/<job_id>/**: Tracks a queued import or export :class:`~core.models.Job` (job-details).
+* **jobs/<job_id>/progress/**: Reports the status of a :class:`~core.models.Job` as JSON (job-progress).
+* **jobs/<job_id>/download/**: Downloads the result of a finished export (job-download).
 * **orders-advanced/**: Advanced :class:`~core.models.Order` details view (order-details-advanced).
+* **orders-advanced/charts/<chart>/**: Data of one chart of the advanced view as JSON (order-chart-data).
 * **manage-inventory/**: Manages inventory (manage-inventory).
 * **manage-inventory/add-remove/**: Adds or removes :class:`Items <core.models.Item>` by barcode (add_remove_items_by_barcode).
 * **settings**: User settings page (settings).
@@ -30,10 +37,17 @@ urlpatterns = [
         name="update-device-threshold",
     ),
     path("items/", views.ItemDetailsView.as_view(), name="item-details"),
+    path("items/autocomplete/", views.ItemAutocompleteView.as_view(), name="item-autocomplete"),
     path("orders/", views.OrderDetailsView.as_view(), name="order-details"),
     path("item-transactions/", views.ItemTransactionView.as_view(), name="itemtransaction-details"),
     path("orders/export", views.export_to_excel, name="export-orders"),
+    path("orders/export.<slug:export_format>", views.OrderRecordExportView.as_view(), name="export-order-records"),
+    path("item-transactions/export.<slug:export_format>", views.ItemTransactionRecordExportView.as_view(), name="export-itemtransaction-records"),
+    path("jobs/<int:job_id>/", views.JobDetailsView.as_view(), name="job-details"),
+    path("jobs/<int:job_id>/progress/", views.JobProgressView.as_view(), name="job-progress"),
+    path("jobs/<int:job_id>/download/", views.JobDownloadView.as_view(), name="job-download"),
     path("orders-advanced/", views.OrderDetailsAdvancedView.as_view(), name="order-details-advanced"),
+    path("orders-advanced/charts/<slug:chart>/", views.OrderChartDataView.as_view(), name="order-chart-data"),
     path("manage-inventory/", views.ManageInventoryView.as_view(), name="manage-inventory"),
     path("manage-inventory/add-remove/", views.AddRemoveItemsByBarcodeView.as_view(), name="add_remove_items_by_barcode"),
     path("waste-log/", views.WasteLogView.as_view(), name="waste-log"),
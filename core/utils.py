@@ -1,19 +1,18 @@
 """Provides various utility functions used across the `Core` app."""
 
 import datetime
+import functools
 import os
 import sqlite3
 
-import openpyxl
 import pandas as pd
 from django.conf import settings
 from django.core.cache import cache
 from django.db import OperationalError, connection
 from django.db.models import AutoField, CharField, ForeignKey, IntegerField, TextField
-from djmoney.models.fields import MoneyFieldProxy
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from django.utils import timezone
 
-from core.models import Item
+from core.models import LedgerDateBounds, Order, ledger_fingerprint
 
 
 # Adapted from https://stackoverflow.com/a/48457168
@@ -29,135 +28,197 @@ def trunc_datetime(date: datetime.datetime):
     return date.replace(hour=0, minute=0, second=0, microsecond=0)
 
 
-def dict_from_excel_row(row: pd.Series) -> dict:
-    """Creates a dictionary from an Excel row, corresponding to the predefined models used in this Django project.
+def quarter_start(date: datetime.date) -> datetime.date:
+    """Gets the first day of the quarter containing `date`."""
+    return datetime.date(date.year, (date.month - 1) // 3 * 3 + 1, 1)
+
+
+@functools.lru_cache(maxsize=64)
+def quarters_between(first: datetime.date, last: datetime.date) -> tuple[tuple[str, str], ...]:
+    """
+    Lists the quarters from the one starting on `first` to the one starting on `last`.
+
+    Memoized, since the bounds of a ledger rarely move out of their quarters.
+
+    Args:
+        first (:class:`~datetime.date`): First day of the first quarter.
+        last (:class:`~datetime.date`): First day of the last quarter.
+
+    Returns:
+        tuple[tuple[str, str], ...]: Each quarter as its first month (``'January 2025'``) and its label (``'Q1 2025'``).
+    """
+    quarters = []
+    quarter = first
+    while quarter <= last:
+        quarters.append(
+            (quarter.strftime("%B %Y"), f"Q{(quarter.month - 1) // 3 + 1} {quarter.year}")
+        )
+        month = quarter.month + 3
+        quarter = datetime.date(quarter.year + (month > 12), (month - 1) % 12 + 1, 1)
+    return tuple(quarters)
+
+
+def ledger_quarters(model_class) -> tuple[tuple[str, str], ...]:
+    """
+    Lists the quarters spanned by the rows of a ledger model, from its :class:`~core.models.LedgerDateBounds`.
+
+    Args:
+        model_class: :class:`~core.models.Order` or :class:`~core.models.ItemTransaction`.
+
+    Returns:
+        tuple[tuple[str, str], ...]: The quarters, as returned by :func:`quarters_between`.
+    """
+    earliest, latest = LedgerDateBounds.bounds(model_class)
+    if earliest is None:
+        return ()
+    return quarters_between(
+        quarter_start(timezone.localdate(earliest)), quarter_start(timezone.localdate(latest))
+    )
+
+
+DEFAULT_ITEM_EXTERNAL_URL = (
+    "https://accessgudid.nlm.nih.gov/resources/developers/v3/device_lookup_api"
+)
+LEDGER_TIMEZONE = "America/Chicago"
+
+# Excel header -> field name, for columns copied straight from the ledger.
+LEDGER_ITEM_COLUMNS = {
+    "ITEM": "item",
+    "ITEM_NO": "item_no",
+    "MFR": "mfr",
+    "MFR CAT": "mfr_cat",
+    "DESCR": "descr",
+}
+LEDGER_ORDER_COLUMNS = {
+    "VENDOR": "vendor",
+    "VEND CAT": "vend_cat",
+    "RECV QTY": "recv_qty",
+    "UM": "um",
+    "PRICE": "price",
+    "TOTAL COST": "total_cost",
+    "Expr1010": "expr1010",
+    "PO_NO": "po_no",
+    "PO_DATE": "po_date",
+    "VEND_CODE": "vend_code",
+    "dbo_VEND.NAME": "dbo_vend_name",
+    "RCV_DATE": "rcv_date",
+}
+# Required Order fields whose column name differs between ledger exports.
+LEDGER_COLUMN_ALIASES = {
+    "dbo_cc_name": ("dbo_CC.NAME", "Expr1016"),
+    "acct_no": ("ACCT_NO", "Expr1017"),
+}
+LEDGER_DATE_FIELDS = ("po_date", "rcv_date")
+LEDGER_MONEY_FIELDS = ("price", "total_cost")
+LEDGER_INTEGER_FIELDS = ("recv_qty", "acct_no")
+
+
+def _ledger_text(column: pd.Series) -> pd.Series:
+    """Coerces a ledger column to strings, keeping whole numbers free of a trailing ``.0``."""
+    if pd.api.types.is_float_dtype(column) and (column.dropna() % 1 == 0).all():
+        column = column.astype("Int64")
+    return column.astype(object).where(column.notna(), "").astype(str)
+
+
+def normalize_ledger_frame(frame: pd.DataFrame) -> tuple[pd.Series, pd.DataFrame, pd.DataFrame]:
+    """Normalizes a chunk of an Excel ledger one column at a time.
+
+    Resolves column aliases, converts ``PO_DATE``/``RCV_DATE`` from Chicago time to UTC and coerces money,
+    integer and text columns with vectorized pandas operations. Each row also gets the
+    :func:`~core.models.ledger_fingerprint` used to recognize it on re-import.
 
     Args:
-        row (pd.Series): _description_
+        frame (pd.DataFrame): Rows of the uploaded ledger, with the header row as column names.
 
     Raises:
-        KeyError: _description_
-        Exception: _description_
-        KeyError: _description_
-        KeyError: _description_
+        Exception: If a row has no ``ITEM`` or ``ITEM_NO`` value to identify its :class:`~core.models.Item`.
+        KeyError: If neither ``dbo_CC.NAME``/``Expr1016`` nor ``ACCT_NO``/``Expr1017`` are present.
 
     Returns:
-        dict: _description_
+        tuple[pd.Series, pd.DataFrame, pd.DataFrame]: The :class:`~core.models.Item` identifier of each row, the
+        :class:`~core.models.Item` fields to use if it must be created, and the :class:`~core.models.Order` fields.
     """
-    data = {}
-    try:
-        # Identify item by ITEM_NO or ITEM
-        item_no = row.get("ITEM_NO")
-        item_name = row.get("ITEM")
-        item_identifier = item_no or item_name
-
-        if not item_identifier:
-            raise KeyError("Missing ITEM or ITEM_NO for Item lookup or creation.")
-
-        # Prepare defaults for a new Item if needed
-        item_defaults = {
-            "item": item_name or "",
-            "item_no": item_no or "",
-            "mfr": row.get("MFR", ""),
-            "mfr_cat": row.get("MFR CAT", ""),
-            "descr": row.get("DESCR", ""),
-            "external_url": "https://accessgudid.nlm.nih.gov/resources/developers/v3/device_lookup_api",
-        }
+    empty = pd.Series("", index=frame.index, dtype=object)
 
-        item_instance, _ = Item.objects.get_or_create(
-            item_no=item_identifier, defaults=item_defaults
+    items = pd.DataFrame(
+        {
+            field: _ledger_text(frame[header]) if header in frame else empty
+            for header, field in LEDGER_ITEM_COLUMNS.items()
+        }
+    )
+    items["external_url"] = DEFAULT_ITEM_EXTERNAL_URL
+    identifiers = items["item_no"].where(items["item_no"] != "", items["item"])
+    if (identifiers == "").any():
+        raise Exception("Missing required field value") from KeyError(
+            "Missing ITEM or ITEM_NO for Item lookup or creation."
         )
-        data["item"] = item_instance
-
-        if "VENDOR" in row:
-            data["vendor"] = row["VENDOR"]
-        if "VEND CAT" in row:
-            data["vend_cat"] = row["VEND CAT"]
-        if "RECV QTY" in row:
-            data["recv_qty"] = row["RECV QTY"]
-        if "UM" in row:
-            data["um"] = row["UM"]
-        if "PRICE" in row:
-            data["price"] = row["PRICE"]
-        if "TOTAL COST" in row:
-            data["total_cost"] = row["TOTAL COST"]
-        if "Expr1010" in row:
-            data["expr1010"] = row["Expr1010"]
-        if "PO_NO" in row:
-            data["po_no"] = row["PO_NO"]
-        if "PO_DATE" in row:
-            data["po_date"] = (
-                row["PO_DATE"].tz_localize(tz="America/Chicago").tz_convert("UTC")
+
+    orders = pd.DataFrame(
+        {
+            field: frame[header]
+            for header, field in LEDGER_ORDER_COLUMNS.items()
+            if header in frame
+        },
+        index=frame.index,
+    )
+    for field, headers in LEDGER_COLUMN_ALIASES.items():
+        header = next((header for header in headers if header in frame), None)
+        if header is None:
+            raise KeyError(f'Key either "{headers[0]}" or "{headers[1]}" required.')
+        orders[field] = frame[header]
+
+    for field in orders.columns:
+        if field in LEDGER_DATE_FIELDS:
+            orders[field] = (
+                pd.to_datetime(orders[field])
+                .dt.tz_localize(LEDGER_TIMEZONE)
+                .dt.tz_convert("UTC")
             )
-        if "VEND_CODE" in row:
-            data["vend_code"] = row["VEND_CODE"]
-        if "dbo_VEND.NAME" in row:
-            data["dbo_vend_name"] = row["dbo_VEND.NAME"]
-    except KeyError as e:
-        raise Exception("Missing required field value") from e
-
-    if "dbo_CC.NAME" in row:
-        data["dbo_cc_name"] = row["dbo_CC.NAME"]
-    elif "Expr1016" in row:
-        data["dbo_cc_name"] = row["Expr1016"]
-    else:
-        raise KeyError('Key either "dbo_CC.NAME" or "Expr1016" required.')
-
-    if "ACCT_NO" in row:
-        data["acct_no"] = row["ACCT_NO"]
-    elif "Expr1017" in row:
-        data["acct_no"] = row["Expr1017"]
-    else:
-        raise KeyError('Key either "ACCT_NO" or "Expr1017" required.')
-
-    if "RCV_DATE" in row:
-        data["rcv_date"] = (
-            row["RCV_DATE"].tz_localize(tz="America/Chicago").tz_convert("UTC")
-        )
+        elif field in LEDGER_MONEY_FIELDS:
+            orders[field] = pd.to_numeric(orders[field], errors="coerce").round(2)
+        elif field in LEDGER_INTEGER_FIELDS:
+            orders[field] = pd.to_numeric(orders[field], errors="coerce").astype("Int64")
+        else:
+            orders[field] = _ledger_text(orders[field])
+    orders["acct_no"] = orders["acct_no"].fillna(0)
+
+    fingerprint_parts = [
+        orders[field] if field in orders else empty
+        for field in ("po_no", "po_date", "vend_cat", "recv_qty")
+    ]
+    po_no, po_date, vend_cat, recv_qty = (
+        _ledger_text(part)
+        if not pd.api.types.is_datetime64_any_dtype(part)
+        else part.dt.strftime(Order.FINGERPRINT_DATE_FORMAT).fillna("")
+        for part in fingerprint_parts
+    )
+    orders["fingerprint"] = [
+        ledger_fingerprint(*parts)
+        for parts in zip(po_no, identifiers, po_date, vend_cat, recv_qty)
+    ]
 
-    return data
+    return identifiers, items, orders
 
 
-def style_excel_sheet(sheet, type, field, i, currency_style):
-    """Styles the exported Excel sheet to match the original style received to use for importing.
+def ledger_records(frame: pd.DataFrame) -> list[tuple[str, dict, dict]]:
+    """Converts a chunk of an Excel ledger into records ready for :func:`core.import_services.bulk_import_orders`.
 
     Args:
-        sheet (_type_): The active :class:`~openpyxl.worksheet.worksheet.Worksheet` to style.
-        type (_type_): The model type by which to check field names against
-        field (_type_): The current field to format the corresponding Excel column for.
-        i (_type_): The current column index of the :class:`~openpyxl.worksheet.worksheet.Worksheet`.
-        currency_style (_type_): The :mod:`openpyxl` :class:`~openpyxl.styles.named_styles.NamedStyle` to use for formatting currency.
+        frame (pd.DataFrame): Rows of the uploaded ledger, with the header row as column names.
+
+    Returns:
+        list[tuple[str, dict, dict]]: The :class:`~core.models.Item` identifier, the defaults to use if that
+        :class:`~core.models.Item` must be created, and the :class:`~core.models.Order` field values (without ``item``).
     """
-    col_letter = openpyxl.utils.get_column_letter(i)
-    if isinstance(getattr(type, field.name), MoneyFieldProxy):
-        for row in range(
-            2, sheet.max_row + 1
-        ):  # Start from the second row (skip header)
-            sheet[
-                f"{col_letter}{row}"
-            ].style = currency_style  # Apply the style to the entire column
-
-    # apply header formatting
-    cell_to_format = sheet.cell(row=1, column=i)
-    cell_to_format.fill = PatternFill(
-        start_color="C0C0C0", end_color="C0C0C0", fill_type="solid"
-    )
-    cell_to_format.font = Font(bold=True, color="000000")
-    cell_to_format.alignment = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(
-        left=Side(style="thin", color="000000"),
-        right=Side(style="thin", color="000000"),
-        top=Side(style="thin", color="000000"),
-        bottom=Side(style="thin", color="000000"),
+    identifiers, items, orders = normalize_ledger_frame(frame)
+    orders = orders.astype(object).where(orders.notna(), None)
+    return list(
+        zip(
+            identifiers.tolist(),
+            items.to_dict("records"),
+            orders.to_dict("records"),
+        )
     )
-    cell_to_format.border = thin_border
-
-    max_length = 0
-    for cell in list(sheet.columns)[i - 1]:
-        if len(str(cell.value)) > max_length:
-            max_length = len(str(cell.value))
-
-    sheet.column_dimensions[col_letter].width = max_length + 2
 
 
 def get_searchable_fields(model) -> list:
@@ -1,7 +1,6 @@
 """Defines views that provide data for display on templates."""
 
 import datetime
-import json
 import zoneinfo
 from decimal import Decimal, InvalidOperation
 from functools import reduce
@@ -9,8 +8,6 @@ from operator import or_
 from typing import List, Optional, Tuple
 from urllib.parse import urlencode
 
-import openpyxl
-import simplejson
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib import messages
@@ -21,23 +18,27 @@ from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db.models import (
     AutoField,
     CharField,
-    Count,
+    F,
     IntegerField,
     Q,
-    Sum,
     TextField,
 )
-from django.db.models.functions import TruncMonth, TruncQuarter
-from django.http import HttpResponse
-from django.shortcuts import redirect, render
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from django.views import View
 from django.views.generic import ListView
 from django.views.generic.base import TemplateView
-from djmoney.money import Money
-from openpyxl.styles import NamedStyle
 
 from .forms import (
     AddRemoveItemsByBarcodeForm,
@@ -45,20 +46,47 @@ from .forms import (
     WasteReversalRequestForm,
 )
 from .models import (
+    COUNTED_MODELS,
     Device,
     Item,
     ItemTransaction,
+    Job,
+    LedgerDateBounds,
     Notification,
     Order,
+    TableRowCount,
     WasteReversalRequest,
 )
 from .utils import (
     get_database_status,
     get_searchable_fields,
-    style_excel_sheet,
+    ledger_quarters,
     trunc_datetime,
 )
+from .charts import CHARTS, chart_cache_key, get_chart_json
+from .export_cache import cached_export_path, export_cache_key
+from .exports import (
+    ITEM_TRANSACTION_RECORD_COLUMNS,
+    ORDER_RECORD_COLUMNS,
+    RECORD_EXPORT_FORMATS,
+    export_filename,
+)
 from .gudid import get_or_create_item_from_udi
+from .jobs import enqueue_job, job_progress, jobs_dir
+from .notification_services import (
+    dismiss_notifications,
+    inbox,
+    mark_notification_read,
+)
+from .pagination import CachedCountPaginator, CursorPaginationMixin, StreamAllMixin
+from .search import (
+    AUTOCOMPLETE_LIMIT,
+    MAX_AUTOCOMPLETE_LIMIT,
+    autocomplete_items,
+    search_filter,
+    search_index,
+    search_rank,
+)
 from .services import (
     InventoryError,
     record_item_removal,
@@ -70,6 +98,18 @@ from .services import (
 )
 
 
+def selected_items(request: WSGIRequest) -> list[tuple[str, str]]:
+    """Gets the item number and description of the :class:`Items <core.models.Item>` chosen in an item picker."""
+    item_nos = [item_no for item_no in request.GET.getlist("category[]") if item_no.strip()]
+    if not item_nos:
+        return []
+    return list(
+        Item.objects.filter(item_no__in=item_nos)
+        .order_by("item_no")
+        .values_list("item_no", "descr")
+    )
+
+
 class HomePageView(TemplateView):
     """Defines the view for the homepage/starting page of the Core app."""
 
@@ -77,17 +117,10 @@ class HomePageView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        displayed_models = (
-            Device,
-            Item,
-            Order,
-            ItemTransaction,
-            WasteReversalRequest,
-        )
-        core_model_counts = {}
-        for model in displayed_models:
-            core_model_counts[model.__name__] = model.objects.count()
-        context["models"] = core_model_counts
+        context["models"] = {
+            model.__name__: count
+            for model, count in TableRowCount.counts(*COUNTED_MODELS).items()
+        }
         return context
 
 
@@ -135,13 +168,16 @@ class DeviceDetailsView(ListView):
         return context
 
 
-class ItemDetailsView(ListView):
+class ItemDetailsView(StreamAllMixin, CursorPaginationMixin, ListView):
     """Defines the view for the :class:`~core.models.Item` Details View, used for displaying tabulated data of all :class:`Items <core.models.Item>`."""
 
     model = Item
     template_name = "core/item_details.html"
     context_object_name = "items"
     paginate_by = 25
+    paginator_class = CachedCountPaginator
+    stream_rows_template_name = "core/item_details_rows.html"
+    stream_select_related = ("device",)
 
     def get_queryset(self):
         """
@@ -208,18 +244,25 @@ class ItemDetailsView(ListView):
         search_term = self.request.GET.get("search_term")
         valid_fields = [field.name for field in Item._meta.fields]
 
+        rank = None
         if search_term:
-            if search_field in valid_fields:
-                items_qs = items_qs.filter(
-                    **{f"{search_field}__icontains": search_term}
-                )
+            search_fields = [search_field] if search_field in valid_fields else None
+            query = search_filter(Item, search_term, search_fields)
+            if query is not None:
+                rank = search_rank(Item, search_term, search_fields)
+            elif search_fields:
+                query = Q(**{f"{search_field}__icontains": search_term})
             else:
                 query = reduce(
                     or_,
-                    [Q(**{f"{f}__icontains": search_term}) for f in valid_fields],
+                    [
+                        Q(**{f"{field.name}__icontains": search_term})
+                        for field in Item._meta.fields
+                        if not field.is_relation
+                    ],
                     Q(),
                 )
-                items_qs = items_qs.filter(query)
+            items_qs = items_qs.filter(query)
 
         sort_param = self.request.GET.get("sort", "id")
         valid_sort_fields = [f.name for f in Item._meta.fields] + [
@@ -229,11 +272,15 @@ class ItemDetailsView(ListView):
         if sort_param not in valid_sort_fields:
             sort_param = "id"
 
-        items_qs = items_qs.order_by(sort_param)
+        if rank is not None and "sort" not in self.request.GET:
+            # Best matches first, unless a sort was chosen.
+            items_qs = items_qs.annotate(search_rank=rank).order_by(
+                "search_rank", sort_param
+            )
+        else:
+            items_qs = items_qs.order_by(sort_param)
         self.sort_param = sort_param
 
-        self.items_count = items_qs.count()
-
         return items_qs
 
     def get_context_data(self, **kwargs):
@@ -257,10 +304,14 @@ class ItemDetailsView(ListView):
         context["search_term"] = self.request.GET.get("search_term", "")
         context["per_page"] = self.request.GET.get("per_page", self.paginate_by)
         context["per_page_options"] = [25, 50, 100, 200, "All"]
-        context["items_count"] = getattr(self, "items_count", 0)
+        context["items_count"] = (
+            context["paginator"].count if context["paginator"] is not None else None
+        )
         context["selected_device"] = getattr(self, "selected_device", None)
 
-        all_fields = [field.name for field in Item._meta.fields]
+        all_fields = [
+            field.name for field in Item._meta.fields if field.name != "next_expiration_alert"
+        ]
 
         context["fields"] = all_fields
         #Quantity has been depracated with new infrastructure
@@ -283,24 +334,28 @@ class ItemDetailsView(ListView):
             queryset (_type_): the queryset to paginate
 
         Returns:
-            int: The number of :class:`Items <core.models.Item>` to display per page of paginated :class:`Items <core.models.Item>`.
+            int: The number of :class:`Items <core.models.Item>` to display per page of paginated :class:`Items <core.models.Item>`, or ``None`` to show all of them.
         """
         per_page = self.request.GET.get("per_page", self.paginate_by)
         try:
             return int(per_page)
         except (ValueError, TypeError):
             if per_page == "All":
-                return queryset.count() or 1
+                # Streamed unpaginated by StreamAllMixin.
+                return None
             return self.paginate_by
 
 
-class ItemTransactionView(ListView):
+class ItemTransactionView(StreamAllMixin, CursorPaginationMixin, ListView):
     """Defines the view for the Item Transaction View, used for displaying tabulated data of all :class:`ItemTransactions <core.models.ItemTransaction>`."""
 
     model = ItemTransaction
     template_name = "core/item_transactions.html"
     context_object_name = "item_transactions"
     paginate_by = 25
+    paginator_class = CachedCountPaginator
+    stream_rows_template_name = "core/item_transactions_rows.html"
+    stream_select_related = ("item", "created_by", "reversal_of")
 
     def get_quarters_list(self) -> list[str]:
         """
@@ -309,29 +364,7 @@ class ItemTransactionView(ListView):
         Returns:
             list[str]: The list of quarters, with each quarter in the format <'Month YYYY'>.
         """
-        newest_item_transaction = ItemTransaction.objects.order_by("-timestamp").first()
-        oldest_item_transaction = ItemTransaction.objects.order_by("timestamp").first()
-        if newest_item_transaction is None or oldest_item_transaction is None:
-            return []
-
-        newest_item_transaction_date = newest_item_transaction.timestamp
-        oldest_item_transaction_date = oldest_item_transaction.timestamp
-
-        quarter_month = ((oldest_item_transaction_date.month - 1) // 3) * 3 + 1
-        aligned_start = oldest_item_transaction_date.replace(month=quarter_month, day=1)
-
-        quarter_month_end = ((newest_item_transaction_date.month - 1) // 3) * 3 + 1
-        aligned_end = newest_item_transaction_date.replace(
-            month=quarter_month_end, day=1
-        )
-
-        delta = relativedelta(aligned_end, aligned_start)
-        months_diff = delta.years * 12 + delta.months
-
-        return [
-            (aligned_start + relativedelta(months=i)).strftime("%B %Y")
-            for i in range(0, months_diff + 1, 3)
-        ]
+        return [quarter for quarter, _ in ledger_quarters(ItemTransaction)]
 
     def get_default_dates(self) -> Tuple[datetime.datetime, datetime.datetime]:
         """
@@ -440,6 +473,7 @@ class ItemTransactionView(ListView):
 
         valid_fields = get_searchable_fields(ItemTransaction)
 
+        rank = None
         if search_term:
             query = Q()
 
@@ -450,19 +484,46 @@ class ItemTransactionView(ListView):
                     and search_term.isdigit()
                 ):
                     query |= Q(**{search_field: int(search_term)})
+                elif search_field.startswith("item__"):
+                    item_field = search_field.removeprefix("item__")
+                    query |= search_filter(
+                        Item, search_term, [item_field], lookup="item_id"
+                    ) or Q(**{f"{search_field}__icontains": search_term})
                 else:
-                    query |= Q(**{f"{search_field}__icontains": search_term})
+                    text_filter = search_filter(
+                        ItemTransaction, search_term, [search_field]
+                    )
+                    if text_filter is None:
+                        text_filter = Q(**{f"{search_field}__icontains": search_term})
+                    else:
+                        rank = search_rank(ItemTransaction, search_term, [search_field])
+                    query |= text_filter
 
             else:
-                text_queries = [
-                    Q(**{f"{f}__icontains": search_term})
+                text_fields = [
+                    f
                     for f in valid_fields
                     if isinstance(
                         ItemTransaction._meta.get_field(f.split("__")[0]),
                         (CharField, TextField),
                     )
                 ]
-                query |= reduce(or_, text_queries, Q())
+                notes_filter = search_filter(ItemTransaction, search_term)
+                item_filter = search_filter(Item, search_term, lookup="item_id")
+                if notes_filter is not None and item_filter is not None:
+                    # The indexes cover the notes and the Item's text fields; the rest, such as the
+                    # transaction and event types, are still matched with icontains.
+                    indexed_fields = set(search_index(ItemTransaction).fields) | {
+                        f"item__{field}" for field in search_index(Item).fields
+                    }
+                    text_fields = [f for f in text_fields if f not in indexed_fields]
+                    query |= notes_filter | item_filter
+                    rank = search_rank(ItemTransaction, search_term)
+                query |= reduce(
+                    or_,
+                    (Q(**{f"{f}__icontains": search_term}) for f in text_fields),
+                    Q(),
+                )
 
                 if search_term.isdigit():
                     numeric_queries = [
@@ -486,11 +547,15 @@ class ItemTransactionView(ListView):
         if sort_param not in valid_sort_fields:
             sort_param = "id"
 
-        item_transactions = item_transactions.order_by(sort_param)
+        if rank is not None and "sort" not in self.request.GET:
+            # Best matches first, unless a sort was chosen. Rows matched by their Item have no rank.
+            item_transactions = item_transactions.annotate(search_rank=rank).order_by(
+                F("search_rank").asc(nulls_last=True), sort_param
+            )
+        else:
+            item_transactions = item_transactions.order_by(sort_param)
         self.sort_param = sort_param
 
-        self.items_count = item_transactions.count()
-
         if included_fields:
             return item_transactions.only(*included_fields)
         return item_transactions
@@ -503,24 +568,25 @@ class ItemTransactionView(ListView):
             queryset (_type_): the queryset to paginate
 
         Returns:
-            int: The number of items to display per page of paginated :class:`ItemTransactions <core.models.ItemTransaction>`.
+            int: The number of items to display per page of paginated :class:`ItemTransactions <core.models.ItemTransaction>`, or ``None`` to show all of them.
         """
         per_page = self.request.GET.get("per_page", self.paginate_by)
         try:
             return int(per_page)
         except (ValueError, TypeError):
             if per_page == "All":
-                return queryset.count() or 1
+                # Streamed unpaginated by StreamAllMixin.
+                return None
             return self.paginate_by
 
     def get_context_data(self, **kwargs):
         """Populates data for the template."""
         context = super().get_context_data(**kwargs)
 
-        oldest_item_transaction = ItemTransaction.objects.order_by("timestamp").first()
+        earliest, _ = LedgerDateBounds.bounds(ItemTransaction)
         lower_date_bound = (
-            oldest_item_transaction.timestamp.strftime("%Y-%m-%d")
-            if oldest_item_transaction is not None
+            timezone.localdate(earliest).strftime("%Y-%m-%d")
+            if earliest is not None
             else self.start_date.strftime("%Y-%m-%d")
         )
         upper_date_bound = timezone.localtime(timezone.now()).strftime("%Y-%m-%d")
@@ -528,12 +594,6 @@ class ItemTransactionView(ListView):
         excluded_fields = []
         included_fields = [f for f in all_fields if f not in excluded_fields]
 
-        qset = Order.objects.all().order_by("item__descr")
-        all_items = {
-            item: descr
-            for item, descr in qset.values_list("item__item", "item__descr")
-        }
-
         query_dict = self.request.GET.copy()
         query_dict.pop("page", None)
         if "sort" in query_dict:
@@ -549,9 +609,13 @@ class ItemTransactionView(ListView):
         context["search_term"] = self.request.GET.get("search_term", "")
         context["per_page"] = self.request.GET.get("per_page", self.paginate_by)
         context["per_page_options"] = [25, 50, 100, 200, "All"]
-        context["items_count"] = getattr(self, "items_count", 0)
+        context["items_count"] = (
+            context["paginator"].count if context["paginator"] is not None else None
+        )
         context["fields"] = included_fields
-        context["all_items"] = all_items
+        context["selected_items"] = selected_items(self.request)
+        context["all_quarters"] = dict(ledger_quarters(ItemTransaction))
+        context["selected_quarter"] = self.quarter_str
 
         if not context["item_transactions"]:
             context["message"] = "No item transactions available yet."
@@ -559,13 +623,16 @@ class ItemTransactionView(ListView):
         return context
 
 
-class OrderDetailsView(ListView):
+class OrderDetailsView(StreamAllMixin, CursorPaginationMixin, ListView):
     """Defines the view for the :class:`~core.models.Order` Details view, used for displaying tabulated data of all :class:`Orders <core.models.Order>`."""
 
     model = Order
     template_name = "core/order_details.html"
     context_object_name = "orders"
     paginate_by = 25
+    paginator_class = CachedCountPaginator
+    stream_rows_template_name = "core/order_details_rows.html"
+    stream_select_related = ("item__device",)
 
     def get_queryset(self):
         """
@@ -601,6 +668,7 @@ class OrderDetailsView(ListView):
 
         search_term = self.request.GET.get("search_term")
         search_field = self.request.GET.get("search_field")
+        rank = None
 
         valid_text_fields = [
             field.name
@@ -615,7 +683,12 @@ class OrderDetailsView(ListView):
 
             if search_field:
                 if search_field in valid_text_fields:
-                    filters |= Q(**{f"{search_field}__icontains": search_term})
+                    text_filter = search_filter(Order, search_term, [search_field])
+                    if text_filter is None:
+                        text_filter = Q(**{f"{search_field}__icontains": search_term})
+                    else:
+                        rank = search_rank(Order, search_term, [search_field])
+                    filters |= text_filter
                 elif search_field in money_fields:
                     try:
                         amount = Decimal(search_term)
@@ -623,14 +696,19 @@ class OrderDetailsView(ListView):
                     except InvalidOperation:
                         return queryset.none()
             else:
-                filters |= reduce(
-                    or_,
-                    [
-                        Q(**{f"{field}__icontains": search_term})
-                        for field in valid_text_fields
-                    ],
-                    Q(),
-                )
+                text_filter = search_filter(Order, search_term)
+                if text_filter is None:
+                    text_filter = reduce(
+                        or_,
+                        [
+                            Q(**{f"{field}__icontains": search_term})
+                            for field in valid_text_fields
+                        ],
+                        Q(),
+                    )
+                else:
+                    rank = search_rank(Order, search_term)
+                filters |= text_filter
                 try:
                     amount = Decimal(search_term)
                     for money_field in money_fields:
@@ -641,10 +719,17 @@ class OrderDetailsView(ListView):
             orders = orders.filter(filters)
 
         sort_param = self.request.GET.get("sort", "-po_date")
-        if sort_param.lstrip("-") in [field.name for field in Order._meta.fields]:
-            orders = orders.order_by(sort_param)
+        if sort_param.lstrip("-") not in [field.name for field in Order._meta.fields]:
+            sort_param = "-po_date"
+
+        if rank is not None and "sort" not in self.request.GET:
+            # Best matches first, unless a sort was chosen.
+            orders = orders.annotate(search_rank=rank).order_by(
+                "search_rank", sort_param
+            )
         else:
-            orders = orders.order_by("-po_date")
+            orders = orders.order_by(sort_param)
+        self.sort_param = sort_param
 
         return orders
 
@@ -652,10 +737,10 @@ class OrderDetailsView(ListView):
         """Populates data for the template."""
         context = super().get_context_data(**kwargs)
 
-        oldest_order = Order.objects.order_by("po_date").first()
+        earliest, _ = LedgerDateBounds.bounds(Order)
         lower_date_bound = (
-            oldest_order.po_date.strftime("%Y-%m-%d")
-            if oldest_order is not None
+            timezone.localdate(earliest).strftime("%Y-%m-%d")
+            if earliest is not None
             else self.start_date.strftime("%Y-%m-%d")
         )
         upper_date_bound = timezone.localtime(timezone.now()).strftime("%Y-%m-%d")
@@ -687,8 +772,8 @@ class OrderDetailsView(ListView):
                 "per_page_options": [25, 50, 100, "All"],
                 "search_field": self.request.GET.get("search_field", ""),
                 "orders_count": context["paginator"].count
-                if "paginator" in context
-                else 0,
+                if context.get("paginator") is not None
+                else None,
                 "sort": self.request.GET.get("sort", "-po_date"),
             }
         )
@@ -708,175 +793,177 @@ class OrderDetailsView(ListView):
             queryset (_type_): the queryset to paginate
 
         Returns:
-            int: The number of items to display per page of paginated Orders.
+            int: The number of items to display per page of paginated Orders, or ``None`` to show all of them.
         """
         per_page = self.request.GET.get("per_page", 25)
         try:
             return int(per_page)
         except ValueError:
             if per_page == "All":
-                count = queryset.count()
-                return count if count > 0 else 1
+                # Streamed unpaginated by StreamAllMixin.
+                return None
             return 25
 
 
+def excel_export_response(path, start_date: str | None, end_date: str | None) -> FileResponse:
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=export_filename(start_date, end_date),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
 def export_to_excel(request: WSGIRequest) -> HttpResponse:
     """
-    Export selected date range transaction data to an Excel file.
-    This sheet is formatted to match the output provided by UIH materials management.
+    Export the selected date range of transaction data to an Excel file.
+    If the same range was exported since the last change to the data, the cached file (see :mod:`core.export_cache`) is sent right away.
+    Otherwise the sheet is built by the ``run_jobs`` worker so that large ranges do not hold up a web worker.
 
     Args:
         request (WSGIRequest): the request used to generate the Excel sheet, providing the start and end dates.
 
     Returns:
-        HttpResponse: contains the Excel sheet of orders
+        HttpResponse: the cached Excel file, or a redirect to the page tracking the export job.
     """
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-
     start_date = request.GET.get("start_date")
     end_date = request.GET.get("end_date")
-    sheet.title = f"{start_date}_{end_date}"[
-        :31
-    ]  # Excel limits sheet name to 31 characters
+    cached_export = cached_export_path(export_cache_key(start_date, end_date))
+    if cached_export is not None:
+        return excel_export_response(cached_export, start_date, end_date)
+
+    job = enqueue_job(
+        Job.Kind.EXPORT_ORDERS,
+        params={"start_date": start_date, "end_date": end_date},
+        created_by=request.user,
+    )
+    return redirect("job-details", job_id=job.pk)
 
-    # Optimize related model access
-    queryset = Order.objects.select_related("item").all().order_by("-po_date")
 
-    # Filter by date range if provided
-    if start_date and end_date:
-        start_date_as_datetime = timezone.make_aware(
-            datetime.datetime.combine(parse_date(start_date), datetime.time(0, 0, 0))
-        )
-        end_date_as_datetime = timezone.make_aware(
-            datetime.datetime.combine(
-                parse_date(end_date), datetime.time(23, 59, 59, 999999)
-            )
-        )
-        queryset = queryset.filter(
-            po_date__range=[start_date_as_datetime, end_date_as_datetime]
-        )
+def streaming_record_export(
+    queryset, columns: List[str], export_format: str, filename: str
+) -> StreamingHttpResponse:
+    """
+    Streams `queryset` as a CSV or NDJSON attachment for machine consumers.
 
-    # Define fields to exclude
-    excluded_fields = {
-        "ID",
-        "price_currency",
-        "total_cost_currency",
-        "external_url",
-        "item",
-    }
-
-    # Get Order and Item fields (excluding those marked)
-    order_fields = [
-        f
-        for f in Order._meta.fields
-        if f.verbose_name not in excluded_fields and f.name not in excluded_fields
-    ]
-    item_fields = [
-        f
-        for f in Order._meta.get_field("item").related_model._meta.fields
-        if f.verbose_name not in excluded_fields and f.name not in excluded_fields
-    ]
-
-    # Build headers and add to sheet
-    column_names = [field.verbose_name for field in item_fields] + [
-        field.verbose_name for field in order_fields
-    ]
-    sheet.append(column_names)
-
-    # Optionally apply number formatting
-    currency_style = NamedStyle(name="currency_style", number_format='"$"#,##0.00')
-
-    # Populate rows
-    for order in queryset:
-        row = []
-
-        for field in item_fields:
-            value = getattr(order.item, field.name)
-            if isinstance(value, Money):
-                row.append(value.amount)
-            elif isinstance(value, datetime.datetime):
-                row.append(
-                    value.astimezone(zoneinfo.ZoneInfo("America/Chicago")).strftime(
-                        "%d/%m/%Y %I:%M:%S %p"
-                    )
-                )
-            else:
-                row.append(value)
-
-        for field in order_fields:
-            value = getattr(order, field.name)
-            if isinstance(value, Money):
-                row.append(value.amount)
-            elif isinstance(value, datetime.datetime):
-                row.append(
-                    value.astimezone(zoneinfo.ZoneInfo("America/Chicago")).strftime(
-                        "%d/%m/%Y %I:%M:%S %p"
-                    )
-                )
-            else:
-                row.append(value)
-
-        sheet.append(row)
-
-    # Apply dollar styling to money fields to match inputted Excel file.
-    i = 0
-    for field in Item._meta.fields:
-        if (
-            field.verbose_name not in excluded_fields
-            and field.name not in excluded_fields
-        ):
-            i += 1
-            style_excel_sheet(sheet, Item, field, i, currency_style)
-    for field in Order._meta.fields:
-        if (
-            field.verbose_name not in excluded_fields
-            and field.name not in excluded_fields
-        ):
-            i += 1
-            style_excel_sheet(sheet, Order, field, i, currency_style)
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    Args:
+        queryset: The filtered and ordered queryset to export.
+        columns (List[str]): The lookups to export for each row.
+        export_format (str): Either ``csv`` or ``ndjson``.
+        filename (str): The name of the attachment, without its extension.
+
+    Raises:
+        Http404: If `export_format` is not supported.
+
+    Returns:
+        StreamingHttpResponse: The rows, sent as they are read from the database.
+    """
+    if export_format not in RECORD_EXPORT_FORMATS:
+        raise Http404(f"Unsupported export format: {export_format}")
+    content_type, stream = RECORD_EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream(queryset, columns), content_type=content_type
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
     )
-    response["Content-Disposition"] = f"attachment; filename=Orders_{sheet.title}.xlsx"
-    workbook.save(response)
     return response
 
 
-class OrderDetailsAdvancedView(TemplateView):
-    """Provides graphs/visualizations of :class:`Orders <core.models.Order>`, selectable by date range."""
+class OrderRecordExportView(OrderDetailsView):
+    """Streams the :class:`Orders <core.models.Order>` shown by :class:`~core.views.OrderDetailsView`, with the same filters and sorting, as CSV or NDJSON including their :class:`~core.models.Item` columns."""
 
-    template_name = "core/order_details_advanced.html"
+    def get(self, request, *args, export_format: str, **kwargs):
+        orders = self.get_queryset()
+        return streaming_record_export(
+            orders,
+            ORDER_RECORD_COLUMNS,
+            export_format,
+            f"Orders_{self.start_date:%Y-%m-%d}_{self.end_date:%Y-%m-%d}",
+        )
 
-    def get_quarters_list(self) -> list[str]:
-        """
-        Get the list of quarters across all :class:`Orders <core.models.Order>` in the database
 
-        Returns:
-            list[str]: The list of quarters, with each quarter in the format <'Month YYYY'>.
-        """
-        newest_order = Order.objects.order_by("-po_date").first()
-        oldest_order = Order.objects.order_by("po_date").first()
-        if newest_order is None or oldest_order is None:
-            return []
+class ItemTransactionRecordExportView(ItemTransactionView):
+    """Streams the :class:`ItemTransactions <core.models.ItemTransaction>` shown by :class:`~core.views.ItemTransactionView`, with the same filters and sorting, as CSV or NDJSON."""
 
-        newest_order_date = newest_order.po_date
-        oldest_order_date = oldest_order.po_date
+    def get(self, request, *args, export_format: str, **kwargs):
+        item_transactions = self.get_queryset()
+        return streaming_record_export(
+            item_transactions,
+            ITEM_TRANSACTION_RECORD_COLUMNS,
+            export_format,
+            f"ItemTransactions_{self.start_date:%Y-%m-%d}_{self.end_date:%Y-%m-%d}",
+        )
 
-        quarter_month = ((oldest_order_date.month - 1) // 3) * 3 + 1
-        aligned_start = oldest_order_date.replace(month=quarter_month, day=1)
 
-        quarter_month_end = ((newest_order_date.month - 1) // 3) * 3 + 1
-        aligned_end = newest_order_date.replace(month=quarter_month_end, day=1)
+class JobDetailsView(TemplateView):
+    """Shows the progress of a queued import or export, polling :class:`~core.views.JobProgressView` until it finishes."""
 
-        delta = relativedelta(aligned_end, aligned_start)
-        months_diff = delta.years * 12 + delta.months
+    template_name = "core/job_details.html"
 
-        return [
-            (aligned_start + relativedelta(months=i)).strftime("%B %Y")
-            for i in range(0, months_diff + 1, 3)
-        ]
+    def get_context_data(self, **kwargs):
+        """Populates data for the template."""
+        context = super().get_context_data(**kwargs)
+        context["job"] = get_object_or_404(Job, pk=kwargs["job_id"])
+        return context
+
+
+class JobProgressView(View):
+    """Reports the status of a :class:`~core.models.Job` as JSON for polling."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(Job, pk=job_id)
+        progress, total = job_progress(job)
+        return JsonResponse(
+            {
+                "id": job.pk,
+                "kind": job.kind,
+                "status": job.status,
+                "status_display": job.get_status_display(),
+                "progress": progress,
+                "total": total,
+                "message": job.message,
+                "is_finished": job.is_finished,
+                "result_url": (
+                    reverse("job-download", args=[job.pk]) if job.result_file else None
+                ),
+            }
+        )
+
+
+class ItemAutocompleteView(View):
+    """Suggests :class:`Items <core.models.Item>` as JSON for the type-ahead item pickers, a page at a time."""
+
+    def get(self, request):
+        try:
+            limit = int(request.GET.get("limit", AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+        results, after = autocomplete_items(
+            request.GET.get("q", ""),
+            after=request.GET.get("after") or None,
+            limit=min(max(limit, 1), MAX_AUTOCOMPLETE_LIMIT),
+        )
+        return JsonResponse({"results": results, "next": after})
+
+
+class JobDownloadView(View):
+    """Serves the file produced by a finished export :class:`~core.models.Job`."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(Job, pk=job_id, status=Job.Status.SUCCEEDED)
+        path = jobs_dir() / job.result_file
+        if not job.result_file or not path.is_file():
+            raise Http404("The export file is no longer available.")
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=job.result_file.split("_", 1)[1],
+        )
+
+
+class OrderChartRangeMixin:
+    """Reads the date range and items charted by :class:`OrderDetailsAdvancedView` and :class:`OrderChartDataView`."""
 
     def get_default_dates(self) -> Tuple[datetime.datetime, datetime.datetime]:
         """
@@ -957,185 +1044,59 @@ class OrderDetailsAdvancedView(TemplateView):
 
         return start_date, end_date
 
+    def get_item_nos_from_request(self) -> list[str]:
+        """
+        Retrieves the numbers of the items selected in the request.
+        If none of them have :class:`Orders <core.models.Order>`, every item is charted instead.
+
+        Returns:
+            list[str]: The item numbers, or an empty list for all items.
+        """
+        item_nos = self.request.GET.getlist("category[]")
+        if item_nos and not Order.objects.filter(item__item_no__in=item_nos).exists():
+            return []
+        return item_nos
+
+
+class OrderDetailsAdvancedView(OrderChartRangeMixin, TemplateView):
+    """Provides graphs/visualizations of :class:`Orders <core.models.Order>`, selectable by date range."""
+
+    template_name = "core/order_details_advanced.html"
+
+    def get_quarters_list(self) -> list[str]:
+        """
+        Get the list of quarters across all :class:`Orders <core.models.Order>` in the database
+
+        Returns:
+            list[str]: The list of quarters, with each quarter in the format <'Month YYYY'>.
+        """
+        return [quarter for quarter, _ in ledger_quarters(Order)]
+
     def get_context_data(self, **kwargs):
         """Populates data for the template."""
         context = super().get_context_data(**kwargs)
-        queryset = Order.objects.all()
-        if not queryset.exists():
+        earliest, _ = LedgerDateBounds.bounds(Order)
+        if earliest is None:
             context["message"] = "No orders available yet."
         else:
             # Get the start and end dates to use for querying
             start_date, end_date = self.get_dates_from_request()
-            lower_date_bound = (
-                queryset.order_by("po_date").first().po_date.strftime("%Y-%m-%d")
-            )
+            lower_date_bound = timezone.localdate(earliest).strftime("%Y-%m-%d")
             upper_date_bound = datetime.datetime.now(zoneinfo.ZoneInfo("UTC")).strftime(
                 "%Y-%m-%d"
             )
 
-            item_no = self.request.GET.getlist("category[]")
-            selected_item = None
-
-            qset = queryset.order_by("item__descr")
-            all_items = {
-                item: descr
-                for item, descr in qset.values_list("item__item", "item__descr")
-            }
-
-            if item_no:
-                selected_item = Order.objects.filter(
-                    item__item_no__in=item_no
-                ).values_list("item__item", flat=True)
-
             start_date_str = start_date.strftime("%Y-%m-%d")
             end_date_str = end_date.strftime("%Y-%m-%d")
 
-            orders_by_month_keys = []
-            orders_by_month_values = []
-            cost_by_month_values = []
-            orders_by_quarter_keys = []
-            orders_by_quarter_values = []
-            cost_by_quarter_values = []
-            quarters_dict = {}
-
-            if not selected_item:
-                base_queryset = Order.objects.filter(
-                    po_date__range=(start_date, end_date)
-                )
-            else:
-                base_queryset = Order.objects.filter(
-                    po_date__range=(start_date, end_date), item__item_no__in=item_no
-                )
-
-            monthly_data = (
-                base_queryset.annotate(month=TruncMonth("po_date"))
-                .values("month")
-                .annotate(total_orders=Count("id"), total_cost=Sum("total_cost"))
-                .order_by("month")
-            )
-
-            quarterly_data = (
-                base_queryset.annotate(quarter=TruncQuarter("po_date"))
-                .values("quarter")
-                .annotate(total_orders=Count("id"), total_cost=Sum("total_cost"))
-                .order_by("quarter")
-            )
-
-            for entry in monthly_data:
-                orders_by_month_keys.append(entry["month"].strftime("%B %Y"))
-                orders_by_month_values.append(entry["total_orders"])
-                cost_by_month_values.append(entry["total_cost"] or 0)
-
-            for entry in quarterly_data:
-                quarter_number = (entry["quarter"].month - 1) // 3 + 1
-                quarter_label = f"Q{quarter_number} {entry['quarter'].year}"
-
-                orders_by_quarter_keys.append(quarter_label)
-                orders_by_quarter_values.append(entry["total_orders"])
-                cost_by_quarter_values.append(entry["total_cost"] or 0)
-
-            # Fetch top manufacturers (top 50 by count)
-            top_mfrs = (
-                base_queryset.values("item__mfr")
-                .annotate(count=Count("item__mfr"))
-                .order_by("-count")[:50]
-            )
-
-            # Fetch top items (top 50 by count)
-            top_items = (
-                base_queryset.values("item__item")
-                .annotate(count=Count("item__item"))
-                .order_by("-count")[:50]
-            )
-
-            # Process mfrs
-            mfrs_dict = {}
-            mfrs_pareto_dict = {}
-            total_mfr_count = sum(m["count"] for m in top_mfrs)
-            cumulative_mfr_count = 0
-
-            for m in top_mfrs:
-                mfrs_dict[m["item__mfr"]] = m["count"]
-                cumulative_mfr_count += m["count"]
-                mfrs_pareto_dict[m["item__mfr"]] = (
-                    cumulative_mfr_count / total_mfr_count
-                ) * 100
-
-            # Process items
-            commonly_ordered_items_dict = {}
-            commonly_ordered_items_pareto_dict = {}
-            total_item_count = sum(i["count"] for i in top_items)
-            cumulative_item_count = 0
-
-            for i in top_items:
-                commonly_ordered_items_dict[i["item__item"]] = i["count"]
-                cumulative_item_count += i["count"]
-                commonly_ordered_items_pareto_dict[i["item__item"]] = (
-                    cumulative_item_count / total_item_count
-                ) * 100
-
-            try:
-                selected_item = list(selected_item)
-                if len(selected_item == 0):
-                    selected_item = ""
-                else:
-                    selected_item = json.dumps(selected_item, ensure_ascii=False)
-            except TypeError:
-                if not selected_item:
-                    selected_item = ""
-
-            for quarter in self.get_quarters_list():
-                quarter_date_obj = datetime.datetime.strptime(quarter, "%B %Y")
-                quarter_date = (quarter_date_obj.month - 1) // 3 + 1
-                quarters_dict[quarter] = f"Q{quarter_date} {quarter_date_obj.year}"
-
             context.update(
                 {
                     "start_date": start_date_str,
                     "end_date": end_date_str,
                     "lower_date_bound": lower_date_bound,
                     "upper_date_bound": upper_date_bound,
-                    "orders_by_month_keys": json.dumps(
-                        orders_by_month_keys, ensure_ascii=False
-                    ),
-                    "orders_by_month_values": json.dumps(
-                        orders_by_month_values, ensure_ascii=False
-                    ),
-                    "orders_by_quarter_keys": json.dumps(
-                        orders_by_quarter_keys, ensure_ascii=False
-                    ),
-                    "orders_by_quarter_values": json.dumps(
-                        orders_by_quarter_values, ensure_ascii=False
-                    ),
-                    "total_orders_across_range": sum(orders_by_month_values),
-                    "cost_by_month_values": simplejson.dumps(
-                        cost_by_month_values, ensure_ascii=False, use_decimal=True
-                    ),
-                    "cost_by_quarter_values": simplejson.dumps(
-                        cost_by_quarter_values, ensure_ascii=False, use_decimal=True
-                    ),
-                    "mfrs_keys": json.dumps(
-                        list(mfrs_dict.keys()), ensure_ascii=False
-                    ).replace("'", "\\'"),
-                    "mfrs_values": json.dumps(
-                        list(mfrs_dict.values()), ensure_ascii=False
-                    ),
-                    "mfrs_pareto": json.dumps(
-                        list(mfrs_pareto_dict.values()), ensure_ascii=False
-                    ),
-                    "commonly_ordered_keys": json.dumps(
-                        list(commonly_ordered_items_dict.keys()), ensure_ascii=False
-                    ),
-                    "commonly_ordered_values": json.dumps(
-                        list(commonly_ordered_items_dict.values()), ensure_ascii=False
-                    ),
-                    "commonly_ordered_values_pareto": json.dumps(
-                        list(commonly_ordered_items_pareto_dict.values()),
-                        ensure_ascii=False,
-                    ),
-                    "selected_item_no": selected_item,
-                    "all_items": all_items,
-                    "all_quarters": quarters_dict,
+                    "selected_items": selected_items(self.request),
+                    "all_quarters": dict(ledger_quarters(Order)),
                     "selected_quarter": self.quarter_str,
                 }
             )
@@ -1177,10 +1138,12 @@ class OrderDetailsAdvancedView(TemplateView):
                 )
 
                 if (
-                    trunc_datetime(start_date)
+                    start_date_from_request is None
+                    or trunc_datetime(start_date)
                     != trunc_datetime(start_date_from_request)
                 ) and (
-                    trunc_datetime(end_date) != trunc_datetime(end_date_from_request)
+                    end_date_from_request is None
+                    or trunc_datetime(end_date) != trunc_datetime(end_date_from_request)
                 ):
                     new_params = {
                         "start_date": start_date.strftime("%Y-%m-%d"),
@@ -1194,6 +1157,39 @@ class OrderDetailsAdvancedView(TemplateView):
         return super().dispatch(request, *args, **kwargs)
 
 
+class OrderChartDataView(OrderChartRangeMixin, View):
+    """
+    Serves the data of one chart of :class:`OrderDetailsAdvancedView` as JSON, for the same date range, quarter and
+    item parameters as the page.
+
+    Responses carry the chart's cache key as their ETag, which changes when :class:`Orders <core.models.Order>` are
+    written or the charted :class:`~core.models.Item` fields are edited (but not when items are scanned), and answer
+    a matching ``If-None-Match`` with ``304 Not Modified``.
+    """
+
+    def get(self, request, chart):
+        if chart not in CHARTS:
+            raise Http404("Unknown chart.")
+        try:
+            start_date, end_date = self.get_dates_from_request()
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invalid date or quarter."}, status=400)
+        item_nos = self.get_item_nos_from_request()
+
+        key = chart_cache_key(chart, start_date, end_date, item_nos)
+        etag = quote_etag(key.rsplit(":", 1)[1])
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                get_chart_json(chart, key, start_date, end_date, item_nos),
+                content_type="application/json",
+            )
+        response["ETag"] = etag
+        # Revalidate on every use, since any order write changes the data.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
 class ManageInventoryView(LoginRequiredMixin, TemplateView):
     """
     Defines the view for the Manage Inventory View.
@@ -1319,14 +1315,16 @@ class AddRemoveItemsByBarcodeView(LoginRequiredMixin, View):
         )
 
 
-class WasteLogView(LoginRequiredMixin, ListView):
+class WasteLogView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """Displays the historical, instance-level waste ledger."""
 
     model = ItemTransaction
     template_name = "core/waste_log.html"
     context_object_name = "waste_transactions"
     paginate_by = 25
+    paginator_class = CachedCountPaginator
     login_url = reverse_lazy("admin:login")
+    default_cursor_sort = "-occurred_at"
 
     def get_queryset(self):
         queryset = (
@@ -1464,30 +1462,27 @@ class UpdateDeviceThresholdView(LoginRequiredMixin, View):
         return redirect("device-details")
 
 
-class NotificationListView(LoginRequiredMixin, ListView):
+class NotificationListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Notification
     template_name = "core/notifications.html"
     context_object_name = "notifications"
     paginate_by = 25
     login_url = reverse_lazy("admin:login")
+    default_cursor_sort = "-created_at"
 
     def get_queryset(self):
-        return Notification.objects.filter(
-            recipient=self.request.user,
-            dismissed_at__isnull=True,
-        ).select_related("device", "item", "actor")
+        return (
+            inbox(self.request.user)
+            .filter(inbox_dismissed_at__isnull=True)
+            .select_related("device", "item", "actor")
+        )
 
 
 class MarkNotificationReadView(LoginRequiredMixin, View):
     login_url = reverse_lazy("admin:login")
 
     def post(self, request, notification_id):
-        Notification.objects.filter(
-            pk=notification_id,
-            recipient=request.user,
-            dismissed_at__isnull=True,
-            read_at__isnull=True,
-        ).update(read_at=timezone.now())
+        mark_notification_read(request.user, notification_id)
         return redirect("notifications")
 
 
@@ -1495,12 +1490,7 @@ class DismissNotificationView(LoginRequiredMixin, View):
     login_url = reverse_lazy("admin:login")
 
     def post(self, request, notification_id):
-        now = timezone.now()
-        Notification.objects.filter(
-            pk=notification_id,
-            recipient=request.user,
-            dismissed_at__isnull=True,
-        ).update(read_at=now, dismissed_at=now)
+        dismiss_notifications(request.user, notification_id)
         return redirect("notifications")
 
 
@@ -1508,11 +1498,7 @@ class ClearNotificationsView(LoginRequiredMixin, View):
     login_url = reverse_lazy("admin:login")
 
     def post(self, request):
-        now = timezone.now()
-        Notification.objects.filter(
-            recipient=request.user,
-            dismissed_at__isnull=True,
-        ).update(read_at=now, dismissed_at=now)
+        dismiss_notifications(request.user)
         messages.success(request, "All notifications were cleared.")
         return redirect("notifications")
 
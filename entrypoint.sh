@@ -9,5 +9,11 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+echo "Starting job worker..."
+python manage.py run_jobs &
+
+echo "Starting notification outbox worker..."
+python manage.py drain_outbox &
+
 echo "Starting Gunicorn..."
 exec gunicorn --bind 0.0.0.0:8000 --workers 3 InventoryManager.wsgi:application